@@ -0,0 +1,478 @@
+"""Serve the API on an asyncio event loop.
+
+This is an alternative to `wsgi.py` for many concurrent clients. The console
+routes run the coroutines of `ApiHandler` on the loop, which send with
+asynchronous `screen` processes, RCON connections or console host requests:
+the check, the date and the console stream hold no thread. Every other route
+runs the Flask app of `web.py` on a small thread pool, so the API behaves the
+same in both modes, and status requests that arrive together share one call
+of the app.
+
+Run it with `python3 -m src.aio`.
+"""
+import argparse
+import asyncio
+import io
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote, urlsplit
+
+from src.api import http_codes
+from src.api.handler import EVENT_STREAM_HEADERS, KEEPALIVE, format_events
+from src.mts_utilities.mts_async import SingleFlight
+from src.mts_utilities.mts_metrics import registry
+from src.web import api_handler, app, authenticate_admin, authenticate_user
+
+# the routes whose concurrent requests share one response
+SHARED = ('/api/status',)
+STREAM = '/api/console/stream'
+# limits of the requests that are read
+MAX_HEADERS = 100
+MAX_BODY = 2 ** 20
+# seconds that a connection may wait for its next request
+IDLE_TIMEOUT = 75
+
+Request = namedtuple('Request', ['method', 'path', 'query', 'version',
+                                 'headers', 'body', 'peer'])
+
+
+class RequestError(ValueError):
+    """The request cannot be read."""
+
+    def __init__(self, message: str, code: int = http_codes.BAD_REQUEST):
+        self.message = message
+        self.code = code
+        super().__init__(self.message)
+
+
+class AsyncApi:
+    """Serve the Flask app on the event loop.
+
+    Parameters
+    ----------
+    handler : ApiHandler
+        The handler of the Flask app, whose log tailer feeds the console
+        streams.
+    wsgi_app : callable
+        The WSGI app that answers the requests.
+    workers : int
+        The number of threads that run the WSGI app.
+    """
+
+    def __init__(self, handler, wsgi_app, workers: int = 16):
+        self.handler = handler
+        self.wsgi_app = wsgi_app
+        self.logger = handler.logger
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='aio')
+        self.flights = SingleFlight()
+        # the routes that the handler answers on the loop
+        self.routes = {
+            ('GET', '/api/check'): (authenticate_user, handler.check_async),
+            ('POST', '/api/date'): (authenticate_user, handler.date_async),
+        }
+
+    async def serve(self, host: str = '0.0.0.0', port: int = 5000):
+        """Accept connections until the task is cancelled.
+
+        Parameters
+        ----------
+        host : str
+        port : int
+        """
+        self.handler.start_background()
+        server = await asyncio.start_server(self.connection, host, port)
+        self.logger.info(f'serving the API on {host}:{port}')
+        async with server:
+            await server.serve_forever()
+
+    async def connection(self, reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter):
+        """Answer the requests of a connection while it is kept alive.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+        writer : asyncio.StreamWriter
+        """
+        peer = writer.get_extra_info('peername') or ('', 0)
+        try:
+            while True:
+                request = await asyncio.wait_for(read_request(reader, peer),
+                                                 IDLE_TIMEOUT)
+                if request is None:
+                    break
+                if not await self.dispatch(request, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError,
+                asyncio.TimeoutError):
+            pass
+        except RequestError as error:
+            self.logger.error(f'{peer[0]} - invalid request: {error}')
+            await write_response(writer, error.code, [],
+                                 HTTPStatus(error.code).phrase.encode(),
+                                 False)
+        finally:
+            writer.close()
+
+    async def dispatch(self, request: Request, writer) -> bool:
+        """Answer the request on the loop or with the WSGI app.
+
+        Parameters
+        ----------
+        request : Request
+        writer : asyncio.StreamWriter
+
+        Returns
+        -------
+        bool
+            Whether the connection is kept alive.
+        """
+        if request.method == 'GET' and request.path == STREAM:
+            return await self.console_stream(request, writer)
+
+        keep_alive = wants_keep_alive(request)
+        route = self.routes.get((request.method, request.path))
+        if route is not None:
+            response = await self.call_handler(request, *route)
+            await write_response(writer, *response, keep_alive)
+            return keep_alive
+
+        loop = asyncio.get_running_loop()
+
+        def call():
+            return loop.run_in_executor(self.executor, call_wsgi,
+                                        self.wsgi_app, request)
+
+        if request.method == 'GET' and request.path in SHARED:
+            # clients that may see each other's response wait for one call
+            key = (request.path, request.query,
+                   request.headers.get('authorization'))
+            response = await self.flights.get(key, call)
+        else:
+            response = await call()
+        await write_response(writer, *response, keep_alive)
+        return keep_alive
+
+    async def call_handler(self, request: Request, authenticate: callable,
+                           endpoint: callable) -> tuple:
+        """Answer the request with a coroutine of the handler.
+
+        The coroutine runs in a request context of the Flask app, with its
+        hooks and the authentication of its route, like a view of `web.py`.
+
+        Parameters
+        ----------
+        request : Request
+        authenticate : callable
+            The decorator that authenticates the route in `web.py`.
+        endpoint : callable
+            The coroutine function of the handler.
+
+        Returns
+        -------
+        tuple
+            The status line, the headers and the body.
+        """
+        with self.wsgi_app.request_context(make_environ(request)):
+            response = self.wsgi_app.preprocess_request()
+            if response is None:
+                response = authenticate(lambda: None)()
+            if response is None:
+                response = await endpoint()
+            response = self.wsgi_app.process_response(
+                self.wsgi_app.make_response(response))
+            return (response.status, response.headers.to_wsgi_list(),
+                    response.get_data())
+
+    async def console_stream(self, request: Request, writer) -> bool:
+        """Stream the new lines of the server log as Server-Sent Events.
+
+        This is `ApiHandler.console_stream` on the loop: the tailer thread
+        hands the lines to the loop, so an open stream holds no thread.
+
+        Parameters
+        ----------
+        request : Request
+        writer : asyncio.StreamWriter
+
+        Returns
+        -------
+        bool
+            False, since the stream ends with the connection.
+        """
+        denied = authenticate_admin(lambda: None)()
+        code = http_codes.OK if denied is None else denied.status_code
+        registry.inc('http_requests_total', method=request.method,
+                     route=request.path, code=code)
+        if denied is not None:
+            await write_response(writer, denied.status,
+                                 denied.headers.to_wsgi_list(),
+                                 denied.get_data(), False)
+            return False
+
+        loop = asyncio.get_running_loop()
+        tailer = self.handler.tailer
+        lines = asyncio.Queue(maxsize=tailer.queue_size)
+        dropped = 0
+
+        def put(line):
+            nonlocal dropped
+            try:
+                lines.put_nowait(line)
+            except asyncio.QueueFull:
+                dropped += 1
+
+        def listener(line):
+            loop.call_soon_threadsafe(put, line)
+
+        ip = request.headers.get('x-forwarded-for') or request.peer[0]
+        self.logger.info(f'{ip} - console_stream: Streaming the server log.')
+        tailer.add_listener(listener)
+        try:
+            head = ['HTTP/1.1 200 OK',
+                    'Content-Type: text/event-stream; charset=utf-8',
+                    *[f'{name}: {value}'
+                      for name, value in EVENT_STREAM_HEADERS.items()],
+                    'Connection: close']
+            writer.write(('\r\n'.join(head) + '\r\n\r\n: connected\n\n')
+                         .encode('utf-8'))
+            await writer.drain()
+            while True:
+                try:
+                    line = await asyncio.wait_for(lines.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    line = None
+                writer.write(format_events(line, dropped).encode('utf-8'))
+                dropped = 0
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            tailer.remove_listener(listener)
+        return False
+
+
+async def read_request(reader: asyncio.StreamReader, peer: tuple):
+    """Read an HTTP/1.1 request.
+
+    The body is read by its `Content-Length`. A request with a
+    `Transfer-Encoding`, like a chunked body, is refused, since its body would
+    otherwise be read as the next request on the connection.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+    peer : tuple
+        The address of the client.
+
+    Returns
+    -------
+    Request|None
+        The request or None when the client closed the connection.
+
+    Raises
+    ------
+    RequestError
+        The request is malformed, too large or has a transfer encoding.
+    """
+    line = await read_line(reader, http_codes.URI_TOO_LONG)
+    if line.strip() == b'':
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+        raise RequestError('invalid request line')
+    method, target, version = parts
+
+    headers = {}
+    for _ in range(MAX_HEADERS):
+        line = await read_line(reader,
+                               http_codes.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, separator, value = line.decode('latin-1').partition(':')
+        if separator == '':
+            raise RequestError('invalid header')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise RequestError('too many headers')
+
+    if 'transfer-encoding' in headers:
+        raise RequestError('transfer encodings are not supported',
+                           http_codes.NOT_IMPLEMENTED)
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError('invalid content length') from None
+    if length < 0 or length > MAX_BODY:
+        raise RequestError('invalid content length')
+    body = await reader.readexactly(length) if length > 0 else b''
+    url = urlsplit(target)
+    return Request(method, unquote(url.path), url.query, version, headers,
+                   body, peer)
+
+
+async def read_line(reader: asyncio.StreamReader, code: int) -> bytes:
+    """Read a line of the request head.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+    code : int
+        The code of the response when the line is too long.
+
+    Returns
+    -------
+    bytes
+
+    Raises
+    ------
+    RequestError
+        The line is longer than the limit of the reader.
+    """
+    try:
+        return await reader.readline()
+    except ValueError:
+        # the reader drops what it read, so the connection cannot continue
+        raise RequestError('line too long', code) from None
+
+
+def wants_keep_alive(request: Request) -> bool:
+    """Check if the connection stays open after the response.
+
+    Parameters
+    ----------
+    request : Request
+
+    Returns
+    -------
+    bool
+    """
+    connection = request.headers.get('connection', '').lower()
+    if request.version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+async def write_response(writer: asyncio.StreamWriter, status, headers: list,
+                         body: bytes, keep_alive: bool):
+    """Write a complete response.
+
+    Parameters
+    ----------
+    writer : asyncio.StreamWriter
+    status : int|str
+        The status code, or the status line of a WSGI app.
+    headers : list
+        The names and values of the headers.
+    body : bytes
+    keep_alive : bool
+    """
+    if isinstance(status, int):
+        status = f'{status} {HTTPStatus(status).phrase}'
+    lines = [f'HTTP/1.1 {status}']
+    lines.extend(f'{name}: {value}' for name, value in headers
+                 if name.lower() not in ('content-length', 'connection'))
+    lines.append(f'Content-Length: {len(body)}')
+    lines.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+
+def make_environ(request: Request) -> dict:
+    """Get the WSGI environment of the request.
+
+    Parameters
+    ----------
+    request : Request
+
+    Returns
+    -------
+    dict
+    """
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': request.path,
+        'QUERY_STRING': request.query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '0',
+        'SERVER_PROTOCOL': request.version,
+        'REMOTE_ADDR': request.peer[0],
+        'CONTENT_TYPE': request.headers.get('content-type', ''),
+        'CONTENT_LENGTH': str(len(request.body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(request.body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in request.headers.items():
+        if name not in ('content-type', 'content-length'):
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+    return environ
+
+
+def call_wsgi(wsgi_app: callable, request: Request) -> tuple:
+    """Call the WSGI app with the request and collect its response.
+
+    Parameters
+    ----------
+    wsgi_app : callable
+    request : Request
+
+    Returns
+    -------
+    tuple
+        The status line, the headers and the body.
+    """
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        del exc_info
+        response['status'] = status
+        response['headers'] = headers
+
+    result = wsgi_app(make_environ(request), start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], body
+
+
+def main(argv: list) -> int:
+    """Serve the API until interrupted.
+
+    Parameters
+    ----------
+    argv : list
+
+    Returns
+    -------
+    int
+    """
+    parser = argparse.ArgumentParser(
+        prog='python3 -m src.aio',
+        description='Serve the API on an asyncio event loop.')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=16,
+                        help='threads that run the Flask app')
+    arguments = parser.parse_args(argv)
+
+    api = AsyncApi(api_handler, app, arguments.workers)
+    try:
+        asyncio.run(api.serve(arguments.host, arguments.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,14 +1,54 @@
+import gzip
+import hashlib
 import inspect
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import mtslogger
-from flask import Response, request
+from flask import Response, request, stream_with_context
 
 from src.api import http_codes
+from src.api.jobs import JobQueue
+from src.config import load_config
 from src.minecraft_helpers.server_actions import MinecraftActions
+from src.mts_utilities.mts_async import asynchronous
+from src.mts_utilities.mts_cache import TtlCache
+from src.mts_utilities.mts_control import ControlServer
+from src.mts_utilities.mts_log import LogTailer
+from src.mts_utilities.mts_metrics import registry
 
 DEBUG = os.environ.get('ENVIRONMENT') == 'development'
+# seconds between comments that keep idle event streams open
+KEEPALIVE = 15
+# responses shorter than this are not worth compressing
+GZIP_MINIMUM = 256
+# resource counters that change on every gather and are left out of the ETag
+VOLATILE = ('cpu_seconds', 'memory_bytes', 'uptime_seconds')
+# headers of the console stream, which must not be cached or buffered
+EVENT_STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def format_events(line, dropped: int = 0) -> str:
+    """Format a line of the console stream as Server-Sent Events.
+
+    Parameters
+    ----------
+    line : str|None
+        The line, or None to keep an idle stream open.
+    dropped : int
+        The number of lines that the client missed before this one.
+
+    Returns
+    -------
+    str
+    """
+    events = f'event: dropped\ndata: {dropped}\n\n' if dropped > 0 else ''
+    if line is None:
+        return events + ': keepalive\n\n'
+    return events + f'data: {line}\n\n'
 
 
 class ApiHandler:
@@ -21,19 +61,66 @@ class ApiHandler:
                                            log_file='api.log', output='file')
 
         # configure these variables for the Minecraft server
-        config = {
-            'java_executable': os.environ.get('JAVA_EXECUTABLE'),
-            'log_level': 'debug' if DEBUG else log_level,
-            'ports': self.get_ports(),
-            'screen_name': os.environ.get('SCREEN_NAME'),
-            'server_file': os.environ.get('SERVER_FILE'),
-            'server_path': os.environ.get('SERVER_PATH'),
-            'stop_timer': os.environ.get('STOP_TIMER'),
-            'server_options': json.loads(os.environ.get('SERVER_OPTIONS'))
-        }
+        config = {**load_config(), 'log_level': 'debug' if DEBUG else log_level}
 
         self.minecraft_server = MinecraftActions(**config)
 
+        # the console routes of the asynchronous mode send on its event loop
+        self.async_host = asynchronous(self.minecraft_server.host)
+        if self.minecraft_server.console is self.minecraft_server.host:
+            self.async_console = self.async_host
+        else:
+            self.async_console = asynchronous(self.minecraft_server.console)
+
+        # run the long actions on a background worker, sharing the jobs with
+        # the other workers of the API
+        self.jobs = JobQueue(state=self.minecraft_server.state)
+
+        # gather the overview on its own threads, since its fields run the
+        # status probes, which use the thread pool of the status checker
+        self.overview_pool = ThreadPoolExecutor(
+            max_workers=6, thread_name_prefix='overview')
+        self.snapshots = TtlCache(self.minecraft_server.status_ttl)
+
+        # read the server log once for every console stream and the events
+        self.tailer = LogTailer(self.minecraft_server.log_file,
+                                logger=self.logger)
+
+        # serve the actions to the command line unless the supervisor does,
+        # with the long actions on the job queue like the API requests
+        self.control = ControlServer(
+            self.minecraft_server.control_socket,
+            self.jobs.queue_actions(self.minecraft_server.get_actions()))
+
+        # the threads of the tailer and the control socket start with the
+        # first request, since uwsgi loads the app before it forks the
+        # workers and threads do not survive the fork
+        self.background = threading.Lock()
+        self.started = False
+
+    def start_background(self):
+        """Start watching the server log and serving the control socket.
+
+        This is called before every request and only starts the threads
+        once, in the process that serves the request.
+        """
+        if self.started:
+            return
+        with self.background:
+            if self.started:
+                return
+            # a failure is logged once, so it cannot fail every request
+            self.started = True
+            self.minecraft_server.watch_console(self.tailer)
+            try:
+                if self.control.start():
+                    self.logger.debug('serving the control socket')
+                else:
+                    self.logger.warning('not serving the control socket '
+                                        f'{self.control.socket_path}')
+            except OSError as error:
+                self.logger.error(f'control socket: {error}')
+
     def get_ports(self) -> list:
         """Get the ports environment variable as JSON.
 
@@ -41,18 +128,9 @@ class ApiHandler:
         -------
         list
         """
-        ports = os.environ.get('PORTS')
-        assert isinstance(ports, str)
-        ports_length = len(ports)
-        self.logger.debug(f'ports length: {ports_length}')
-        assert ports_length > 0
+        ports = load_config()['ports']
         self.logger.debug(f'ports: {ports}')
-        json_ports = json.loads(ports)
-        if isinstance(json_ports, str):
-            json_ports = json.loads(json_ports)
-        assert isinstance(json_ports, list)
-
-        return json_ports
+        return ports
 
     def check(self) -> Response:
         """Check if the screen is on or off.
@@ -62,7 +140,18 @@ class ApiHandler:
         Response
             The response with the string result and the code.
         """
-        result = self.minecraft_server.screen.check()
+        result = self.minecraft_server.host.check()
+        return self.respond('on' if result else 'off')
+
+    async def check_async(self) -> Response:
+        """Check if the screen is on or off without blocking a thread.
+
+        Returns
+        -------
+        Response
+            The response with the string result and the code.
+        """
+        result = await self.async_host.check()
         return self.respond('on' if result else 'off')
 
     def date(self) -> Response:
@@ -75,6 +164,19 @@ class ApiHandler:
         """
         return self.respond(self.minecraft_server.send_date())
 
+    async def date_async(self) -> Response:
+        """Send the date to the console without blocking a thread.
+
+        Returns
+        -------
+        Response
+            The response with the string result and the code.
+        """
+        self.logger.info('send_date')
+        message = self.minecraft_server.get_date_message()
+        await self.async_console.send(f'say {message}')
+        return self.respond(None)
+
     def command(self) -> Response:
         """Get the server command.
 
@@ -85,6 +187,34 @@ class ApiHandler:
         """
         return self.respond(self.minecraft_server.get_start_command())
 
+    def console_stream(self) -> Response:
+        """Stream the new lines of the server log as Server-Sent Events.
+
+        Every line is sent as a message. A client that falls too far behind
+        misses lines, and gets a `dropped` event with the number of lines it
+        missed.
+
+        Returns
+        -------
+        Response
+            The streaming response.
+        """
+        subscription = self.tailer.subscribe()
+        self.logger.info(f'{self.get_ip()} - console_stream: Streaming the '
+                         f'server log.')
+
+        def generate():
+            try:
+                yield ': connected\n\n'
+                while True:
+                    line = subscription.get(KEEPALIVE)
+                    yield format_events(line, subscription.take_dropped())
+            finally:
+                self.tailer.unsubscribe(subscription)
+
+        return Response(stream_with_context(generate()), http_codes.OK,
+                        EVENT_STREAM_HEADERS, mimetype='text/event-stream')
+
     def create(self) -> Response:
         """Create the screen session.
 
@@ -99,63 +229,285 @@ class ApiHandler:
         return self.respond('Failed to create screen',
                             http_codes.SERVICE_UNAVAILABLE)
 
+    def enqueue(self, action: str, function: callable) -> Response:
+        """Queue the action as a job and respond with the job.
+
+        A request for an action that is already queued or running gets the
+        existing job.
+
+        Parameters
+        ----------
+        action : str
+            The name of the action.
+        function : callable
+            Function without arguments that performs the action.
+
+        Returns
+        -------
+        Response
+            The response with the job and the accepted code.
+        """
+        job, created = self.jobs.submit(action, function)
+        self.logger.debug(f'{action} job {job.id} '
+                          f'{"queued" if created else "already queued"}')
+        return self.respond(job.to_dict(), http_codes.ACCEPTED,
+                            {'Location': f'/api/jobs/{job.id}'})
+
+    def job(self, job_id: str) -> Response:
+        """Get the progress and result of a job.
+
+        Parameters
+        ----------
+        job_id : str
+            The ID of the job.
+
+        Returns
+        -------
+        Response
+            The response with the job or the not found code.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return self.respond('Job not found', http_codes.NOT_FOUND)
+        return self.respond(job.to_dict())
+
+    def metrics(self) -> Response:
+        """Get the counters and latencies in the Prometheus text format.
+
+        The metrics are not logged like the other responses, since they are
+        scraped often and are long.
+
+        Returns
+        -------
+        Response
+            The response with the metrics.
+        """
+        self.logger.debug(f'{self.get_ip()} - metrics: Sending the metrics.')
+        return Response(registry.render(), http_codes.OK,
+                        mimetype='text/plain; version=0.0.4')
+
+    def overview(self) -> Response:
+        """Get the state of the screen, process, ports and players at once.
+
+        The fields are gathered at the same time, each with the time it was
+        gathered in `updated`, and the snapshot is shared by every request
+        for the status TTL. The weak ETag only changes with the values, so a
+        client that sends it in `If-None-Match` gets `304 Not Modified` while
+        nothing changed. The body is compressed for clients that accept gzip.
+
+        Returns
+        -------
+        Response
+            The response with the overview as JSON, or the not modified code.
+        """
+        snapshot = self.snapshots.get('overview', self.snapshot)
+        headers = {
+            'ETag': f'W/"{snapshot["etag"]}"',
+            'Cache-Control':
+                f'private, max-age={int(self.minecraft_server.status_ttl)}',
+            'Vary': 'Accept-Encoding',
+        }
+        if request.if_none_match.contains_weak(snapshot['etag']):
+            self.logger.debug(f'{self.get_ip()} - overview: Not modified.')
+            return Response(None, http_codes.NOT_MODIFIED, headers)
+
+        self.logger.info(f'{self.get_ip()} - overview: Sending the overview.')
+        body = snapshot['body']
+        if request.accept_encodings['gzip'] and snapshot['gzip'] is not None:
+            body = snapshot['gzip']
+            headers['Content-Encoding'] = 'gzip'
+        return Response(body, http_codes.OK, headers,
+                        mimetype='application/json')
+
+    def snapshot(self) -> dict:
+        """Gather the overview and encode it once for every request.
+
+        Returns
+        -------
+        dict
+            The ETag, the JSON body and the compressed body or None when the
+            body is too short to compress.
+        """
+        overview = self.gather()
+        values = {name: field.get('value', field.get('error'))
+                  for name, field in overview.items()}
+        # the counters of a running server change all the time, so only the
+        # processes themselves change the ETag
+        if isinstance(values['resources'], list):
+            values['resources'] = [
+                {key: value for key, value in usage.items()
+                 if key not in VOLATILE}
+                for usage in values['resources']]
+        values = json.dumps(values, sort_keys=True).encode('utf-8')
+        body = json.dumps(overview).encode('utf-8')
+        return {
+            'etag': hashlib.sha1(values).hexdigest(),
+            'body': body,
+            'gzip': gzip.compress(body) if len(body) >= GZIP_MINIMUM
+            else None,
+        }
+
+    def gather(self) -> dict:
+        """Gather the fields of the overview at the same time.
+
+        Returns
+        -------
+        dict
+            The names of the fields with their `value`, or the `error` when
+            gathering failed, and the time they were gathered in `updated`.
+        """
+        server = self.minecraft_server
+        fields = {
+            'screen': server.host.check,
+            'process': server.status,
+            'ports': self.get_port_states,
+            'resources': server.usage,
+            'players': self.get_players,
+            'job': self.get_current_job,
+        }
+
+        def measure(function):
+            return function(), time.time()
+
+        futures = {name: self.overview_pool.submit(measure, function)
+                   for name, function in fields.items()}
+        overview = {}
+        for name, future in futures.items():
+            try:
+                value, updated = future.result()
+                overview[name] = {'value': value, 'updated': updated}
+            except Exception as error:  # pylint: disable=broad-except
+                self.logger.error(f'overview {name} failed: {error}')
+                overview[name] = {'error': str(error), 'updated': time.time()}
+        return overview
+
+    def get_port_states(self) -> dict:
+        """Check if every port of the server is listening.
+
+        Returns
+        -------
+        dict
+            The port numbers with True, False or None when the check failed.
+        """
+        results = self.minecraft_server.status_checker.port(
+            self.minecraft_server.ports)
+        return {name.split(' ', 1)[1]: result if isinstance(result, bool)
+                else None for name, result in results.items()}
+
+    def get_players(self):
+        """Get the number and names of the players that are online.
+
+        Returns
+        -------
+        dict|None
+            The count and names, or None when the players are not known.
+        """
+        players = self.minecraft_server.players()
+        if players is None:
+            return None
+        return {'online': len(players), 'names': players}
+
+    def get_current_job(self):
+        """Get the job that is running.
+
+        Returns
+        -------
+        dict|None
+        """
+        job = self.jobs.current()
+        return job.to_dict() if job is not None else None
+
+    def players(self) -> Response:
+        """Get the players that are online with the query protocol.
+
+        Returns
+        -------
+        Response
+            The response with the full stat of the server as JSON, or the
+            service unavailable code when the server does not answer.
+        """
+        result = self.minecraft_server.query()
+        if result is None:
+            return self.respond('The server did not answer the query',
+                                http_codes.SERVICE_UNAVAILABLE)
+        return self.respond(result)
+
     def restart(self) -> Response:
-        """Restart the server.
+        """Restart the server in the background.
 
-        This returns the combined results from stop and start. While there might
-        be a failed restart value, the server might actually be running.
+        The job returns the combined results from stop and start. While there
+        might be a failed restart value, the server might actually be running.
 
         Returns
         -------
         Response
-            The response with the string result and the code.
+            The response with the job and the accepted code.
         """
-        result = self.minecraft_server.restart()
-        if result:
-            return self.respond('Restarted successfully', http_codes.NO_CONTENT)
-        return self.respond('Failed to restart successfully',
-                            http_codes.CONFLICT)
+        return self.enqueue('restart', self.minecraft_server.restart)
 
     def start(self) -> Response:
-        """Start the server.
+        """Start the server in the background.
 
         Returns
         -------
         Response
-            The response with the string result and the code.
+            The response with the job and the accepted code.
         """
-        result = self.minecraft_server.start()
-        if result:
-            return self.respond('Started successfully', http_codes.NO_CONTENT)
-        return self.respond('Failed to start', http_codes.CONFLICT)
+        return self.enqueue('start', self.minecraft_server.start)
 
     def status(self) -> Response:
         """Get the status of the server.
 
+        With the `detail` query parameter, the response is JSON with the reply
+        of the server list ping for every port.
+
         Returns
         -------
         Response
             The response with the string result and the code.
         """
-        result = self.minecraft_server.status()
-        return self.respond('up' if result else 'down')
+        result = 'up' if self.minecraft_server.status() else 'down'
+        if 'detail' in request.args:
+            return self.respond({'status': result,
+                                 'servers': self.minecraft_server.ping()})
+        return self.respond(result)
 
     def stop(self) -> Response:
-        """Stop the server.
+        """Stop the server in the background.
 
         Returns
         -------
         Response
-            The response with the string result and the code.
+            The response with the job and the accepted code.
         """
-        result = self.minecraft_server.stop()
-        if result:
-            return self.respond('Stopped successfully', http_codes.NO_CONTENT)
-        return self.respond('Failed to stop', http_codes.CONFLICT)
+        return self.enqueue('stop', self.minecraft_server.stop)
 
-    def respond(self, message, code=http_codes.OK) -> Response:
+    @staticmethod
+    def get_ip() -> str:
+        """Get the IP address of the client.
+
+        Returns
+        -------
+        str
+            The forwarded addresses or the remote address.
+        """
+        other = request.headers.getlist('X-Forwarded-For')
+        if len(other) > 0:
+            return ', '.join(other)
+        return request.remote_addr
+
+    def respond(self, message, code=http_codes.OK, headers=None) -> Response:
         """Log the request and response and send the response back to caller.
 
+        Parameters
+        ----------
+        message : str|dict|list
+            The body of the response; dictionaries and lists are sent as JSON.
+        code : int
+            The HTTP status code.
+        headers : dict
+            Additional headers of the response.
+
         Returns
         -------
         Response
@@ -167,15 +519,14 @@ class ApiHandler:
         caller = caller_frame[1][3]
 
         # get the IP address
-        other = request.headers.getlist('X-Forwarded-For')
-        if len(other) > 0:
-            ip = ', '.join(other)
-        else:
-            ip = request.remote_addr
+        ip = self.get_ip()
 
         # log the response
         self.logger.info(f'{ip} - {caller}: Sending API Response, {message}, '
                          f'with code {code}.')
 
         # return the response with the code
-        return Response(message, code)
+        if isinstance(message, (dict, list)):
+            return Response(json.dumps(message), code, headers,
+                            mimetype='application/json')
+        return Response(message, code, headers)
@@ -5,6 +5,9 @@ ACCEPTED = 202
 NO_CONTENT = 204
 PARTIAL_CONTENT = 206
 
+# Redirection
+NOT_MODIFIED = 304
+
 # Client Error
 BAD_REQUEST = 400
 UNAUTHORIZED = 401
@@ -13,7 +16,9 @@ NOT_FOUND = 404
 METHOD_NOT_ALLOWED = 405
 NOT_ACCEPTABLE = 406
 CONFLICT = 409
+URI_TOO_LONG = 414
 TOO_MANY_REQUESTS = 429
+REQUEST_HEADER_FIELDS_TOO_LARGE = 431
 
 # Server Error
 INTERNAL_SERVER_ERROR = 500
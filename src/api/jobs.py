@@ -0,0 +1,351 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.mts_utilities.mts_process import is_alive
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+ERROR = 'error'
+
+# keys of the shared state for the jobs of every process
+ACTIVE_JOBS = 'jobs:active'
+# the actions that change the server and run one at a time as jobs
+LONG_ACTIONS = ('restart', 'start', 'stop')
+
+
+class JobError(Exception):
+    """The action of a job failed."""
+
+
+class Job:
+    """An action that runs in the background."""
+
+    def __init__(self, action: str, function: callable, publish=None):
+        self.id = uuid.uuid4().hex
+        self.action = action
+        self.function = function
+        self.publish = publish
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.ended = threading.Event()
+
+    @classmethod
+    def from_dict(cls, record: dict):
+        """Get a job of another process from its dictionary.
+
+        Parameters
+        ----------
+        record : dict
+
+        Returns
+        -------
+        Job
+            The job, which cannot be run.
+        """
+        job = cls(record['action'], None)
+        for key in ('id', 'status', 'result', 'error', 'created', 'started',
+                    'finished'):
+            setattr(job, key, record[key])
+        return job
+
+    def run(self):
+        """Run the function of the job and store its result or error."""
+        self.started = time.time()
+        self.status = RUNNING
+        self.changed()
+        try:
+            self.result = self.function()
+            self.status = DONE
+        except Exception as error:  # pylint: disable=broad-except
+            self.error = str(error)
+            self.status = ERROR
+        self.finished = time.time()
+        self.changed()
+        self.ended.set()
+
+    def changed(self):
+        """Publish the job after its status changed."""
+        if self.publish is not None:
+            self.publish(self)
+
+    def active(self) -> bool:
+        """Check if the job is waiting or running.
+
+        Returns
+        -------
+        bool
+        """
+        return self.status in (QUEUED, RUNNING)
+
+    def to_dict(self) -> dict:
+        """Get the job as a dictionary for the API.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            'id': self.id,
+            'action': self.action,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobQueue:
+    """Run actions one at a time on a background worker.
+
+    Submitting an action that is already queued or running returns the
+    existing job instead of adding another one. Only the latest finished jobs
+    are kept.
+
+    With the shared state, the jobs are published to every process, like the
+    API workers, the supervisor and the command line. Any of them can get a
+    job by its ID, and an action that runs in one process is not queued in
+    another. A job of a process that died is no longer active.
+    """
+
+    def __init__(self, keep: int = 100, state=None):
+        self.keep = keep
+        self.state = state
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+        self.active = {}
+        self.executor = ThreadPoolExecutor(max_workers=1,
+                                           thread_name_prefix='jobs')
+
+    def submit(self, action: str, function: callable) -> tuple:
+        """Queue the action unless the same action is queued or running.
+
+        Parameters
+        ----------
+        action : str
+            The name of the action, used to find duplicates.
+        function : callable
+            Function without arguments that performs the action.
+
+        Returns
+        -------
+        tuple
+            The job and whether it was created by this call.
+        """
+        with self.lock:
+            job = self.active.get(action)
+            if job is not None:
+                return job, False
+
+            job = Job(action, function)
+            if self.state is not None:
+                other = self.claim(job)
+                if other is not None:
+                    return other, False
+                job.publish = self.publish
+            self.jobs[job.id] = job
+            self.active[action] = job
+            self.trim()
+
+        self.executor.submit(self.execute, job)
+        return job, True
+
+    def call(self, action: str, function: callable):
+        """Run the action as a job and wait for its result.
+
+        Parameters
+        ----------
+        action : str
+            The name of the action, used to find duplicates.
+        function : callable
+            Function without arguments that performs the action.
+
+        Returns
+        -------
+        The result of the job, which may be the job of an earlier call.
+
+        Raises
+        ------
+        JobError
+            When the action failed.
+        """
+        job, _ = self.submit(action, function)
+        job = self.wait(job)
+        if job.status == ERROR:
+            raise JobError(job.error)
+        return job.result
+
+    def wait(self, job: Job, poll_interval: float = 0.5) -> Job:
+        """Wait until the job is done or failed.
+
+        The jobs of this process end the wait right away, and the jobs of the
+        other processes are read again after the poll interval.
+
+        Parameters
+        ----------
+        job : Job
+        poll_interval : float
+
+        Returns
+        -------
+        Job
+            The finished job.
+        """
+        while job.active():
+            if job.ended.wait(poll_interval):
+                break
+            job = self.get(job.id) or job
+        return job
+
+    def queue_actions(self, actions: dict) -> dict:
+        """Run the long actions of the action functions as jobs.
+
+        Parameters
+        ----------
+        actions : dict
+            The names of the actions with functions that take no arguments.
+
+        Returns
+        -------
+        dict
+            The actions, where restart, start and stop wait for their job.
+        """
+        def queued(action, function):
+            return lambda: self.call(action, function)
+
+        return {action: queued(action, function) if action in LONG_ACTIONS
+                else function for action, function in actions.items()}
+
+    def claim(self, job: Job):
+        """Make the job the active one of its action in every process.
+
+        Parameters
+        ----------
+        job : Job
+
+        Returns
+        -------
+        Job|None
+            The active job of another process, or None when the job was
+            claimed.
+        """
+        self.publish(job)
+        other = []
+
+        def replace(active):
+            active = active or {}
+            job_id = active.get(job.action)
+            found = self.shared(job_id) if job_id is not None else None
+            if found is not None and found.active():
+                other.append(found)
+                return active
+            return {**active, job.action: job.id}
+
+        self.state.update(ACTIVE_JOBS, replace)
+        if len(other) > 0:
+            self.state.delete(f'job:{job.id}')
+            return other[0]
+        return None
+
+    def publish(self, job: Job):
+        """Store the job in the shared state.
+
+        Parameters
+        ----------
+        job : Job
+        """
+        self.state.set(f'job:{job.id}', {**job.to_dict(), 'pid': os.getpid()})
+
+    def shared(self, job_id: str):
+        """Get a job from the shared state.
+
+        A job that is still active in a process that died is an error.
+
+        Parameters
+        ----------
+        job_id : str
+
+        Returns
+        -------
+        Job|None
+        """
+        record, _ = self.state.get(f'job:{job_id}')
+        if record is None:
+            return None
+        job = Job.from_dict(record)
+        if job.active() and not is_alive(record['pid']):
+            job.status = ERROR
+            job.error = 'The process of the job exited.'
+        return job
+
+    def execute(self, job: Job):
+        """Run the job and remove it from the active jobs.
+
+        Parameters
+        ----------
+        job : Job
+        """
+        job.run()
+        with self.lock:
+            if self.active.get(job.action) is job:
+                del self.active[job.action]
+        if self.state is not None:
+            self.state.update(ACTIVE_JOBS, lambda active: {
+                action: job_id for action, job_id in (active or {}).items()
+                if job_id != job.id})
+
+    def trim(self):
+        """Forget the oldest finished jobs beyond the number to keep."""
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if not job.active()]
+        for job_id in finished[:max(len(self.jobs) - self.keep, 0)]:
+            del self.jobs[job_id]
+            if self.state is not None:
+                self.state.delete(f'job:{job_id}')
+
+    def get(self, job_id: str):
+        """Get the job with the ID.
+
+        Parameters
+        ----------
+        job_id : str
+
+        Returns
+        -------
+        Job|None
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None and self.state is not None:
+            job = self.shared(job_id)
+        return job
+
+    def current(self):
+        """Get the job that is running, if any.
+
+        Returns
+        -------
+        Job|None
+        """
+        with self.lock:
+            for job in self.active.values():
+                if job.status == RUNNING:
+                    return job
+        if self.state is None:
+            return None
+        active, _ = self.state.get(ACTIVE_JOBS)
+        for job_id in (active or {}).values():
+            job = self.shared(job_id)
+            if job is not None and job.status == RUNNING:
+                return job
+        return None
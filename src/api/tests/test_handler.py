@@ -1,3 +1,5 @@
+import gzip
+import json
 import os
 
 import mtslogger
@@ -14,3 +16,82 @@ def test_api_handler_init():
     api = handler.ApiHandler(log_level)
     assert isinstance(api.logger, type(logger))
     assert api.logger.mode == log_level
+    # nothing runs in the process that loads the app before the fork
+    assert api.tailer.thread is None
+    assert api.control.server is None
+
+
+@pytest.mark.skipif(os.environ.get('CI') == 'true',
+                    reason='GitHub Actions does not support arrays in config.')
+def test_control_socket_failure(monkeypatch):
+    from src import web  # pylint: disable=import-outside-toplevel
+    starts = []
+
+    def start():
+        starts.append(1)
+        raise PermissionError(1, 'Operation not permitted')
+
+    monkeypatch.setattr(web.api_handler, 'started', False)
+    monkeypatch.setattr(web.api_handler.control, 'start', start)
+    monkeypatch.setattr(web.api_handler.minecraft_server, 'watch_console',
+                        lambda tailer: None)
+    client = web.app.test_client()
+    # the API answers without the control socket, which is tried once
+    for _ in range(2):
+        assert client.get('/api/metrics').status_code == 200
+    assert len(starts) == 1
+
+
+@pytest.mark.skipif(os.environ.get('CI') == 'true',
+                    reason='GitHub Actions does not support arrays in config.')
+def test_overview(monkeypatch):
+    from src import web  # pylint: disable=import-outside-toplevel
+    monkeypatch.setattr(web, 'DEBUG', True)
+    client = web.app.test_client()
+
+    response = client.get('/api/overview')
+    assert response.status_code == 200
+    overview = response.get_json()
+    assert set(overview) == {'screen', 'process', 'ports', 'resources',
+                             'players', 'job'}
+    assert all('updated' in field for field in overview.values())
+    etag = response.headers['ETag']
+    assert etag.startswith('W/"')
+
+    response = client.get('/api/overview', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    response = client.get('/api/overview',
+                          headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data)) == overview
+
+
+@pytest.mark.skipif(os.environ.get('CI') == 'true',
+                    reason='GitHub Actions does not support arrays in config.')
+def test_overview_running(monkeypatch):
+    from src import web  # pylint: disable=import-outside-toplevel
+    monkeypatch.setattr(web, 'DEBUG', True)
+    server = web.api_handler.minecraft_server
+    ticks = iter(range(1, 100))
+
+    def usage():
+        tick = next(ticks)
+        return [{'pid': 1234, 'cpu_seconds': tick / 10,
+                 'memory_bytes': 1024 * tick, 'threads': 30,
+                 'uptime_seconds': tick}]
+
+    monkeypatch.setattr(server, 'usage', usage)
+    client = web.app.test_client()
+
+    web.api_handler.snapshots.invalidate()
+    response = client.get('/api/overview')
+    assert response.get_json()['resources']['value'][0]['pid'] == 1234
+    etag = response.headers['ETag']
+
+    # the counters changed, but the server is the same
+    web.api_handler.snapshots.invalidate()
+    response = client.get('/api/overview', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
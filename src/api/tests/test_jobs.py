@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from src.api import jobs
+from src.mts_utilities import mts_state
+
+
+def test_submit_runs_job():
+    queue = jobs.JobQueue()
+    job, created = queue.submit('start', lambda: True)
+    assert created is True
+    queue.executor.shutdown(wait=True)
+    assert job.status == jobs.DONE
+    assert job.result is True
+    assert queue.get(job.id) is job
+    assert queue.current() is None
+
+
+def test_submit_deduplicates_action():
+    queue = jobs.JobQueue()
+    release = threading.Event()
+    first, _ = queue.submit('restart', release.wait)
+    second, created = queue.submit('restart', lambda: False)
+    other, other_created = queue.submit('stop', lambda: True)
+    assert second is first
+    assert created is False
+    assert other is not first
+    assert other_created is True
+    release.set()
+    queue.executor.shutdown(wait=True)
+    assert first.status == jobs.DONE
+    assert other.status == jobs.DONE
+
+
+def test_job_error():
+    def fail():
+        raise ValueError('no screen')
+
+    queue = jobs.JobQueue()
+    job, _ = queue.submit('stop', fail)
+    queue.executor.shutdown(wait=True)
+    assert job.status == jobs.ERROR
+    assert job.to_dict()['error'] == 'no screen'
+
+
+def test_trim_keeps_latest():
+    queue = jobs.JobQueue(keep=2)
+    for action in ['start', 'stop', 'restart']:
+        job, _ = queue.submit(action, lambda: True)
+        queue.executor.submit(lambda: None).result()
+    queue.submit('start', lambda: True)
+    queue.executor.shutdown(wait=True)
+    assert len(queue.jobs) == 2
+    assert queue.get(job.id) is job
+
+
+def test_jobs_shared_between_workers(tmp_path):
+    state = mts_state.SharedState(str(tmp_path / 'state.db'))
+    first = jobs.JobQueue(state=state)
+    second = jobs.JobQueue(state=mts_state.SharedState(state.path))
+    release = threading.Event()
+    job, _ = first.submit('stop', release.wait)
+
+    other, created = second.submit('stop', lambda: False)
+    assert created is False
+    assert other.id == job.id
+    assert second.get(job.id).status in (jobs.QUEUED, jobs.RUNNING)
+
+    release.set()
+    first.executor.shutdown(wait=True)
+    shared = second.get(job.id)
+    assert shared.status == jobs.DONE
+    assert shared.result is True
+    assert second.current() is None
+
+    again, created = second.submit('stop', lambda: True)
+    assert created is True
+    assert again.id != job.id
+    second.executor.shutdown(wait=True)
+
+
+def test_job_of_exited_process(tmp_path):
+    state = mts_state.SharedState(str(tmp_path / 'state.db'))
+    queue = jobs.JobQueue(state=state)
+    job = jobs.Job('start', None)
+    state.set(f'job:{job.id}', {**job.to_dict(), 'pid': 2 ** 22 + 1})
+    state.set(jobs.ACTIVE_JOBS, {'start': job.id})
+
+    assert queue.get(job.id).status == jobs.ERROR
+    replacement, created = queue.submit('start', lambda: True)
+    assert created is True
+    assert replacement.id != job.id
+    queue.executor.shutdown(wait=True)
+
+
+def test_queue_actions():
+    def fail():
+        raise ValueError('no screen')
+
+    queue = jobs.JobQueue()
+    release = threading.Event()
+    started = []
+
+    def stop():
+        started.append(True)
+        release.wait()
+        return 'stopped'
+
+    actions = queue.queue_actions({'stop': stop, 'start': fail,
+                                   'status': lambda: 'up'})
+    assert actions['status']() == 'up'
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(actions['stop']()))
+    waiter.start()
+    while len(started) == 0:
+        time.sleep(0.01)
+    # a stop from the API joins the job of the control socket
+    job, created = queue.submit('stop', stop)
+    assert created is False
+    release.set()
+    waiter.join(5)
+    assert results == ['stopped']
+    assert len(started) == 1
+    assert job.status == jobs.DONE
+    with pytest.raises(jobs.JobError, match='no screen'):
+        actions['start']()
@@ -0,0 +1,391 @@
+"""Benchmark the hot paths of the server actions and the API.
+
+Run this with `python3 -m src.benchmarks.bench`. The real screen, process
+tools and Java are replaced by the stand-ins in the `fakes` directory, which
+are put first on the search path, so the benchmarks run anywhere without a
+Minecraft server.
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from src.config import load_config
+from src.minecraft_helpers.server_actions import MinecraftActions
+from src.mts_utilities.mts_process import terminate
+
+FAKES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fakes')
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+SCREEN_NAME = 'benchmark'
+SERVER_FILE = 'server.jar'
+
+
+def free_port() -> int:
+    """Find a free TCP port for the fake server.
+
+    Returns
+    -------
+    int
+    """
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def measure(function: callable, iterations: int, warmup: int = 1) -> dict:
+    """Call the function repeatedly and summarize its durations.
+
+    Parameters
+    ----------
+    function : callable
+        Function without arguments.
+    iterations : int
+        The number of measured calls.
+    warmup : int
+        The number of calls before measuring.
+
+    Returns
+    -------
+    dict
+        The median, 95th percentile and mean in milliseconds.
+    """
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[int(0.95 * (len(timings) - 1))], 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+    }
+
+
+def throughput(function: callable, threads: int, requests: int) -> dict:
+    """Call the function from several threads at once.
+
+    Parameters
+    ----------
+    function : callable
+        Function without arguments.
+    threads : int
+        The number of concurrent callers.
+    requests : int
+        The number of calls of every thread.
+
+    Returns
+    -------
+    dict
+        The calls per second and the median duration in milliseconds.
+    """
+    timings = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        own = []
+        barrier.wait()
+        for _ in range(requests):
+            started = time.perf_counter()
+            function()
+            own.append((time.perf_counter() - started) * 1000)
+        with lock:
+            timings.extend(own)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'threads': threads,
+        'requests': threads * requests,
+        'requests_per_second': round(threads * requests / elapsed, 1),
+        'median_ms': round(statistics.median(timings), 3),
+    }
+
+
+class Environment:
+    """A server directory and search path with the stand-ins.
+
+    The environment variables of the configuration are set for the API, and
+    every fake server process is stopped on exit. The fake server listens on
+    a free port and answers the query protocol.
+    """
+
+    def __init__(self, startup: float = 0.05):
+        self.directory = tempfile.mkdtemp(prefix='minecraft-helpers-bench-')
+        self.server_path = os.path.join(self.directory, 'server') + os.sep
+        self.startup = startup
+        self.port = free_port()
+        self.saved = None
+
+    def __enter__(self):
+        os.makedirs(self.server_path)
+        open(os.path.join(self.server_path, SERVER_FILE), 'w').close()
+        with open(os.path.join(self.server_path, 'server.properties'),
+                  'w') as handle:
+            handle.write(f'server-port={self.port}\nenable-query=true\n')
+        self.saved = dict(os.environ)
+        os.environ.update({
+            'PATH': FAKES + os.pathsep + os.environ.get('PATH', os.defpath),
+            'FAKE_SCREEN_DIR': os.path.join(self.directory, 'screen'),
+            'FAKE_STARTUP': str(self.startup),
+            'FAKE_LISTEN': str(self.port),
+            'PORTS': json.dumps([self.port]),
+            'SERVER_OPTIONS': json.dumps(['-Xmx1G']),
+            'SCREEN_NAME': SCREEN_NAME,
+            'JAVA_EXECUTABLE': 'java',
+            'SERVER_FILE': SERVER_FILE,
+            'SERVER_PATH': self.server_path,
+            'STOP_TIMER': '0',
+            'STOP_MODE': 'timer',
+            'STATE_FILE': os.path.join(self.directory, 'state.db'),
+            'CONTROL_SOCKET': os.path.join(self.directory, 'control.sock'),
+            'PYTHONPATH': os.pathsep.join(
+                path for path in [ROOT, os.environ.get('PYTHONPATH')] if path),
+        })
+        return self
+
+    def __exit__(self, *args):
+        server = self.server()
+        pids = server.get_pids()
+        if len(pids) > 0:
+            terminate(pids, 5)
+        os.environ.clear()
+        os.environ.update(self.saved)
+
+    def server(self, **kwargs):
+        """Get server actions configured for the environment.
+
+        Parameters
+        ----------
+        kwargs
+            Arguments that replace the configuration.
+
+        Returns
+        -------
+        MinecraftActions
+        """
+        load_config.cache_clear()
+        config = {**load_config(), 'log_level': 'warning',
+                  'start_timeout': 30, 'stop_timeout': 30}
+        config.update(kwargs)
+        return MinecraftActions(**config)
+
+
+def run_benchmarks(iterations: int = 50, only: list = None) -> dict:
+    """Run the benchmarks against the stand-ins.
+
+    Parameters
+    ----------
+    iterations : int
+        The number of measured calls of the quick benchmarks.
+    only : list
+        The names of the benchmarks to run, or None for all of them.
+
+    Returns
+    -------
+    dict
+        The names of the benchmarks with their results.
+    """
+    results = {}
+
+    def wanted(name):
+        return only is None or name in only
+
+    with Environment() as environment:
+        server = environment.server()
+        server.screen.create()
+        assert server.start(), 'the fake server did not start'
+
+        def status():
+            server.invalidate()
+            server.status()
+
+        if wanted('status'):
+            results['status'] = measure(status, iterations)
+        if wanted('status_cached'):
+            results['status_cached'] = measure(server.status, iterations)
+        if wanted('status_tools'):
+            tools = environment.server()
+            tools.status_checker.proc_path = os.path.join(
+                environment.directory, 'no-proc')
+
+            def status_tools():
+                tools.invalidate()
+                tools.status()
+            results['status_tools'] = measure(status_tools, iterations)
+        if wanted('report'):
+            results['report'] = measure(server.report, iterations)
+        if wanted('ping'):
+            results['ping'] = measure(server.ping, iterations)
+        if wanted('players'):
+            results['players'] = measure(server.players, iterations)
+
+        def screen_check():
+            server.screen.cache.invalidate()
+            server.screen.check()
+
+        if wanted('screen_check'):
+            results['screen_check'] = measure(screen_check, iterations)
+        if wanted('send'):
+            results['send'] = measure(
+                lambda: server.console.send('say benchmark'), iterations)
+        if wanted('send_many'):
+            results['send_many'] = measure(
+                lambda: server.console.send_many(['say one', 'say two',
+                                                  'save-all']), iterations)
+        if wanted('api_status'):
+            results['api_status'] = api_throughput('/api/status')
+
+        if wanted('stop_start'):
+            def stop_start():
+                assert server.stop(), 'the fake server did not stop'
+                assert server.start(), 'the fake server did not start'
+            results['stop_start'] = measure(stop_start,
+                                            max(iterations // 10, 3), 0)
+
+    if wanted('cli_import'):
+        # the start of a command line call from cron, with the interpreter
+        results['cli_import'] = measure(
+            lambda: subprocess.run([sys.executable, '-c', 'import src.main'],
+                                   cwd=ROOT, check=True),
+            max(iterations // 5, 5))
+    return results
+
+
+def api_throughput(path: str, threads: int = 8, requests: int = 50) -> dict:
+    """Measure the requests per second of an API route.
+
+    Parameters
+    ----------
+    path : str
+        The path of the route.
+    threads : int
+        The number of concurrent clients.
+    requests : int
+        The number of requests of every client.
+
+    Returns
+    -------
+    dict
+    """
+    # the API reads the configuration when it is imported
+    from src.web import app  # pylint: disable=import-outside-toplevel
+
+    def get():
+        response = app.test_client().get(path)
+        assert response.status_code < 500, response.status_code
+
+    get()
+    return throughput(get, threads, requests)
+
+
+# whether a larger value of the measurement is better
+HIGHER_IS_BETTER = {'requests_per_second': True, 'median_ms': False}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Find the benchmarks that got slower than the baseline.
+
+    Only the median duration and the requests per second are compared,
+    since they are stable between runs.
+
+    Parameters
+    ----------
+    results : dict
+        The results of this run.
+    baseline : dict
+        The results of an earlier run.
+    tolerance : float
+        The relative change that is allowed, like 0.25 for 25%.
+
+    Returns
+    -------
+    list
+        A message for every regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key, higher in HIGHER_IS_BETTER.items():
+            if key not in result or key not in previous or previous[key] <= 0:
+                continue
+            change = (result[key] - previous[key]) / previous[key]
+            if (change < -tolerance) if higher else (change > tolerance):
+                regressions.append(f'{name} {key}: {previous[key]} -> '
+                                   f'{result[key]} ({change:+.0%})')
+    return regressions
+
+
+def main(argv: list) -> int:
+    """Run the benchmarks from the command line.
+
+    Parameters
+    ----------
+    argv : list
+
+    Returns
+    -------
+    int
+        1 when a benchmark regressed compared to the baseline, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python3 -m src.benchmarks.bench',
+        description='Benchmark the server actions and the API with fake '
+                    'screen, process tools and Java.')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help='run only these benchmarks')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare with the results in this file')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to this file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown compared to the baseline')
+    arguments = parser.parse_args(argv)
+
+    results = run_benchmarks(arguments.iterations, arguments.only)
+    for name, result in results.items():
+        print(f'{name:<16} ' + '  '.join(f'{key}={value}'
+                                         for key, value in result.items()))
+
+    if arguments.save:
+        with open(arguments.save, 'w') as handle:
+            json.dump({'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'results': results}, handle, indent=2)
+            handle.write('\n')
+
+    if arguments.baseline:
+        with open(arguments.baseline) as handle:
+            baseline = json.load(handle)['results']
+        regressions = compare(results, baseline, arguments.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if len(regressions) > 0:
+            return 1
+        print('no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import time
+
+from src.benchmarks.bench import FAKES, compare, measure, throughput
+
+
+def test_measure():
+    calls = []
+    result = measure(lambda: calls.append(1), 10, warmup=2)
+    assert len(calls) == 12
+    assert result['iterations'] == 10
+    assert 0 <= result['median_ms'] <= result['p95_ms']
+
+
+def test_throughput():
+    result = throughput(lambda: None, 4, 25)
+    assert result['requests'] == 100
+    assert result['requests_per_second'] > 0
+
+
+def test_compare():
+    baseline = {
+        'status': {'median_ms': 10.0},
+        'api_status': {'requests_per_second': 500.0, 'median_ms': 2.0},
+        'removed': {'median_ms': 1.0},
+    }
+    results = {
+        'status': {'median_ms': 14.0},
+        'api_status': {'requests_per_second': 300.0, 'median_ms': 2.2},
+        'added': {'median_ms': 100.0},
+    }
+    assert compare(results, baseline, 0.25) == [
+        'status median_ms: 10.0 -> 14.0 (+40%)',
+        'api_status requests_per_second: 500.0 -> 300.0 (-40%)',
+    ]
+    assert compare(results, baseline, 0.5) == []
+
+
+def test_fake_screen_runs_the_server(tmp_path):
+    environment = dict(os.environ, FAKE_SCREEN_DIR=str(tmp_path / 'screen'),
+                       FAKE_STARTUP='0')
+    screen = os.path.join(FAKES, 'screen')
+
+    def call(*args):
+        return subprocess.run([sys.executable, screen, *args],
+                              env=environment, capture_output=True,
+                              text=True)
+
+    assert 'No Sockets' in call('-ls').stdout
+    assert call('-dR', 'test', '-X', 'stuff', 'say hi\r').returncode == 1
+    assert call('-dmS', 'test').returncode == 0
+    assert '.test\t(Detached)' in call('-ls').stdout
+
+    server_path = tmp_path / 'server'
+    server_path.mkdir()
+    (server_path / 'server.properties').write_text('server-port=0\n')
+    java = os.path.join(FAKES, 'java')
+    assert call('-dR', 'test', '-X', 'stuff',
+                f'cd {server_path}\r{java} -jar server.jar nogui\r') \
+        .returncode == 0
+    log = server_path / 'logs' / 'latest.log'
+    call('-dR', 'test', '-X', 'stuff', 'say hi\rstop\r')
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if log.exists() and 'Saving worlds' in log.read_text():
+            break
+        time.sleep(0.05)
+    lines = log.read_text().splitlines()
+    done = next(index for index, line in enumerate(lines) if 'Done (' in line)
+    assert lines[done + 1].endswith('[Server] hi')
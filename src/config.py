@@ -0,0 +1,157 @@
+import json
+import os
+import stat
+import tempfile
+from functools import lru_cache
+
+# the defaults of the settings that `MinecraftActions` needs
+DEFAULT_SCREEN_NAME = 'minecraft'
+DEFAULT_SERVER_PATH = '/usr/games/minecraft'
+DEFAULT_SERVER_FILE = 'minecraft_server.jar'
+DEFAULT_JAVA_EXECUTABLE = '/bin/java'
+DEFAULT_STOP_TIMER = 30
+
+
+def runtime_directory() -> str:
+    """Get the directory of the runtime files of the current user.
+
+    This is `XDG_RUNTIME_DIR` when it is set. Otherwise, it is a directory of
+    the user in the temporary directory, which is created with owner-only
+    permissions. Other users must not be able to write to it, since they
+    could forge the shared state or the sockets that the actions trust.
+
+    Returns
+    -------
+    str
+
+    Raises
+    ------
+    PermissionError
+        The directory in the temporary directory is not private to the user.
+    """
+    directory = os.environ.get('XDG_RUNTIME_DIR')
+    if directory:
+        return directory
+
+    uid = os.getuid()
+    directory = os.path.join(tempfile.gettempdir(), f'minecraft-helpers-{uid}')
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != uid \
+            or info.st_mode & 0o077:
+        raise PermissionError(f'{directory} is not a directory that only '
+                              f'the current user can access')
+    return directory
+
+
+def runtime_path(name: str, extension: str) -> str:
+    """Get the path of a runtime file that belongs to the screen name.
+
+    Parameters
+    ----------
+    name : str
+        The screen name of the server.
+    extension : str
+        The extension of the file, like `db` or `sock`.
+
+    Returns
+    -------
+    str
+        The path in the runtime directory of the user.
+    """
+    return os.path.join(runtime_directory(),
+                        f'minecraft-helpers-{name}.{extension}')
+
+
+def parse_list(name: str) -> list:
+    """Get an environment variable that holds a JSON list.
+
+    The list may be encoded twice, since some environments only allow strings.
+
+    Parameters
+    ----------
+    name : str
+        The name of the environment variable.
+
+    Returns
+    -------
+    list
+    """
+    value = os.environ.get(name)
+    assert isinstance(value, str)
+    assert len(value) > 0
+    parsed = json.loads(value)
+    if isinstance(parsed, str):
+        parsed = json.loads(parsed)
+    assert isinstance(parsed, list)
+    return parsed
+
+
+def control_socket_path() -> str:
+    """Get the path of the control socket without the rest of the configuration.
+
+    The command line only needs this path to forward an action, so a setting
+    of another action that is missing or invalid does not break forwarding.
+
+    Returns
+    -------
+    str
+    """
+    # dotenv is only needed to read the configuration
+    from dotenv import dotenv_values  # pylint: disable=import-outside-toplevel
+
+    # the environment takes precedence over the file, like with load_dotenv
+    environment = {**dotenv_values(), **os.environ}
+    path = environment.get('CONTROL_SOCKET')
+    if path:
+        return path
+    return runtime_path(environment.get('SCREEN_NAME', DEFAULT_SCREEN_NAME),
+                        'control.sock')
+
+
+@lru_cache(maxsize=None)
+def load_config() -> dict:
+    """Read the configuration of the Minecraft server from the environment.
+
+    The `.env` file is loaded and the environment is parsed once per process;
+    use `load_config.cache_clear()` to read it again.
+
+    Returns
+    -------
+    dict
+        The keyword arguments of `MinecraftActions`, without the log level.
+    """
+    # dotenv is only needed to read the configuration
+    from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+    load_dotenv()
+
+    return {
+        'java_executable': os.environ.get('JAVA_EXECUTABLE',
+                                          DEFAULT_JAVA_EXECUTABLE),
+        'ports': parse_list('PORTS'),
+        'screen_name': os.environ.get('SCREEN_NAME', DEFAULT_SCREEN_NAME),
+        'server_file': os.environ.get('SERVER_FILE', DEFAULT_SERVER_FILE),
+        'server_path': os.environ.get('SERVER_PATH', DEFAULT_SERVER_PATH),
+        'stop_timer': os.environ.get('STOP_TIMER', DEFAULT_STOP_TIMER),
+        'start_timeout': float(os.environ.get('START_TIMEOUT', 300)),
+        'state_file': os.environ.get('STATE_FILE'),
+        'stop_mode': os.environ.get('STOP_MODE', 'players'),
+        'stop_timeout': float(os.environ.get('STOP_TIMEOUT', 60)),
+        'kill_timeout': float(os.environ.get('KILL_TIMEOUT', 10)),
+        'status_ttl': float(os.environ.get('STATUS_TTL', 2)),
+        'backend': os.environ.get('SERVER_BACKEND', 'screen'),
+        'console_socket': os.environ.get('CONSOLE_SOCKET'),
+        'control_socket': control_socket_path(),
+        'transport': os.environ.get('CONSOLE_TRANSPORT', 'screen'),
+        'server_host': os.environ.get('SERVER_HOST', '127.0.0.1'),
+        'ping_timeout': float(os.environ.get('PING_TIMEOUT', 1)),
+        'query_port': int(os.environ.get('QUERY_PORT', 0)) or None,
+        'query_timeout': float(os.environ.get('QUERY_TIMEOUT', 1)),
+        'rcon_host': os.environ.get('RCON_HOST', '127.0.0.1'),
+        'rcon_port': int(os.environ.get('RCON_PORT', 25575)),
+        'rcon_password': os.environ.get('RCON_PASSWORD', ''),
+        'server_options': parse_list('SERVER_OPTIONS'),
+    }
@@ -1,43 +1,61 @@
-import json
 import os
 import sys
+from functools import lru_cache
 
-from dotenv import load_dotenv
+# the actions that a running supervisor or API serves on the control socket,
+# which are the keys of `MinecraftActions.get_actions`
+FORWARDED = ('check', 'date', 'get', 'ping', 'players', 'report', 'restart',
+             'screen', 'start', 'status', 'stop', 'verify')
 
-import src.minecraft_helpers.give as give
-from src.minecraft_helpers.server_actions import MinecraftActions
+# The modules of the actions are imported when an action needs them, since
+# most calls come from cron and are answered by the control socket.
+# pylint: disable=import-outside-toplevel
 
-load_dotenv()
 
-# start the giver
-giver = give.Give(os.environ.get('SCREEN_NAME'))
+@lru_cache(maxsize=None)
+def get_server():
+    """Get the Minecraft server actions configured from the environment.
 
-# get ports from environment
-ports = os.environ.get('PORTS')
-assert isinstance(ports, str)
-ports_length = len(ports)
-assert ports_length > 0
-json_ports = json.loads(ports)
-if isinstance(json_ports, str):
-    json_ports = json.loads(json_ports)
-assert isinstance(json_ports, list)
+    Returns
+    -------
+    MinecraftActions
+    """
+    from src.config import load_config
+    from src.minecraft_helpers.server_actions import MinecraftActions
 
-# configure these variables for the Minecraft server
-config = {
-    'java_executable': os.environ.get('JAVA_EXECUTABLE'),
-    'log_level':
-        'debug'
-        if os.environ.get('ENVIRONMENT') == 'development'
-        else 'warning',
-    'ports': json.loads(os.environ.get('PORTS')),
-    'screen_name': os.environ.get('SCREEN_NAME'),
-    'server_file': os.environ.get('SERVER_FILE'),
-    'server_path': os.environ.get('SERVER_PATH'),
-    'stop_timer': os.environ.get('STOP_TIMER'),
-    'server_options': json.loads(os.environ.get('SERVER_OPTIONS'))
-}
+    # configure these variables for the Minecraft server
+    log_level = 'debug' if os.environ.get('ENVIRONMENT') == 'development' \
+        else 'warning'
+    return MinecraftActions(**load_config(), log_level=log_level)
 
-minecraft_server = MinecraftActions(**config)
+
+def get_supervisor():
+    """Get the supervisor that keeps the server running.
+
+    Returns
+    -------
+    Supervisor
+    """
+    from src.minecraft_helpers.supervisor import Supervisor
+
+    return Supervisor(
+        get_server(),
+        date_interval=float(os.environ.get('DATE_INTERVAL', 1800)),
+        check_interval=float(os.environ.get('CHECK_INTERVAL', 5)),
+    )
+
+
+def get_giver():
+    """Get the giver that sends its commands to the server console.
+
+    Returns
+    -------
+    Give
+    """
+    from src.minecraft_helpers.give import Give
+
+    server = get_server()
+    return Give(server.screen.name, server.console)
 
 
 def display_menu():
@@ -52,33 +70,68 @@ check       Check for an existing screen.
 date        Send the current date and time to the screen.
 get         Print the start server command string to the console.
 give        Give an item with enchantments through a menu system.
+ping        Ping the server on every port and print the replies.
+players     Print the names of the players that are online.
+report      Run every status check and print all of the results.
 restart     Stop and start the server.
 screen      Create a new screen.
 status      Check the server status.
 start       Start the server.
 stop        Stop the server.
+supervise   Keep the server running and send the date every half hour.
 verify      Check to see if the server is running and start if not running.
 ================================================================================
 """
     print(options)
 
 
+def forward_action(action: str) -> bool:
+    """Run the action in the supervisor or API process when one is running.
+
+    The running process answers from its own state and caches, which is much
+    faster than checking the system from this process.
+
+    Parameters
+    ----------
+    action : str
+        The name of the action.
+
+    Returns
+    -------
+    bool
+        Whether the action was forwarded.
+    """
+    if action not in FORWARDED:
+        return False
+
+    from src.config import control_socket_path
+    from src.mts_utilities.mts_control import ControlClient, ControlError
+    from src.mts_utilities.mts_control import ControlUnavailable
+
+    client = ControlClient(control_socket_path())
+    try:
+        output = client.call(action)
+    except ControlUnavailable:
+        return False
+    except ControlError as error:
+        sys.exit(f'{action} failed: {error}')
+    print(output)
+    return True
+
+
 def handle_action(action: str):
     """Handle the specified action by calling its corresponding method."""
-    switcher = {
-        'check': minecraft_server.screen.check,
-        'date': minecraft_server.send_date,
-        'get': minecraft_server.get_start_command,
-        'give': giver.prompt_categories,
-        'restart': minecraft_server.restart,
-        'screen': minecraft_server.screen.create,
-        'start': minecraft_server.start,
-        'status': minecraft_server.status,
-        'stop': minecraft_server.stop,
-        'verify': minecraft_server.verify,
-    }
-
-    function_to_call = switcher.get(action, minecraft_server.get_start_command)
+    if forward_action(action):
+        return
+
+    if action == 'give':
+        function_to_call = get_giver().prompt_categories
+    elif action == 'supervise':
+        function_to_call = get_supervisor().run
+    else:
+        server = get_server()
+        function_to_call = server.get_actions().get(action,
+                                                    server.get_start_command)
     output = function_to_call()
     print(output)
 
@@ -0,0 +1,336 @@
+import re
+import threading
+from collections import namedtuple
+
+# event types
+ADVANCEMENT = 'advancement'
+CHAT = 'chat'
+DEATH = 'death'
+DONE = 'done'
+JOIN = 'join'
+LAG = 'lag'
+LEAVE = 'leave'
+SAVED = 'saved'
+# subscribe to this type to receive every event
+ALL = '*'
+
+ConsoleEvent = namedtuple('ConsoleEvent', ['type', 'time', 'data', 'line'])
+
+# `[12:34:56] [Server thread/INFO]: message` or `[12:34:56 INFO]: message`
+PREFIX_PATTERN = re.compile(
+    r'\[(?P<time>[0-9:]+)(?: [A-Z]+)?\]'
+    r'(?: \[(?P<thread>[^\]/]+)/[A-Z]+\])?: (?P<message>.*)'
+)
+CHAT_PATTERN = re.compile(r'<(?P<player>[^>]+)> (?P<message>.*)')
+DONE_PATTERN = re.compile(r'Done \((?P<seconds>[0-9.,]+)s\)! For help')
+LAG_PATTERN = re.compile(r'Running (?P<milliseconds>[0-9]+)ms or '
+                         r'(?P<ticks>[0-9]+) ticks behind')
+PLAYER_PATTERN = re.compile(r'[A-Za-z0-9_]{3,16}')
+# the reply of the `list` command
+LIST_PATTERN = re.compile(r'There are (?P<count>[0-9]+) of a max(?: of)? '
+                          r'(?P<maximum>[0-9]+) players online:(?P<names>.*)')
+
+UNSIGNED = '[Not Secure] '
+JOINED = ' joined the game'
+LEFT = ' left the game'
+ADVANCEMENT_PHRASES = (
+    'has made the advancement [',
+    'has completed the challenge [',
+    'has reached the goal [',
+)
+DEATH_PHRASES = (
+    'was shot', 'was pummeled', 'was pricked', 'walked into', 'drowned',
+    'experienced kinetic energy', 'blew up', 'was blown up', 'was killed',
+    'hit the ground too hard', 'fell', 'was squashed', 'was squished',
+    'went up in flames', 'burned to death', 'was burnt', 'went off with a bang',
+    'tried to swim in lava', 'was struck by lightning',
+    'discovered the floor was lava', 'froze to death', 'was frozen',
+    'was slain', 'was fireballed', 'was stung', 'starved to death',
+    'suffocated in a wall', 'was poked', 'was impaled', 'was skewered',
+    "didn't want to live", 'withered away', 'died', 'was obliterated',
+    'was doomed', 'left the confines of this world', 'was roasted',
+    'was sniped', 'was spitballed', 'was stabbed',
+)
+
+
+def parse_line(line: str):
+    """Parse a line of the server log into an event.
+
+    The prefix of the line is matched once, and the message is dispatched on
+    its first characters before any pattern runs, so most lines that are not
+    events are rejected with a few string comparisons.
+
+    Parameters
+    ----------
+    line : str
+        A line of the server log.
+
+    Returns
+    -------
+    ConsoleEvent|None
+        The event or None when the line is not an event.
+    """
+    prefix = PREFIX_PATTERN.match(line)
+    if prefix is None:
+        return None
+    thread = prefix.group('thread')
+    if thread is not None and thread != 'Server thread':
+        return None
+
+    time = prefix.group('time')
+    message = prefix.group('message')
+    if message.startswith(UNSIGNED):
+        message = message[len(UNSIGNED):]
+    first = message[:1]
+
+    if first == '<':
+        match = CHAT_PATTERN.match(message)
+        if match is None:
+            return None
+        return ConsoleEvent(CHAT, time, match.groupdict(), line)
+
+    if first == 'D' and message.startswith('Done ('):
+        match = DONE_PATTERN.match(message)
+        if match is None:
+            return None
+        seconds = float(match.group('seconds').replace(',', '.'))
+        return ConsoleEvent(DONE, time, {'seconds': seconds}, line)
+
+    if first == 'C' and message.startswith("Can't keep up!"):
+        match = LAG_PATTERN.search(message)
+        data = {} if match is None else {
+            'milliseconds': int(match.group('milliseconds')),
+            'ticks': int(match.group('ticks')),
+        }
+        return ConsoleEvent(LAG, time, data, line)
+
+    if first == 'S' and message.startswith('Saved the '):
+        return ConsoleEvent(SAVED, time, {}, line)
+
+    player, _, rest = message.partition(' ')
+    if rest == '' or PLAYER_PATTERN.fullmatch(player) is None:
+        return None
+
+    if message.endswith(JOINED):
+        return ConsoleEvent(JOIN, time, {'player': player}, line)
+
+    if message.endswith(LEFT):
+        return ConsoleEvent(LEAVE, time, {'player': player}, line)
+
+    if rest.startswith(ADVANCEMENT_PHRASES):
+        advancement = rest[rest.index('[') + 1:].rstrip(']')
+        return ConsoleEvent(ADVANCEMENT, time,
+                            {'player': player, 'advancement': advancement},
+                            line)
+
+    if rest.startswith(DEATH_PHRASES):
+        return ConsoleEvent(DEATH, time, {'player': player, 'message': rest},
+                            line)
+
+    return None
+
+
+def parse_list(reply: str):
+    """Parse the names of the players from the reply of the list command.
+
+    Parameters
+    ----------
+    reply : str
+        The reply, like `There are 2 of a max of 20 players online: A, B`.
+
+    Returns
+    -------
+    list|None
+        The names of the players or None when the reply does not match.
+    """
+    match = LIST_PATTERN.search(reply)
+    if match is None:
+        return None
+    names = match.group('names').strip()
+    if names == '':
+        return []
+    return [name.strip() for name in names.split(',') if name.strip() != '']
+
+
+class ConsoleEventBus:
+    """Parse log lines once and dispatch the events to subscribers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def subscribe(self, event_type: str, callback: callable):
+        """Call the callback with every event of the type.
+
+        Parameters
+        ----------
+        event_type : str
+            The event type, or ALL for every event.
+        callback : callable
+            Function that takes the event.
+        """
+        with self.lock:
+            callbacks = list(self.subscribers.get(event_type, []))
+            callbacks.append(callback)
+            self.subscribers[event_type] = callbacks
+
+    def unsubscribe(self, event_type: str, callback: callable):
+        """Stop calling the callback with events of the type.
+
+        Parameters
+        ----------
+        event_type : str
+        callback : callable
+        """
+        with self.lock:
+            callbacks = [subscriber for subscriber
+                         in self.subscribers.get(event_type, [])
+                         if subscriber != callback]
+            self.subscribers[event_type] = callbacks
+
+    def publish(self, line: str):
+        """Parse the line and dispatch the event, if it is one.
+
+        Parameters
+        ----------
+        line : str
+            A line of the server log.
+
+        Returns
+        -------
+        ConsoleEvent|None
+            The event or None when the line is not an event.
+        """
+        event = parse_line(line)
+        if event is not None:
+            self.dispatch(event)
+        return event
+
+    def dispatch(self, event: ConsoleEvent):
+        """Call the subscribers of the event type and of every event.
+
+        Parameters
+        ----------
+        event : ConsoleEvent
+        """
+        # the lists are replaced rather than changed, so no lock is needed
+        for callback in self.subscribers.get(event.type, ()):
+            callback(event)
+        for callback in self.subscribers.get(ALL, ()):
+            callback(event)
+
+    def attach(self, tailer):
+        """Publish every line that the log tailer reads.
+
+        Parameters
+        ----------
+        tailer : LogTailer
+        """
+        tailer.add_listener(self.publish)
+
+    def detach(self, tailer):
+        """Stop publishing the lines of the log tailer.
+
+        Parameters
+        ----------
+        tailer : LogTailer
+        """
+        tailer.remove_listener(self.publish)
+
+
+class PlayerTracker:
+    """Track the players that are online from the join and leave events.
+
+    The players are only known once the server was seen starting, which means
+    nobody is online, or once the list of players is synced from the `list`
+    command.
+    """
+
+    def __init__(self, bus: ConsoleEventBus = None):
+        self.lock = threading.Lock()
+        self.players = set()
+        self.known = False
+        self.changed = threading.Condition(self.lock)
+        if bus is not None:
+            bus.subscribe(JOIN, self.on_join)
+            bus.subscribe(LEAVE, self.on_leave)
+            bus.subscribe(DONE, self.on_done)
+
+    def on_join(self, event: ConsoleEvent):
+        """Add the player of the event.
+
+        Parameters
+        ----------
+        event : ConsoleEvent
+        """
+        with self.changed:
+            self.players.add(event.data['player'])
+            self.changed.notify_all()
+
+    def on_leave(self, event: ConsoleEvent):
+        """Remove the player of the event.
+
+        Parameters
+        ----------
+        event : ConsoleEvent
+        """
+        with self.changed:
+            self.players.discard(event.data['player'])
+            self.changed.notify_all()
+
+    def on_done(self, event: ConsoleEvent):  # pylint: disable=unused-argument
+        """Forget every player since the server just started.
+
+        Parameters
+        ----------
+        event : ConsoleEvent
+        """
+        self.sync([])
+
+    def sync(self, players: list):
+        """Replace the players with a known list.
+
+        Parameters
+        ----------
+        players : list
+            The names of the players that are online.
+        """
+        with self.changed:
+            self.players = set(players)
+            self.known = True
+            self.changed.notify_all()
+
+    def online(self):
+        """Get the players that are online.
+
+        Returns
+        -------
+        list|None
+            The sorted names or None when the players are not known.
+        """
+        with self.lock:
+            if not self.known:
+                return None
+            return sorted(self.players)
+
+    def count(self):
+        """Get the number of players that are online.
+
+        Returns
+        -------
+        int|None
+            The number or None when the players are not known.
+        """
+        with self.lock:
+            return len(self.players) if self.known else None
+
+    def wait_for_change(self, timeout: float):
+        """Wait for a player to join or leave.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait at most.
+        """
+        with self.changed:
+            self.changed.wait(timeout)
@@ -0,0 +1,648 @@
+"""A lightweight stand-in for the Minecraft server.
+
+It behaves like the server where the helpers can see it: it writes a
+realistic `logs/latest.log`, listens on the server port and answers the
+server list ping, serves RCON and the query protocol when `server.properties`
+enables them, and reads console commands from stdin. Point the Java
+executable at `src/benchmarks/fakes/java` to start it with
+`MinecraftActions`, or run `python3 -m src.minecraft_helpers.fake_server`.
+
+Besides a few vanilla commands, the console takes `fake join <name>`,
+`fake leave <name>`, `fake chat <name> <message>`, `fake lag <ms>` and
+`fake crash` to simulate what players and the server do.
+"""
+import itertools
+import json
+import os
+import random
+import signal
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+from ..mts_utilities.mts_query import (KEYS_HEADER, MAGIC, PLAYERS_HEADER,
+                                       TYPE_HANDSHAKE, TYPE_STAT)
+from ..mts_utilities.mts_rcon import (MAX_FRAGMENT, SERVERDATA_AUTH,
+                                      SERVERDATA_AUTH_RESPONSE,
+                                      SERVERDATA_EXECCOMMAND,
+                                      SERVERDATA_RESPONSE_VALUE,
+                                      UNKNOWN_REQUEST)
+from ..mts_utilities.mts_status import (pack_packet, pack_varint,
+                                        read_packet, read_varint)
+
+VERSION = '1.20.1'
+PROTOCOL = 763
+# the server changes the challenge token of the query protocol this often
+TOKEN_TTL = 30
+DEFAULT_PROPERTIES = {
+    'server-ip': '',
+    'server-port': '25565',
+    'motd': 'A Minecraft Server',
+    'max-players': '20',
+    'level-name': 'world',
+    'enable-rcon': 'false',
+    'rcon.port': '25575',
+    'rcon.password': '',
+    'enable-query': 'false',
+    'query.port': '',
+}
+
+
+def read_properties(path: str) -> dict:
+    """Read a `server.properties` file.
+
+    Parameters
+    ----------
+    path : str
+
+    Returns
+    -------
+    dict
+        The properties, or an empty dict when the file does not exist.
+    """
+    properties = {}
+    try:
+        with open(path) as handle:
+            for line in handle:
+                line = line.strip()
+                if line == '' or line.startswith('#'):
+                    continue
+                key, _, value = line.partition('=')
+                properties[key.strip()] = value.strip()
+    except FileNotFoundError:
+        pass
+    return properties
+
+
+class GameRequestHandler(socketserver.StreamRequestHandler):
+    """Answer the server list ping and turn away players that log in."""
+
+    def handle(self):
+        try:
+            packet_id, payload = read_packet(self.rfile)
+            if packet_id != 0:
+                return
+            read_varint(payload)
+            payload.read(read_varint(payload) + 2)
+            if read_varint(payload) == 2:
+                self.reply(0, {'text': 'This is not a real server.'})
+                return
+            while True:
+                packet_id, payload = read_packet(self.rfile)
+                if packet_id == 0:
+                    self.reply(0, self.server.fake.status())
+                elif packet_id == 1:
+                    self.wfile.write(pack_packet(1, payload.read()))
+                    return
+        except (OSError, ValueError):
+            pass
+
+    def reply(self, packet_id: int, message: dict):
+        """Write a packet that holds the message as a JSON string.
+
+        Parameters
+        ----------
+        packet_id : int
+        message : dict
+        """
+        data = json.dumps(message).encode('utf-8')
+        self.wfile.write(pack_packet(packet_id, pack_varint(len(data)) + data))
+
+
+class RconRequestHandler(socketserver.StreamRequestHandler):
+    """Run the console commands of an RCON connection."""
+
+    def handle(self):
+        authenticated = False
+        try:
+            while True:
+                request_id, packet_type, body = self.read()
+                if packet_type == SERVERDATA_AUTH:
+                    authenticated = \
+                        body == self.server.fake.properties['rcon.password']
+                    self.write(request_id if authenticated else -1,
+                               SERVERDATA_AUTH_RESPONSE, b'')
+                elif not authenticated:
+                    return
+                elif packet_type == SERVERDATA_EXECCOMMAND:
+                    output = self.server.fake.execute(body).encode('utf-8')
+                    # a fragment shorter than the maximum ends the response
+                    for start in range(0, len(output) + 1, MAX_FRAGMENT):
+                        self.write(request_id, SERVERDATA_RESPONSE_VALUE,
+                                   output[start:start + MAX_FRAGMENT])
+                else:
+                    self.write(UNKNOWN_REQUEST, SERVERDATA_RESPONSE_VALUE,
+                               f'Unknown request {packet_type:x}'
+                               .encode('utf-8'))
+        except (OSError, struct.error):
+            pass
+
+    def read(self) -> tuple:
+        """Read a packet.
+
+        Returns
+        -------
+        tuple
+            The request ID, the type and the body of the packet.
+        """
+        header = self.rfile.read(4)
+        if len(header) < 4:
+            raise ConnectionError('The client closed the connection.')
+        length = struct.unpack('<i', header)[0]
+        payload = self.rfile.read(length)
+        if len(payload) < length or length < 10:
+            raise ConnectionError('The client closed the connection.')
+        request_id, packet_type = struct.unpack('<ii', payload[:8])
+        body = payload[8:].rstrip(b'\x00').decode('utf-8', 'replace')
+        return request_id, packet_type, body
+
+    def write(self, request_id: int, packet_type: int, body: bytes):
+        """Write a packet.
+
+        Parameters
+        ----------
+        request_id : int
+        packet_type : int
+        body : bytes
+        """
+        payload = struct.pack('<ii', request_id, packet_type) + body \
+            + b'\x00\x00'
+        self.wfile.write(struct.pack('<i', len(payload)) + payload)
+
+
+class QueryRequestHandler(socketserver.BaseRequestHandler):
+    """Answer a datagram of the query protocol."""
+
+    def handle(self):
+        data, connection = self.request
+        if len(data) < 7 or data[:2] != MAGIC:
+            return
+        packet_type, session = data[2], data[3:7]
+        fake = self.server.fake
+        if packet_type == TYPE_HANDSHAKE:
+            reply = str(fake.token()).encode('ascii') + b'\x00'
+        elif packet_type == TYPE_STAT and len(data) >= 11:
+            # requests with an expired token go unanswered
+            if struct.unpack('>i', data[7:11])[0] != fake.token():
+                return
+            reply = fake.full_stat() if len(data) >= 15 else fake.basic_stat()
+        else:
+            return
+        connection.sendto(bytes([packet_type]) + session + reply,
+                          self.client_address)
+
+
+class GameServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Listen on a TCP port of the fake server."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: tuple, handler, fake):
+        self.fake = fake
+        super().__init__(address, handler)
+
+
+class QueryServer(socketserver.UDPServer):
+    """Listen on the UDP port of the query protocol."""
+
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple, fake):
+        self.fake = fake
+        super().__init__(address, QueryRequestHandler)
+
+
+class FakeServer:
+    """Simulate a Minecraft server in the given directory.
+
+    The properties are read from `server.properties` in the directory, and
+    the given ones replace them. A port of 0 listens on a free port, which is
+    stored in `port`, `rcon_port` and `query_port` once the server started.
+    """
+
+    def __init__(self, directory: str = '.', properties: dict = None,
+                 startup: float = 0.1, shutdown: float = 0.05,
+                 ports: list = None, output=None, version: str = VERSION):
+        self.directory = directory
+        self.properties = {
+            **DEFAULT_PROPERTIES,
+            **read_properties(os.path.join(directory, 'server.properties')),
+            **(properties or {}),
+        }
+        self.startup = startup
+        self.shutdown = shutdown
+        self.extra_ports = ports or []
+        self.output = output
+        self.version = version
+        self.players = []
+        self.entity_ids = itertools.count(100)
+        self.lock = threading.Lock()
+        self.log = None
+        self.servers = []
+        self.port = None
+        self.rcon_port = None
+        self.query_port = None
+        self.challenge = (0, 0)
+        self.ready = threading.Event()
+        self.stopping = threading.Event()
+        self.crashed = False
+
+    def write(self, message: str, level: str = 'INFO',
+              thread: str = 'Server thread'):
+        """Write a line to the log and the output.
+
+        Parameters
+        ----------
+        message : str
+        level : str
+        thread : str
+        """
+        line = f'[{time.strftime("%H:%M:%S")}] [{thread}/{level}]: {message}\n'
+        with self.lock:
+            if self.log is not None:
+                self.log.write(line)
+                self.log.flush()
+            if self.output is not None:
+                self.output.write(line)
+                self.output.flush()
+
+    def listen(self, port: int, server_class, *args):
+        """Serve a port in the background.
+
+        Parameters
+        ----------
+        port : int
+        server_class
+            GameServer with its handler, or QueryServer.
+        args
+            The arguments of the server class before the fake server.
+
+        Returns
+        -------
+        int
+            The port that is listened on.
+        """
+        address = (self.properties['server-ip'], int(port))
+        server = server_class(address, *args, self)
+        self.servers.append(server)
+        threading.Thread(target=server.serve_forever, args=(0.05,),
+                         daemon=True,
+                         name=f'fake-{server_class.__name__}').start()
+        return server.server_address[1]
+
+    def start(self):
+        """Write the startup to the log, listen and wait for the startup
+        time before logging that the server is done."""
+        started = time.monotonic()
+        os.makedirs(os.path.join(self.directory, 'logs'), exist_ok=True)
+        self.log = open(os.path.join(self.directory, 'logs', 'latest.log'),
+                        'w')
+        self.write(f'Starting minecraft server version {self.version}')
+        self.write('Loading properties')
+        self.write('Default game type: SURVIVAL')
+        self.write('Generating keypair')
+        self.port = self.listen(self.properties['server-port'], GameServer,
+                                GameRequestHandler)
+        self.write(f'Starting Minecraft server on '
+                   f'{self.properties["server-ip"] or "*"}:{self.port}')
+        for port in self.extra_ports:
+            self.listen(port, GameServer, GameRequestHandler)
+        level = self.properties['level-name']
+        self.write(f'Preparing level "{level}"')
+        self.write('Preparing start region for dimension minecraft:overworld')
+        time.sleep(self.startup)
+        self.write('Preparing spawn area: 100%', thread='Worker-Main-1')
+        elapsed = time.monotonic() - started
+        self.write(f'Time elapsed: {int(elapsed * 1000)} ms')
+        self.write(f'Done ({elapsed:.3f}s)! For help, type "help"')
+
+        if self.properties['enable-rcon'] == 'true':
+            if self.properties['rcon.password'] == '':
+                self.write('No rcon password set in server.properties, rcon '
+                           'disabled!', 'WARN')
+            else:
+                self.write('Starting remote control listener')
+                self.rcon_port = self.listen(self.properties['rcon.port'],
+                                             GameServer, RconRequestHandler)
+                self.write('Thread RCON Listener started',
+                           thread='RCON Listener #1')
+                self.write(f'RCON running on 0.0.0.0:{self.rcon_port}')
+        if self.properties['enable-query'] == 'true':
+            self.write('Starting GS4 status listener')
+            self.query_port = self.listen(
+                self.properties['query.port'] or self.port, QueryServer)
+            self.write('Thread Query Listener started',
+                       thread='Query Listener #1')
+        self.ready.set()
+
+    def run(self, commands) -> int:
+        """Start, run the console commands and stop when told to.
+
+        Parameters
+        ----------
+        commands : iterable
+            The lines of the console, like stdin.
+
+        Returns
+        -------
+        int
+            The exit code of the server, 1 after `fake crash`.
+        """
+        self.start()
+
+        def read():
+            for command in commands:
+                self.execute(command)
+                if self.stopping.is_set():
+                    return
+
+        threading.Thread(target=read, daemon=True,
+                         name='fake-console').start()
+        # wake up now and then, so signal handlers can run
+        while not self.stopping.wait(0.5):
+            pass
+        self.close()
+        return 1 if self.crashed else 0
+
+    def close(self):
+        """Disconnect the players, save and stop listening."""
+        if self.crashed:
+            self.write('Encountered an unexpected exception', 'ERROR')
+        else:
+            self.write('Stopping server')
+            for name in list(self.players):
+                self.leave(name, 'Server closed')
+            self.write('Saving players')
+            self.write('Saving worlds')
+            time.sleep(self.shutdown)
+            level = self.properties['level-name']
+            self.write(f"Saving chunks for level 'ServerLevel[{level}]'/"
+                       f'minecraft:overworld')
+            self.write(f'ThreadedAnvilChunkStorage ({level}): All chunks '
+                       f'are saved')
+            self.write('ThreadedAnvilChunkStorage: All dimensions are saved')
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        with self.lock:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+
+    def execute(self, command: str) -> str:
+        """Run a console command.
+
+        Parameters
+        ----------
+        command : str
+
+        Returns
+        -------
+        str
+            The output of the command, as RCON returns it.
+        """
+        name, _, rest = command.strip().lstrip('/').partition(' ')
+        if name == '':
+            return ''
+        if name == 'stop':
+            self.write('Stopping the server')
+            self.stopping.set()
+            return 'Stopping the server'
+        if name == 'list':
+            with self.lock:
+                players = list(self.players)
+            output = f'There are {len(players)} of a max of ' \
+                     f'{self.properties["max-players"]} players online: ' \
+                     + ', '.join(players)
+            self.write(output)
+            return output
+        if name == 'say':
+            self.write(f'[Server] {rest}')
+            return ''
+        if name == 'save-all':
+            self.write('Saving the game (this may take a moment!)')
+            self.write('Saved the game')
+            return 'Saving the game (this may take a moment!)Saved the game'
+        if name == 'fake':
+            return self.simulate(rest)
+        output = 'Unknown or incomplete command, see below for error'
+        self.write(output)
+        return output
+
+    def simulate(self, command: str) -> str:
+        """Run a `fake` console command.
+
+        Parameters
+        ----------
+        command : str
+            The command after `fake`.
+
+        Returns
+        -------
+        str
+        """
+        action, _, argument = command.partition(' ')
+        if action == 'join' and argument != '':
+            self.join(argument)
+        elif action == 'leave' and argument != '':
+            self.leave(argument)
+        elif action == 'chat' and ' ' in argument:
+            self.write('<{}> {}'.format(*argument.split(' ', 1)))
+        elif action == 'lag' and argument.isdigit():
+            self.lag(int(argument))
+        elif action == 'crash':
+            self.crashed = True
+            self.stopping.set()
+        else:
+            return f'Unknown fake command: {command}'
+        return ''
+
+    def join(self, name: str):
+        """Log in a player.
+
+        Parameters
+        ----------
+        name : str
+        """
+        with self.lock:
+            if name in self.players:
+                return
+            self.players.append(name)
+        address = f'127.0.0.1:{random.randint(40000, 60000)}'
+        self.write(f'{name}[/{address}] logged in with entity id '
+                   f'{next(self.entity_ids)} at (0.5, 64.0, 0.5)')
+        self.write(f'{name} joined the game')
+
+    def leave(self, name: str, reason: str = 'Disconnected'):
+        """Disconnect a player.
+
+        Parameters
+        ----------
+        name : str
+        reason : str
+        """
+        with self.lock:
+            if name not in self.players:
+                return
+            self.players.remove(name)
+        self.write(f'{name} lost connection: {reason}')
+        self.write(f'{name} left the game')
+
+    def lag(self, milliseconds: int):
+        """Warn that the server falls behind.
+
+        Parameters
+        ----------
+        milliseconds : int
+        """
+        self.write(f"Can't keep up! Is the server overloaded? Running "
+                   f'{milliseconds}ms or {milliseconds // 50} ticks behind',
+                   'WARN')
+
+    def status(self) -> dict:
+        """Get the reply to the server list ping.
+
+        Returns
+        -------
+        dict
+        """
+        with self.lock:
+            players = list(self.players)
+        return {
+            'version': {'name': self.version, 'protocol': PROTOCOL},
+            'players': {
+                'max': int(self.properties['max-players']),
+                'online': len(players),
+                'sample': [{'name': name, 'id': '00000000-0000-0000-0000-'
+                                                f'{index:012d}'}
+                           for index, name in enumerate(players[:12])],
+            },
+            'description': {'text': self.properties['motd']},
+        }
+
+    def token(self) -> int:
+        """Get the current challenge token of the query protocol.
+
+        Returns
+        -------
+        int
+        """
+        with self.lock:
+            token, created = self.challenge
+            if token == 0 or time.monotonic() - created > TOKEN_TTL:
+                token = random.randint(1, 2 ** 31 - 1)
+                self.challenge = (token, time.monotonic())
+            return token
+
+    def basic_stat(self) -> bytes:
+        """Get the reply to a basic stat request.
+
+        Returns
+        -------
+        bytes
+        """
+        with self.lock:
+            online = len(self.players)
+        fields = [self.properties['motd'], 'SMP',
+                  self.properties['level-name'], str(online),
+                  self.properties['max-players']]
+        return b''.join(field.encode('utf-8') + b'\x00' for field in fields) \
+            + struct.pack('<H', self.port) + b'127.0.0.1\x00'
+
+    def full_stat(self) -> bytes:
+        """Get the reply to a full stat request.
+
+        Returns
+        -------
+        bytes
+        """
+        with self.lock:
+            players = list(self.players)
+        info = {
+            'hostname': self.properties['motd'],
+            'gametype': 'SMP',
+            'game_id': 'MINECRAFT',
+            'version': self.version,
+            'plugins': '',
+            'map': self.properties['level-name'],
+            'numplayers': str(len(players)),
+            'maxplayers': self.properties['max-players'],
+            'hostport': str(self.port),
+            'hostip': '127.0.0.1',
+        }
+        keys = b''.join(f'{key}\x00{value}\x00'.encode('utf-8')
+                        for key, value in info.items())
+        names = b''.join(name.encode('utf-8') + b'\x00' for name in players)
+        return KEYS_HEADER + keys + b'\x00' + PLAYERS_HEADER + names + b'\x00'
+
+
+def follow(path: str, stopping: threading.Event):
+    """Yield the lines that are appended to the file.
+
+    Parameters
+    ----------
+    path : str
+    stopping : threading.Event
+        Ends the lines when it is set.
+
+    Yields
+    ------
+    str
+    """
+    with open(path) as handle:
+        while not stopping.is_set():
+            line = handle.readline()
+            if line == '':
+                time.sleep(0.01)
+                continue
+            yield line
+
+
+def main(argv: list) -> int:
+    """Run the fake server in the working directory.
+
+    The arguments of Java, like `-Xmx1G -jar server.jar nogui`, are ignored.
+    FAKE_STARTUP and FAKE_SHUTDOWN are the seconds to start and stop,
+    FAKE_PORTS holds more ports to listen on, separated by commas, and
+    FAKE_PLAYERS the names of players that join once the server is done.
+    Console commands come from stdin, or from the FAKE_CONSOLE file when it
+    is set. The server stops with the `stop` command or SIGTERM.
+
+    Parameters
+    ----------
+    argv : list
+
+    Returns
+    -------
+    int
+        The exit code of the server.
+    """
+    del argv
+    server = FakeServer(
+        startup=float(os.environ.get('FAKE_STARTUP', 0.1)),
+        shutdown=float(os.environ.get('FAKE_SHUTDOWN', 0.05)),
+        ports=[int(port) for port
+               in filter(None, os.environ.get('FAKE_PORTS', '').split(','))],
+        output=sys.stdout,
+    )
+    console = os.environ.get('FAKE_CONSOLE')
+    commands = sys.stdin if console is None \
+        else follow(console, server.stopping)
+
+    def arrive():
+        server.ready.wait()
+        for name in filter(None, os.environ.get('FAKE_PLAYERS', '')
+                           .split(',')):
+            server.join(name)
+
+    threading.Thread(target=arrive, daemon=True).start()
+    # like the real server, stop and save when terminated
+    signal.signal(signal.SIGTERM, lambda number, frame: server.stopping.set())
+    return server.run(commands)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
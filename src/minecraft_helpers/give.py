@@ -20,6 +20,11 @@ class Give:
     extra = ['elytra', 'shield', 'fishing_rod']
     all_items = [*armor, *tools, *weapons, *extra]
     pointy_items = ['sword', 'axe']
+    # items that are made of a material, like diamond_sword
+    material_items = ['sword', 'helmet', 'chestplate', 'leggings', 'boots',
+                      'pickaxe', 'shovel', 'axe', 'hoe']
+    # item IDs that differ from the names listed by the prompt
+    item_ids = {'turtle_shell': 'turtle_helmet'}
 
     # These are the available enchantments and their enchantable items.
     enchantments = {
@@ -262,9 +267,11 @@ class Give:
     selected_tool = None
     selected_weapon = None
 
-    def __init__(self, screen_name: str = 'minecraft'):
+    def __init__(self, screen_name: str = 'minecraft', transport=None):
         self.screen_name = screen_name
         self.screen = ScreenActions(screen_name)
+        # the console receives the commands, which is the screen by default
+        self.console = self.screen if transport is None else transport
 
     def display_prompt(self, values: list):
         """Display a prompt with the passed values and sets the input value.
@@ -347,6 +354,113 @@ class Give:
         self.list_enchantments(self.selected_other)
 
     def send_command(self):
-        """Send the command to the screen instance."""
+        """Send the command to the console."""
         # send variables (screen_name, command) to the command string
-        self.screen.send(self.command)
+        self.console.send(self.command)
+
+    def send_commands(self, commands: list, delay: float = 0) -> list:
+        """Send several commands to the console at once.
+
+        This is meant for bulk gives, where the console only gets checked once
+        for all of the commands.
+
+        Parameters
+        ----------
+        commands : list
+            Commands to send, in order.
+        delay : float
+            Seconds to wait between two commands.
+
+        Returns
+        -------
+        list
+            The result for each command.
+        """
+        return self.console.send_many(commands, delay)
+
+    def get_give_command(self, item: str, player: str = '@p',
+                         enchantments: list = None,
+                         material: str = 'diamond') -> str:
+        """Get the give command for the item.
+
+        Parameters
+        ----------
+        item : str
+            Item as listed by the prompt.
+        player : str
+            Name of the player or a target selector.
+        enchantments : list
+            Names of the enchantments, which are added at their maximum level.
+        material : str
+            Material of the items that need one.
+
+        Returns
+        -------
+        str
+            The give command without the leading slash.
+        """
+        item_id = self.item_ids.get(item, item)
+        if item in self.material_items:
+            item_id = f'{material}_{item_id}'
+
+        tag = ''
+        if enchantments:
+            levels = [f'{{id:"minecraft:{self.enchantments[name]["id"]}",'
+                      f'lvl:{self.enchantments[name]["lvl"]}s}}'
+                      for name in enchantments]
+            tag = f'{{Enchantments:[{",".join(levels)}]}}'
+        return f'give {player} minecraft:{item_id}{tag} 1'
+
+    def give_items(self, items: list, player: str = '@p',
+                   material: str = 'diamond', delay: float = 0) -> list:
+        """Give several items to the player with one batch of commands.
+
+        Parameters
+        ----------
+        items : list
+            Items as listed by the prompt, in the order to give them.
+        player : str
+            Name of the player or a target selector.
+        material : str
+            Material of the items that need one.
+        delay : float
+            Seconds to wait between two commands.
+
+        Returns
+        -------
+        list
+            The result for each item, which is the result of the whole batch
+            when the console types it at once, like `ScreenActions.send_many`.
+        """
+        commands = [self.get_give_command(item, player, material=material)
+                    for item in items]
+        return self.send_commands(commands, delay)
+
+    def give_category(self, category: str, player: str = '@p',
+                      material: str = 'diamond') -> list:
+        """Give every item of a category to the player, like a set of armor.
+
+        Parameters
+        ----------
+        category : str
+            One of the categories listed by the prompt.
+        player : str
+            Name of the player or a target selector.
+        material : str
+            Material of the items that need one.
+
+        Returns
+        -------
+        list
+            The result for each item, like `give_items`.
+        """
+        switcher = {
+            'weapon': self.weapons,
+            # one piece for each slot
+            'armor': ['helmet', 'chestplate', 'leggings', 'boots'],
+            'tools': self.tools,
+            'other': self.extra,
+        }
+        if category not in switcher:
+            raise ValueError(f'unknown category {category}')
+        return self.give_items(switcher[category], player, material)
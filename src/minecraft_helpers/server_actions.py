@@ -1,24 +1,63 @@
+import os
+import re
 import subprocess
 import time
 from datetime import datetime
 
 import mtslogger
 
+from src.config import DEFAULT_JAVA_EXECUTABLE, DEFAULT_SCREEN_NAME
+from src.config import DEFAULT_SERVER_FILE, DEFAULT_SERVER_PATH
+from src.config import DEFAULT_STOP_TIMER, runtime_path
+from src.minecraft_helpers.console_events import DONE, LAG, ConsoleEventBus
+from src.minecraft_helpers.console_events import PlayerTracker, parse_line
+from src.minecraft_helpers.console_events import parse_list
+from src.mts_utilities.mts_cache import TtlCache
+from src.mts_utilities.mts_console import ConsoleClient
+from src.mts_utilities.mts_console import launch as launch_console
 from src.mts_utilities.mts_helpers import get_command_path
+from src.mts_utilities.mts_log import LogFollower, LogTailer
+from src.mts_utilities.mts_metrics import registry
+from src.mts_utilities.mts_process import terminate, wait_for_exit
+from src.mts_utilities.mts_query import QueryClient, QueryError
+from src.mts_utilities.mts_rcon import RconActions
 from src.mts_utilities.mts_screen import ScreenActions
-from src.mts_utilities.mts_status import StatusChecker
+from src.mts_utilities.mts_state import RUNNING, STARTING, STOPPED, STOPPING
+from src.mts_utilities.mts_state import SharedState
+from src.mts_utilities.mts_status import ServerPing, StatusChecker
+
+
+# lines logged when the server fails while starting
+CRASH_PATTERNS = [
+    re.compile(r'Failed to start the minecraft server'),
+    re.compile(r'FAILED TO BIND TO PORT'),
+    re.compile(r'Encountered an unexpected exception'),
+    re.compile(r'This crash report has been saved to'),
+]
 
 
 class MinecraftActions:
     """Handle actions for the Minecraft server."""
 
-    # do not configure below this line
-    starting = False
-
-    def __init__(self, screen_name='minecraft', log_level='info',
-                 server_path='/usr/games/minecraft',
-                 server_file='minecraft_server.jar', stop_timer=30,
-                 java_executable='/bin/java', server_options=None, ports=None):
+    # seconds for the server process to show up after the start command
+    launch_grace = 10
+    # seconds for the stop command to finish after the stop timer
+    stop_grace = 120
+    # seconds left on the stop timer when the players get reminded
+    reminders = [600, 300, 120, 60, 30, 10, 5]
+
+    def __init__(self, screen_name=DEFAULT_SCREEN_NAME, log_level='info',
+                 server_path=DEFAULT_SERVER_PATH,
+                 server_file=DEFAULT_SERVER_FILE,
+                 stop_timer=DEFAULT_STOP_TIMER,
+                 java_executable=DEFAULT_JAVA_EXECUTABLE, server_options=None,
+                 ports=None,
+                 status_ttl=2, transport='screen', rcon_host='127.0.0.1',
+                 rcon_port=25575, rcon_password='', start_timeout=300,
+                 state_file=None, stop_mode='players', stop_timeout=60,
+                 kill_timeout=10, backend='screen', console_socket=None,
+                 control_socket=None, server_host='127.0.0.1',
+                 ping_timeout=1, query_port=None, query_timeout=1):
         if ports is None:
             ports = []
         if server_options is None:
@@ -28,19 +67,71 @@ class MinecraftActions:
 
         # set the instance properties from the keyword arguments
         self.ports = ports if len(ports) > 0 else [25565]
+        self.server_host = server_host
+        self.ping_timeout = float(ping_timeout)
         self.server_options = server_options
         self.server_path = server_path
         self.server_file = server_file
-        self.stop_timer = stop_timer
+        self.stop_timer = int(float(stop_timer))
+        self.stop_mode = stop_mode
+        self.stop_timeout = float(stop_timeout)
+        self.kill_timeout = float(kill_timeout)
+        self.start_timeout = float(start_timeout)
         self.java_executable = java_executable
+        self.log_file = os.path.join(server_path, 'logs', 'latest.log')
+
+        # cache the status checks for a short time to spare repeated probes
+        self.status_ttl = float(status_ttl)
+        self.cache = TtlCache(status_ttl)
+
+        # share the lifecycle state and the probe results between processes
+        if state_file is None:
+            state_file = runtime_path(screen_name, 'db')
+        self.state = SharedState(state_file)
 
         # get the screen
-        self.screen = ScreenActions(name=screen_name, logger=self.logger)
+        self.screen = ScreenActions(name=screen_name, logger=self.logger,
+                                    ttl=status_ttl)
+
+        # get the host of the server process, which is the screen session or
+        # a console host that owns the process and shares it over a socket
+        self.backend = backend
+        if console_socket is None:
+            console_socket = runtime_path(screen_name, 'sock')
+        self.console_socket = console_socket
+
+        # the socket of the process that serves actions to the command line
+        if control_socket is None:
+            control_socket = runtime_path(screen_name, 'control.sock')
+        self.control_socket = control_socket
+        if backend == 'process':
+            self.host = ConsoleClient(console_socket, logger=self.logger)
+        else:
+            self.host = self.screen
+
+        # get the console for sending commands to the running server
+        if transport == 'rcon':
+            self.console = RconActions(host=rcon_host, port=rcon_port,
+                                       password=rcon_password,
+                                       logger=self.logger)
+        else:
+            self.console = self.host
+
+        # get the query client, which lists the players without the console
+        self.query_client = QueryClient(
+            server_host, query_port if query_port else self.ports[0],
+            timeout=float(query_timeout))
 
         # get the status checker
         self.status_checker = StatusChecker()
         self.status_checker.logger = self.logger
 
+        # parse the server log into events once for every subscriber
+        self.events = ConsoleEventBus()
+        self.tracker = PlayerTracker(self.events)
+        self.events.subscribe(LAG, self.on_lag)
+        self.tailer = None
+
     def get_date(self) -> str:
         """Get the current date in a readable format.
 
@@ -69,23 +160,98 @@ class MinecraftActions:
         """
         self.logger.info('get_start_command')
 
+        args = self.get_start_args()
+        if len(args) == 0:
+            return ''
+
+        command = ' '.join(args)
+        self.logger.debug(f'command is {command}')
+        return command
+
+    def get_start_args(self) -> list:
+        """Get the Java server command as a list of arguments.
+
+        This is the command of `get_start_command` for running the server
+        without a shell.
+
+        Returns
+        -------
+        list
+            The arguments, which are empty when Java cannot be found.
+        """
         try:
             path_java = get_command_path(self.java_executable)
         except subprocess.CalledProcessError as error:
             self.logger.error(f'{str(error.returncode)}: {error.stdout}')
-            return ''
+            return []
 
-        command = path_java + ' ' + ' '.join(self.server_options) + ' -jar ' \
-            + self.server_path + self.server_file + ' nogui'
-        self.logger.debug(f'command is {command}')
-        return command
+        return [path_java, *self.server_options, '-jar',
+                self.server_path + self.server_file, 'nogui']
+
+    def get_actions(self) -> dict:
+        """Get the actions that a running process can serve to others.
+
+        Returns
+        -------
+        dict
+            The names of the actions with functions that take no arguments.
+        """
+        return {
+            'check': self.host.check,
+            'date': self.send_date,
+            'get': self.get_start_command,
+            'ping': self.ping,
+            'players': self.players,
+            'report': self.report,
+            'restart': self.restart,
+            'screen': self.screen.create,
+            'start': self.start,
+            'status': self.status,
+            'stop': self.stop,
+            'verify': self.verify,
+        }
+
+    def on_lag(self, event):
+        """Log a warning when the server cannot keep up.
+
+        Parameters
+        ----------
+        event : ConsoleEvent
+        """
+        self.logger.warning(f'server is overloaded: {event.data}')
+
+    def watch_console(self, tailer: LogTailer = None) -> LogTailer:
+        """Publish the events of the server log as it is written.
+
+        This keeps the player tracker up to date and logs lag warnings. The
+        log is read by the given tailer, so it can be shared with other
+        readers, or by a new one.
+
+        Parameters
+        ----------
+        tailer : LogTailer
+            The tailer of the server log.
 
+        Returns
+        -------
+        LogTailer
+            The tailer that reads the server log.
+        """
+        self.logger.info('watch_console')
+        if self.tailer is not None:
+            self.events.detach(self.tailer)
+        self.tailer = tailer if tailer is not None \
+            else LogTailer(self.log_file, logger=self.logger)
+        self.events.attach(self.tailer)
+        return self.tailer
+
+    @registry.timed('action_seconds', action='restart')
     def restart(self) -> bool:
         """Restart the server by calling stop and then start.
 
-        This is an alias for calling both stop and start. Since both stop and
-        start have their own checks, this is safe to call without any other
-        validation.
+        This is an alias for calling both stop and start. Since stop waits for
+        the server process to exit and both stop and start have their own
+        checks, this is safe to call without any other validation.
 
         Returns
         -------
@@ -93,10 +259,9 @@ class MinecraftActions:
             Stopped and started results
         """
         self.logger.info('restart')
+        self.invalidate()
         stopped = self.stop()
         if stopped:
-            self.logger.debug('waiting to give status a chance to catch up')
-            time.sleep(5)
             started = self.start()
             if started is False:
                 self.logger.warning('failed to start the server')
@@ -107,6 +272,17 @@ class MinecraftActions:
             started = False
         return stopped and started
 
+    def invalidate(self):
+        """Discard the cached server and screen status.
+
+        This is called whenever an action changes the state of the server, so
+        the next status check probes the system again.
+        """
+        self.logger.debug('invalidating the cached status')
+        self.cache.invalidate()
+        self.screen.cache.invalidate()
+        self.state.forget_probe('status')
+
     def send_date(self):
         """Send the current date and time to all logged-in players.
 
@@ -116,15 +292,24 @@ class MinecraftActions:
         this safe to call without validation.
         """
         self.logger.info('send_date')
-        message = 'Current time: ' + self.get_date()
+        message = self.get_date_message()
         self.logger.debug(message)
         self.send_message(message)
 
+    def get_date_message(self) -> str:
+        """Get the message that tells the players the date and time.
+
+        Returns
+        -------
+        str
+        """
+        return 'Current time: ' + self.get_date()
+
     def send_message(self, message: str):
         """Send a message to the game's chat for all logged-in players to see.
 
         This takes the message and appends it to the say command, then sends
-        that to the screen. This method cannot be called with a command line
+        that to the console. This method cannot be called with a command line
         parameter.
 
         Parameters
@@ -133,18 +318,21 @@ class MinecraftActions:
             Message to display to all users currently in the game.
         """
         self.logger.info(f'send_message({message})')
-        result = self.screen.send(f'say {message}')
+        result = self.console.send(f'say {message}')
         if result is not False:
-            self.logger.debug('done sending screen command')
+            self.logger.debug('done sending console command')
 
+    @registry.timed('action_seconds', action='start')
     def start(self) -> bool:
         """Start the Minecraft server.
 
         This checks to see if the server is already running or starting and
-        returns if either is true. If the server needs to start, the starting
-        flag changes, the screen's directory changes to the server path, and the
-        starting command gets pulled and sent to the screen, finally updating
-        the starting flag. This has validation and is safe.
+        returns if either is true. If the server needs to start, the shared
+        state changes to starting, which only one process can do at a time, the
+        screen's directory changes to the server path, and the starting command
+        gets pulled and sent to the screen. The server log is followed until the
+        server is done loading, crashes or takes longer than the start timeout,
+        finally updating the shared state. This has validation and is safe.
 
         Returns
         -------
@@ -152,84 +340,356 @@ class MinecraftActions:
             Did the server start successfully.
         """
         self.logger.info('start')
+        self.invalidate()
 
-        if self.screen.check() is False:
+        if self.backend == 'screen' and self.screen.check() is False:
             self.logger.warning('screen is not on')
             return False
 
         if self.status():
+            if self.stopping:
+                self.logger.warning('server is stopping and cannot be started')
+                return False
             self.logger.debug('server is already running')
+            self.state.transition((STOPPED,), RUNNING)
             return True
 
-        if self.starting:
-            self.logger.debug('server is starting')
-            return True
-
-        self.starting = True
+        if not self.state.transition((STOPPED, RUNNING), STARTING,
+                                     stale_after=self.start_timeout):
+            self.logger.debug('server is starting or stopping')
+            return self.starting
 
         try:
-            self.logger.debug(f'changing directory to {self.server_path}')
-            result = self.screen.send(f'cd {self.server_path}')
-            assert result is not False
-
-            command = self.get_start_command()
-            assert command != ''
+            args = self.get_start_args()
+            assert len(args) > 0
 
-            result = self.screen.send(command)
-            assert result is not False
+            # follow the log from before the command to not miss any line
+            follower = LogFollower(self.log_file)
+            try:
+                self.launch(args)
 
-            # TODO: poll the screen to determine if the server is done
-            self.logger.debug('waiting for server to load...')
-            # wait for the server and world to load
-            time.sleep(30)
+                self.logger.debug('waiting for server to load...')
+                assert self.wait_until_ready(follower)
+            finally:
+                follower.close()
 
-            self.starting = False
+            self.state.set_lifecycle(RUNNING)
+            self.invalidate()
             self.logger.debug('done starting server')
 
             return True
         except AssertionError:
-            self.starting = False
+            self.state.set_lifecycle(STOPPED)
+            self.invalidate()
             return False
 
+    def launch(self, args: list):
+        """Run the server command on the backend.
+
+        The screen backend changes the directory of the screen session to the
+        server path and sends the command to it. The process backend starts a
+        console host that runs the command in the server path and shares its
+        console over the console socket.
+
+        Parameters
+        ----------
+        args : list
+            The server command.
+        """
+        if self.backend == 'process':
+            self.logger.debug(f'launching console host on '
+                              f'{self.console_socket}')
+            assert launch_console(self.console_socket, args, self.server_path)
+            return
+
+        self.logger.debug(f'changing directory to {self.server_path}')
+        results = self.screen.send_many([f'cd {self.server_path}',
+                                         ' '.join(args)])
+        assert False not in results
+
+    @property
+    def starting(self) -> bool:
+        """Check if any process is starting the server.
+
+        Returns
+        -------
+        bool
+            Whether the shared state is starting and not stale.
+        """
+        state, updated = self.state.lifecycle()
+        return state == STARTING \
+            and time.time() - updated <= self.start_timeout
+
+    @property
+    def stopping(self) -> bool:
+        """Check if any process is stopping the server.
+
+        Returns
+        -------
+        bool
+            Whether the shared state is stopping and not stale.
+        """
+        state, updated = self.state.lifecycle()
+        return state == STOPPING \
+            and time.time() - updated <= self.stop_timer + self.stop_grace
+
+    def wait_until_ready(self, follower: LogFollower) -> bool:
+        """Wait for the server to finish loading the world.
+
+        This reads the new lines of the server log as they are written, and
+        returns as soon as the server logs that it is done. It fails when the
+        server logs an error that stops it from starting, when its process
+        exits or never shows up, or when the start timeout passes.
+
+        Parameters
+        ----------
+        follower : LogFollower
+            The follower of the server log, created before the server started.
+
+        Returns
+        -------
+        bool
+            Whether the server is ready.
+        """
+        self.logger.info('wait_until_ready')
+        started = time.monotonic()
+        deadline = started + self.start_timeout
+        seen = False
+        while True:
+            for line in follower.read_lines():
+                # the events are published here unless the log is watched
+                event = self.events.publish(line) if self.tailer is None \
+                    else parse_line(line)
+                if event is not None and event.type == DONE:
+                    elapsed = time.monotonic() - started
+                    self.logger.debug(f'server is ready after {elapsed:.1f}s')
+                    return True
+                if any(pattern.search(line) for pattern in CRASH_PATTERNS):
+                    self.logger.error(f'server failed to start: {line}')
+                    return False
+
+            if self.status_checker.has_proc():
+                running = len(self.status_checker.pids(
+                    self.java_executable, self.server_file)) > 0
+                seen = seen or running
+                waited = time.monotonic() - started
+                if not running and (seen or waited > self.launch_grace):
+                    self.logger.error('server process is not running')
+                    return False
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.error(f'server did not start within '
+                                  f'{self.start_timeout} seconds')
+                return False
+            follower.wait(min(remaining, 1))
+
+    @registry.timed('action_seconds', action='status')
     def status(self) -> bool:
-        """Check for the PID of the executable.
+        """Check if the server is running.
 
-        This looks for the PID of the executable and counts the number of lines
-        that exist with such conditions. The result is the number of lines being
-        greater than zero.
+        The result of the probe is cached for the status TTL, and concurrent
+        callers share the probe that is in flight. The result is also shared
+        with other processes, which use it instead of probing again while it is
+        recent. Use `invalidate` to discard the cached result.
 
         Returns
         -------
         bool
-            The result of the comparison of count greater than zero.
+            Whether the server is running.
         """
         self.logger.info('status')
+        return self.cache.get('status', self.shared_probe)
+
+    def shared_probe(self) -> bool:
+        """Use the recent probe result of any process or probe again.
+
+        Returns
+        -------
+        bool
+            Whether the server is running.
+        """
+        if self.status_ttl > 0:
+            result = self.state.probe('status', self.status_ttl)
+            if result is not None:
+                self.logger.debug(f'shared status is {result}')
+                return result
+
+        result = self.probe()
+        if self.status_ttl > 0:
+            self.state.record_probe('status', result)
+        return result
+
+    @registry.timed('action_seconds', action='probe')
+    def probe(self) -> bool:
+        """Check for the PID of the executable.
+
+        This runs the status probes concurrently and returns as soon as one of
+        them finds the server, so the check takes as long as the fastest
+        positive probe or the slowest negative one.
+
+        Returns
+        -------
+        bool
+            Whether any of the checks found the server.
+        """
+        self.logger.info('probe')
 
         # reset valid before checking
         self.status_checker.valid = False
 
         # get the status from the status checker
-        status = {
-            'pidof': self.status_checker.process('pidof', self.java_executable),
-            'pgrep': self.status_checker.process('pgrep', self.java_executable),
-            **(self.status_checker.port(self.ports)),
-            'ps': self.status_checker.grep(self.java_executable)
-        }
+        status = self.status_checker.run(self.get_probes())
         # this is only for logging/debugging purposes
         if self.logger.mode == 'debug':
             for key in status:
                 self.logger.debug(f'{key} status is {status[key]}')
 
-        # if any of them are True, valid will be True
-        return self.status_checker.valid
+        # if any of them are True, the server is running
+        return any(self.status_checker.confirms(value)
+                   for value in status.values())
+
+    def get_probes(self) -> dict:
+        """Get the status probes available on this system.
+
+        When the process file system is available, a single native scan finds
+        the PIDs of the executable running the server file and a single read
+        of the socket tables checks every port. Otherwise, the process tools
+        are called and every port is checked on its own. Every port also gets
+        a server list ping, which shows that the server answers players.
+
+        Returns
+        -------
+        dict
+            The names of the probes with functions that take no arguments.
+        """
+        checker = self.status_checker
+        if checker.has_proc():
+            probes = {
+                'proc': lambda: checker.pids(self.java_executable,
+                                             self.server_file),
+                'ports': lambda: checker.port(self.ports),
+            }
+        else:
+            probes = {
+                'pidof': lambda: checker.process('pidof',
+                                                 self.java_executable),
+                'pgrep': lambda: checker.process('pgrep',
+                                                 self.java_executable),
+                'ps': lambda: checker.grep(self.java_executable),
+            }
+            for port in self.ports:
+                probes[f'port {port}'] = \
+                    lambda port_number=port: checker.port([port_number])
+        probes.update(self.get_ping_probes())
+        return probes
+
+    def get_ping_probes(self) -> dict:
+        """Get a server list ping probe for every port.
+
+        Returns
+        -------
+        dict
+            The names of the probes with functions that take no arguments.
+        """
+        return {
+            f'ping {port}': lambda port_number=port: self.status_checker.ping(
+                port_number, self.server_host, self.ping_timeout)
+            for port in self.ports
+        }
+
+    @registry.timed('action_seconds', action='ping')
+    def ping(self) -> dict:
+        """Ping every port of the server at the same time.
+
+        Returns
+        -------
+        dict
+            The ports with the reply of the server, like the MOTD, the number
+            of players and the latency, or None when it did not answer.
+        """
+        self.logger.info('ping')
+        results = self.status_checker.run(self.get_ping_probes(), full=True)
+        servers = {}
+        for port in self.ports:
+            result = results.get(f'ping {port}')
+            if isinstance(result, ServerPing):
+                servers[str(port)] = result._asdict()
+            else:
+                self.logger.debug(f'ping {port} failed: {result}')
+                servers[str(port)] = None
+        return servers
+
+    @registry.timed('action_seconds', action='query')
+    def query(self):
+        """Get the full stat of the server with the query protocol.
+
+        This needs `enable-query=true` in `server.properties`.
+
+        Returns
+        -------
+        dict|None
+            The MOTD, version, map, online and maximum players, plugins and
+            the names of the players, or None when the server did not answer.
+        """
+        self.logger.info('query')
+        try:
+            result = self.query_client.full_stat()
+        except (OSError, QueryError) as error:
+            self.logger.debug(f'query failed: {error}')
+            return None
+        self.tracker.sync(result.players)
+        return result._asdict()
+
+    def players(self):
+        """Get the names of the players that are online.
 
+        The names come from the query protocol, which takes one round trip
+        and does not write to the server log. Without it, the player tracker
+        knows the players while the console is watched.
+
+        Returns
+        -------
+        list|None
+            The names or None when the players are not known.
+        """
+        self.logger.info('players')
+        result = self.query()
+        if result is not None:
+            return result['players']
+        return self.tracker.online()
+
+    def report(self) -> dict:
+        """Run every status probe and report all of the results.
+
+        This is for debugging and does not stop at the first positive probe.
+
+        Returns
+        -------
+        dict
+            The names of the probes with their results.
+        """
+        self.logger.info('report')
+        return self.status_checker.run(self.get_probes(), full=True)
+
+    @registry.timed('action_seconds', action='stop')
     def stop(self) -> bool:
         """Stop the Minecraft server.
 
         This checks to see if the server is already stopped and then continues
-        from there. If necessary, this will send a message to the players about
-        a timer, trigger the auto-save feature, set a timer, and stop the
-        server. This has validation and is safe.
+        from there. The shared state changes to stopping, which fails while
+        another process starts or stops the server. If necessary, this will
+        send a message to the players about a timer, trigger the auto-save
+        feature, set a timer, and stop the server. This has validation and is
+        safe.
+
+        In the players stop mode, the server stops right away when nobody is
+        online, and the timer ends early once the last player leaves. The
+        timer mode always waits for the whole stop timer.
+
+        After the stop command, this waits for the server process to exit. If
+        it is still running after the stop timeout, it gets terminated and then
+        killed.
 
         Returns
         -------
@@ -237,33 +697,186 @@ class MinecraftActions:
             Did the stop command finish successfully.
         """
         self.logger.info('stop')
+        self.invalidate()
 
         if self.status() is False:
             self.logger.warning('Server is not running; it cannot be stopped.')
             return False
 
-        if self.starting:
-            self.logger.warning('server is starting and cannot be stopped')
+        if not self.state.transition(
+                (RUNNING, STOPPED), STOPPING,
+                stale_after=self.stop_timer + self.stop_grace):
+            self.logger.warning('server is starting or stopping and cannot be '
+                                'stopped')
             return False
 
-        self.send_message(f'The server is going to be turned off in '
-                          f'{str(self.stop_timer)} seconds')
-        result = self.screen.send('save-all')
-        if result is False:
+        players = self.online_players() if self.stop_mode == 'players' \
+            else None
+        if players == []:
+            self.logger.debug('nobody is online, so stopping right away')
+            commands = ['save-all']
+        else:
+            message = f'The server is going to be turned off in ' \
+                      f'{str(self.stop_timer)} seconds'
+            self.logger.debug(message)
+            commands = [f'say {message}', 'save-all']
+
+        results = self.console.send_many(commands)
+        if results[-1] is False:
+            self.state.set_lifecycle(RUNNING)
             return False
 
-        self.logger.debug(f'waiting for {str(self.stop_timer)} seconds '
-                          f'to give users time to exit')
-        time.sleep(self.stop_timer)
+        if players == []:
+            pass
+        elif self.stop_mode == 'players':
+            self.count_down()
+        else:
+            self.logger.debug(f'waiting for {str(self.stop_timer)} seconds '
+                              f'to give users time to exit')
+            time.sleep(self.stop_timer)
 
-        result = self.screen.send('stop')
+        pids = self.get_pids()
+        result = self.console.send('stop')
         if result is False:
+            self.invalidate()
+            self.state.set_lifecycle(RUNNING)
             return False
 
+        exited = self.wait_for_exit(pids)
+        self.invalidate()
+        if not exited:
+            self.state.set_lifecycle(RUNNING)
+            return False
+
+        self.state.set_lifecycle(STOPPED)
         self.logger.debug('done stopping server')
 
         return True
 
+    def get_pids(self) -> list:
+        """Get the PIDs of the server process.
+
+        Returns
+        -------
+        list
+            The PIDs, which is empty when there is no process file system.
+        """
+        if not self.status_checker.has_proc():
+            return []
+        return self.status_checker.pids(self.java_executable, self.server_file)
+
+    def usage(self) -> list:
+        """Get the resource usage of the server process.
+
+        Returns
+        -------
+        list
+            The CPU seconds, memory, threads and uptime of every PID, which is
+            empty when there is no process file system.
+        """
+        self.logger.info('usage')
+        found = (self.status_checker.usage(pid) for pid in self.get_pids())
+        return [usage for usage in found if usage is not None]
+
+    def wait_for_exit(self, pids: list) -> bool:
+        """Wait for the server process to exit after the stop command.
+
+        Once the stop timeout passes, the process gets SIGTERM and then
+        SIGKILL, with the kill timeout after each of them. Without the PIDs,
+        the status is checked until the server is down or the stop timeout
+        passes.
+
+        Parameters
+        ----------
+        pids : list
+            The PIDs of the server process.
+
+        Returns
+        -------
+        bool
+            Whether the server process exited.
+        """
+        self.logger.info('wait_for_exit')
+        started = time.monotonic()
+        if len(pids) == 0:
+            while self.probe():
+                if time.monotonic() - started > self.stop_timeout:
+                    self.logger.error('server is still running')
+                    return False
+                time.sleep(1)
+            return True
+
+        if wait_for_exit(pids, self.stop_timeout):
+            elapsed = time.monotonic() - started
+            self.logger.debug(f'server exited after {elapsed:.1f}s')
+            return True
+
+        self.logger.warning(f'server did not exit within {self.stop_timeout} '
+                            f'seconds, terminating {pids}')
+        try:
+            if terminate(pids, self.kill_timeout):
+                return True
+        except PermissionError as error:
+            self.logger.error(str(error))
+        self.logger.error('server is still running')
+        return False
+
+    def online_players(self):
+        """Get the names of the players that are online.
+
+        With the RCON console, the reply of the list command is used and kept
+        in the player tracker. Otherwise, the names come from the query
+        protocol, or from the tracker while the console is watched.
+
+        Returns
+        -------
+        list|None
+            The names or None when the players are not known.
+        """
+        if isinstance(self.console, RconActions):
+            reply = self.console.send('list')
+            players = parse_list(reply) if reply is not False else None
+            if players is not None:
+                self.tracker.sync(players)
+                return players
+        return self.players()
+
+    def count_down(self):
+        """Wait for the stop timer while players are online.
+
+        This reminds the players of the time left, and returns as soon as the
+        last player leaves or the stop timer ends. When the players are not
+        known, this waits for the whole timer.
+        """
+        self.logger.info('count_down')
+        deadline = time.monotonic() + self.stop_timer
+        reminders = [seconds for seconds in self.reminders
+                     if seconds < self.stop_timer]
+        polling = isinstance(self.console, RconActions)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.debug('stop timer ended')
+                return
+
+            if self.online_players() == []:
+                self.logger.debug('the last player left')
+                return
+
+            due = [seconds for seconds in reminders if seconds >= remaining]
+            if len(due) > 0:
+                reminders = [seconds for seconds in reminders
+                             if seconds < remaining]
+                self.console.send(f'say The server is going to be turned off '
+                                  f'in {min(due)} seconds')
+
+            wait = min(remaining, 1)
+            if polling:
+                time.sleep(wait)
+            else:
+                self.tracker.wait_for_change(wait)
+
+    @registry.timed('action_seconds', action='verify')
     def verify(self) -> bool:
         """Check to see if the server is running and not starting.
 
@@ -278,7 +891,7 @@ class MinecraftActions:
         """
         self.logger.info('verify')
 
-        if self.screen.check() is False:
+        if self.backend == 'screen' and self.screen.check() is False:
             self.logger.warning('screen is not on')
             return False
 
@@ -0,0 +1,164 @@
+import signal
+import threading
+import time
+
+from src.api.jobs import JobQueue
+from src.mts_utilities.mts_control import ControlServer
+from src.mts_utilities.mts_process import wait_for_exit
+from src.mts_utilities.mts_state import RUNNING
+
+
+class Supervisor:
+    """Keep the Minecraft server running and send the scheduled broadcasts.
+
+    The supervisor watches the server process and restarts the server when it
+    exits without being stopped. Restarts are delayed with an exponential
+    backoff, and when the server crashes too often within the crash window,
+    the supervisor waits for the maximum backoff before it tries again. While
+    it runs, it serves the actions of the server on the control socket for the
+    command line.
+    """
+
+    def __init__(self, minecraft_server, date_interval: float = 1800,
+                 check_interval: float = 5, backoff_base: float = 5,
+                 backoff_max: float = 300, crash_limit: int = 5,
+                 crash_window: float = 600):
+        self.minecraft_server = minecraft_server
+        self.logger = minecraft_server.logger
+        self.date_interval = float(date_interval)
+        self.check_interval = float(check_interval)
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self.crash_limit = int(crash_limit)
+        self.crash_window = float(crash_window)
+        self.crashes = []
+        self.stopped = threading.Event()
+        self.next_date = None
+        # the long actions of the control socket run one at a time, shared
+        # with the jobs of the API
+        self.jobs = JobQueue(state=minecraft_server.state)
+        self.control = ControlServer(
+            minecraft_server.control_socket,
+            self.jobs.queue_actions(minecraft_server.get_actions()))
+
+    def run(self):
+        """Supervise the server until the process gets SIGINT or SIGTERM."""
+        self.logger.info('supervise')
+        self.handle_signals()
+        self.minecraft_server.watch_console()
+        if not self.control.start():
+            self.logger.warning('another process serves the control socket')
+        try:
+            self.minecraft_server.verify()
+            if self.date_interval > 0:
+                self.next_date = time.monotonic() + self.date_interval
+
+            while not self.stopped.is_set():
+                self.tick()
+        finally:
+            self.control.close()
+        self.logger.info('supervisor stopped')
+
+    def handle_signals(self):
+        """Stop supervising on SIGINT and SIGTERM."""
+        for number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                signal.signal(number, lambda *args: self.stopped.set())
+            except ValueError:
+                # signals can only be handled on the main thread
+                return
+
+    def stop(self):
+        """Stop supervising after the current check."""
+        self.stopped.set()
+
+    def tick(self):
+        """Send the date when it is due, and check the server once."""
+        if self.next_date is not None and time.monotonic() >= self.next_date:
+            # missed dates are skipped rather than sent in a burst
+            self.next_date = time.monotonic() + self.date_interval
+            self.minecraft_server.send_date()
+
+        if self.watch():
+            return
+
+        state, _ = self.minecraft_server.state.lifecycle()
+        if state != RUNNING:
+            # the server was stopped on purpose or another process handles it
+            return
+
+        self.logger.warning('server exited without being stopped')
+        self.handle_crash()
+
+    def watch(self) -> bool:
+        """Wait for the server process to exit, up to the check interval.
+
+        With the PIDs of the server, this wakes up as soon as the process
+        exits. Otherwise, the status is checked after the interval.
+
+        Returns
+        -------
+        bool
+            Whether the server is still running.
+        """
+        timeout = self.check_interval
+        if self.next_date is not None:
+            timeout = max(min(timeout, self.next_date - time.monotonic()), 0)
+
+        pids = self.minecraft_server.get_pids()
+        if len(pids) > 0:
+            if not wait_for_exit(pids, timeout):
+                return True
+            self.minecraft_server.invalidate()
+        else:
+            self.stopped.wait(timeout)
+        return self.minecraft_server.status()
+
+    def handle_crash(self):
+        """Restart the server after the backoff delay until it starts."""
+        while not self.stopped.is_set():
+            delay = self.record_crash()
+            self.logger.debug(f'restarting the server in {delay} seconds')
+            if self.stopped.wait(delay):
+                return
+
+            if self.minecraft_server.start():
+                self.logger.info('server restarted')
+                return
+            self.logger.error('failed to restart the server')
+
+    def record_crash(self) -> float:
+        """Remember the crash and get the delay before the next restart.
+
+        Returns
+        -------
+        float
+            Seconds to wait before restarting.
+        """
+        now = time.monotonic()
+        self.crashes = [crashed for crashed in self.crashes
+                        if now - crashed <= self.crash_window]
+        self.crashes.append(now)
+
+        if len(self.crashes) >= self.crash_limit:
+            self.logger.error(f'server crashed {len(self.crashes)} times in '
+                              f'{self.crash_window} seconds; waiting '
+                              f'{self.backoff_max} seconds')
+            self.crashes = []
+            return self.backoff_max
+        return self.backoff_delay(len(self.crashes))
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Get the delay before the restart attempt.
+
+        Parameters
+        ----------
+        attempt : int
+            The number of recent crashes, starting at 1.
+
+        Returns
+        -------
+        float
+            Seconds to wait.
+        """
+        return min(self.backoff_base * 2 ** (attempt - 1), self.backoff_max)
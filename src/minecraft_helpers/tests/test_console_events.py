@@ -0,0 +1,91 @@
+import pytest
+
+from src.minecraft_helpers import console_events
+
+
+@pytest.mark.parametrize('line, event_type, data', [
+    ('[12:00:01] [Server thread/INFO]: Done (7.892s)! For help, type "help"',
+     console_events.DONE, {'seconds': 7.892}),
+    ('[12:00:02] [Server thread/INFO]: Steve joined the game',
+     console_events.JOIN, {'player': 'Steve'}),
+    ('[12:00:03] [Server thread/INFO]: Steve left the game',
+     console_events.LEAVE, {'player': 'Steve'}),
+    ('[12:00:04] [Server thread/INFO]: <Steve> hello there',
+     console_events.CHAT, {'player': 'Steve', 'message': 'hello there'}),
+    ('[12:00:04] [Server thread/INFO]: [Not Secure] <Alex> hi',
+     console_events.CHAT, {'player': 'Alex', 'message': 'hi'}),
+    ('[12:00:05] [Server thread/INFO]: Alex was slain by Zombie',
+     console_events.DEATH, {'player': 'Alex', 'message': 'was slain by Zombie'}),
+    ('[12:00:06] [Server thread/INFO]: Alex has made the advancement '
+     '[Stone Age]',
+     console_events.ADVANCEMENT, {'player': 'Alex',
+                                  'advancement': 'Stone Age'}),
+    ("[12:00:07] [Server thread/WARN]: Can't keep up! Is the server "
+     "overloaded? Running 2084ms or 41 ticks behind",
+     console_events.LAG, {'milliseconds': 2084, 'ticks': 41}),
+    ('[12:00:08] [Server thread/INFO]: Saved the game',
+     console_events.SAVED, {}),
+    ('[12:00:09 INFO]: Steve joined the game',
+     console_events.JOIN, {'player': 'Steve'}),
+])
+def test_parse_line(line, event_type, data):
+    event = console_events.parse_line(line)
+    assert event.type == event_type
+    assert event.data == data
+    assert event.line == line
+
+
+@pytest.mark.parametrize('line', [
+    '[12:00:00] [Server thread/INFO]: Starting minecraft server version 1.16.5',
+    '[12:00:00] [User Authenticator #1/INFO]: UUID of player Steve is 1234',
+    '[12:00:00] [Server thread/INFO]: Steve lost connection: Disconnected',
+    'java.lang.IllegalStateException: not a log line',
+    '',
+])
+def test_parse_line_not_event(line):
+    assert console_events.parse_line(line) is None
+
+
+def test_bus_dispatch():
+    bus = console_events.ConsoleEventBus()
+    joins = []
+    everything = []
+    bus.subscribe(console_events.JOIN, joins.append)
+    bus.subscribe(console_events.ALL, everything.append)
+    bus.publish('[12:00:02] [Server thread/INFO]: Steve joined the game')
+    bus.publish('[12:00:08] [Server thread/INFO]: Saved the game')
+    bus.publish('[12:00:09] [Server thread/INFO]: Preparing spawn area: 4%')
+    assert [event.data['player'] for event in joins] == ['Steve']
+    assert [event.type for event in everything] == \
+        [console_events.JOIN, console_events.SAVED]
+
+    bus.unsubscribe(console_events.JOIN, joins.append)
+    bus.publish('[12:00:10] [Server thread/INFO]: Alex joined the game')
+    assert len(joins) == 1
+
+
+def test_player_tracker():
+    bus = console_events.ConsoleEventBus()
+    tracker = console_events.PlayerTracker(bus)
+    bus.publish('[12:00:02] [Server thread/INFO]: Steve joined the game')
+    assert tracker.count() is None
+    bus.publish('[12:00:01] [Server thread/INFO]: Done (7.8s)! For help, '
+                'type "help"')
+    assert tracker.online() == []
+    bus.publish('[12:00:02] [Server thread/INFO]: Steve joined the game')
+    bus.publish('[12:00:03] [Server thread/INFO]: Alex joined the game')
+    bus.publish('[12:00:04] [Server thread/INFO]: Steve left the game')
+    assert tracker.online() == ['Alex']
+    tracker.sync(['Alex', 'Notch'])
+    assert tracker.count() == 2
+
+
+@pytest.mark.parametrize('reply, players', [
+    ('There are 0 of a max of 20 players online: ', []),
+    ('There are 2 of a max of 20 players online: Steve, Alex',
+     ['Steve', 'Alex']),
+    ('There are 1 of a max 20 players online: Steve', ['Steve']),
+    ('Unknown command', None),
+])
+def test_parse_list(reply, players):
+    assert console_events.parse_list(reply) == players
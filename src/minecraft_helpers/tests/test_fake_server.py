@@ -0,0 +1,95 @@
+import pytest
+
+from src.minecraft_helpers.console_events import (CHAT, DONE, JOIN, LAG,
+                                                  LEAVE, parse_line)
+from src.minecraft_helpers.fake_server import FakeServer, read_properties
+from src.mts_utilities.mts_query import QueryClient
+from src.mts_utilities.mts_rcon import RconAuthenticationError, RconClient
+from src.mts_utilities.mts_status import StatusChecker
+
+PROPERTIES = {
+    'server-port': '0',
+    'enable-rcon': 'true',
+    'rcon.port': '0',
+    'rcon.password': 'secret',
+    'enable-query': 'true',
+}
+
+
+@pytest.fixture(name='server')
+def fixture_server(tmp_path):
+    server = FakeServer(str(tmp_path), PROPERTIES, startup=0, shutdown=0)
+    server.start()
+    yield server
+    server.close()
+
+
+def read_log(path):
+    return (path / 'logs' / 'latest.log').read_text().splitlines()
+
+
+def test_read_properties(tmp_path):
+    (tmp_path / 'server.properties').write_text(
+        '#Minecraft server properties\nserver-port=25566\nmotd=Hello = World\n')
+    assert read_properties(str(tmp_path / 'server.properties')) == {
+        'server-port': '25566', 'motd': 'Hello = World'}
+    assert read_properties(str(tmp_path / 'missing')) == {}
+
+
+def test_log_events(server, tmp_path):
+    server.execute('fake join Steve')
+    server.execute('fake chat Steve hello there')
+    server.execute('fake lag 2500')
+    server.execute('fake leave Steve')
+
+    events = [parse_line(line) for line in read_log(tmp_path)]
+    types = [event.type for event in events if event is not None]
+    assert types == [DONE, JOIN, CHAT, LAG, LEAVE]
+    assert events[-1] is not None and events[-1].data['player'] == 'Steve'
+
+
+def test_ping(server):
+    server.join('Alex')
+    ping = StatusChecker().ping(server.port)
+    assert (ping.motd, ping.online, ping.maximum) == \
+        ('A Minecraft Server', 1, 20)
+    assert ping.version == '1.20.1'
+
+
+def test_rcon(server):
+    server.join('Steve')
+    client = RconClient(port=server.rcon_port, password='secret')
+    assert client.command('list') == \
+        'There are 1 of a max of 20 players online: Steve'
+    assert client.command('save-all').endswith('Saved the game')
+    client.close()
+
+    with pytest.raises(RconAuthenticationError):
+        RconClient(port=server.rcon_port, password='wrong').connect()
+
+
+def test_query(server):
+    server.join('Alex')
+    server.join('Steve')
+    result = QueryClient(port=server.query_port, timeout=0.5).full_stat()
+    assert result.players == ['Alex', 'Steve']
+    assert (result.online, result.maximum) == (2, 20)
+    assert result.map == 'world'
+
+
+def test_run_until_stop(tmp_path):
+    server = FakeServer(str(tmp_path), {'server-port': '0'}, startup=0,
+                        shutdown=0)
+    assert server.run(['fake join Alex', 'say hi', 'stop']) == 0
+    lines = read_log(tmp_path)
+    assert lines[-1].endswith('All dimensions are saved')
+    assert any(line.endswith('[Server] hi') for line in lines)
+    assert any(line.endswith('Alex lost connection: Server closed')
+               for line in lines)
+
+
+def test_crash(tmp_path):
+    server = FakeServer(str(tmp_path), {'server-port': '0'}, startup=0,
+                        shutdown=0)
+    assert server.run(['fake crash']) == 1
+    assert 'ERROR' in read_log(tmp_path)[-1]
@@ -112,3 +112,54 @@ def mock_input_q(something):
 
 def mock_screen_send(something, another):
     return False
+
+
+def test_send_commands(monkeypatch):
+    sent = []
+    monkeypatch.setattr(ScreenActions, 'check', lambda self: True)
+    monkeypatch.setattr(ScreenActions, 'stuff',
+                        lambda self, text: sent.append(text) or '')
+    giver = give.Give(screen_name)
+    commands = ['give @p minecraft:bow', 'give @p minecraft:arrow 64']
+    assert giver.send_commands(commands) == ['', '']
+    assert sent == ['give @p minecraft:bow\rgive @p minecraft:arrow 64']
+
+    sent.clear()
+    assert giver.send_commands(commands, 0.01) == ['', '']
+    assert sent == commands
+
+
+def test_send_commands_without_screen(monkeypatch):
+    monkeypatch.setattr(ScreenActions, 'check', lambda self: False)
+    giver = give.Give(screen_name)
+    assert giver.send_commands(['say hi', 'say bye']) == [False, False]
+
+
+def test_get_give_command():
+    giver = give.Give(screen_name)
+    assert giver.get_give_command('bow') == 'give @p minecraft:bow 1'
+    assert giver.get_give_command('turtle_shell', 'Steve') == \
+        'give Steve minecraft:turtle_helmet 1'
+    assert giver.get_give_command('sword', enchantments=['Sharpness',
+                                                         'Looting']) == \
+        'give @p minecraft:diamond_sword{Enchantments:[' \
+        '{id:"minecraft:sharpness",lvl:5s},' \
+        '{id:"minecraft:looting",lvl:3s}]} 1'
+
+
+def test_give_category_sends_one_batch(monkeypatch):
+    sent = []
+    checks = []
+    monkeypatch.setattr(ScreenActions, 'check',
+                        lambda self: checks.append(1) or True)
+    monkeypatch.setattr(ScreenActions, 'stuff',
+                        lambda self, text: sent.append(text) or '')
+    giver = give.Give(screen_name)
+    assert giver.give_category('armor', 'Steve', 'iron') == [''] * 4
+    assert len(checks) == 1
+    assert sent == ['give Steve minecraft:iron_helmet 1\r'
+                    'give Steve minecraft:iron_chestplate 1\r'
+                    'give Steve minecraft:iron_leggings 1\r'
+                    'give Steve minecraft:iron_boots 1']
+    with pytest.raises(ValueError):
+        giver.give_category('food')
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from src.minecraft_helpers.server_actions import MinecraftActions
+from src.mts_utilities.mts_query import QueryResult
+from src.mts_utilities.mts_rcon import RconActions
+from src.mts_utilities.mts_state import RUNNING, STOPPED
+
+
+class FakeLogger:
+    def __getattr__(self, name):
+        return lambda message: None
+
+
+class FakeScreen:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, command):
+        self.sent.append(command)
+        return ''
+
+    def send_many(self, commands, delay=0):
+        self.sent.extend(commands)
+        return [''] * len(commands)
+
+
+class FakeRcon(FakeScreen, RconActions):
+    """Answer the list command with the next of the given player lists."""
+
+    def __init__(self, *online):
+        super().__init__()
+        self.online = list(online)
+
+    def send(self, command):
+        self.sent.append(command)
+        if command != 'list':
+            return ''
+        names = self.online.pop(0) if len(self.online) > 1 \
+            else self.online[0]
+        return f'There are {len(names)} of a max of 20 players online: ' \
+               f'{", ".join(names)}'
+
+
+def no_answer():
+    raise OSError('timed out')
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    server = MinecraftActions(state_file=str(tmp_path / 'state.db'),
+                              stop_timer=30)
+    server.logger = FakeLogger()
+    server.state.set_lifecycle(RUNNING)
+    server.console = FakeScreen()
+    monkeypatch.setattr(server, 'status', lambda: True)
+    monkeypatch.setattr(server, 'get_pids', lambda: [])
+    monkeypatch.setattr(server, 'wait_for_exit', lambda pids: True)
+    monkeypatch.setattr(server.query_client, 'full_stat', no_answer)
+    return server
+
+
+def timed_stop(server):
+    started = time.monotonic()
+    assert server.stop() is True
+    assert server.state.lifecycle()[0] == STOPPED
+    return time.monotonic() - started
+
+
+def test_stop_nobody_online_rcon(server):
+    server.console = FakeRcon([])
+    assert timed_stop(server) < 1
+    assert server.console.sent == ['list', 'save-all', 'stop']
+
+
+def test_stop_when_last_player_leaves_rcon(server):
+    server.console = FakeRcon(['Steve'], ['Steve'], [])
+    assert timed_stop(server) < 5
+    assert server.console.sent[1] == \
+        'say The server is going to be turned off in 30 seconds'
+    assert server.console.sent[-1] == 'stop'
+
+
+def test_stop_nobody_online_tracker(server):
+    server.tracker.sync([])
+    assert timed_stop(server) < 1
+    assert server.console.sent == ['save-all', 'stop']
+
+
+def test_stop_nobody_online_query(server, monkeypatch):
+    monkeypatch.setattr(server.query_client, 'full_stat', lambda: QueryResult(
+        'A Minecraft Server', '1.20.1', 'world', 0, 20, '', []))
+    assert timed_stop(server) < 1
+    assert server.console.sent == ['save-all', 'stop']
+
+
+def test_count_down_when_last_player_leaves(server):
+    server.tracker.sync(['Alex'])
+    threading.Timer(0.2, server.tracker.sync, [[]]).start()
+    started = time.monotonic()
+    server.count_down()
+    assert time.monotonic() - started < 2
+
+
+def test_count_down_unknown_players(server):
+    server.stop_timer = 1
+    started = time.monotonic()
+    server.count_down()
+    assert time.monotonic() - started >= 1
+
+
+def test_stop_timer_mode(server, monkeypatch):
+    slept = []
+    monkeypatch.setattr(time, 'sleep', slept.append)
+    server.stop_mode = 'timer'
+    server.console = FakeRcon([])
+    server.stop()
+    # the players are not asked for, and the whole timer passes
+    assert slept == [30]
+    assert server.console.sent == [
+        'say The server is going to be turned off in 30 seconds',
+        'save-all', 'stop']
@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from src.minecraft_helpers.server_actions import MinecraftActions
+from src.mts_utilities.mts_log import LogFollower
+from src.mts_utilities.mts_state import RUNNING, STOPPED
+
+DONE = '[12:00:00] [Server thread/INFO]: Done (1.234s)! For help, type "help"'
+BIND = '[12:00:00] [Server thread/WARN]: **** FAILED TO BIND TO PORT!'
+LOADING = '[12:00:00] [Server thread/INFO]: Preparing level "world"'
+
+
+class FakeLogger:
+    def __getattr__(self, name):
+        return lambda message: None
+
+
+@pytest.fixture
+def server(tmp_path):
+    server_path = tmp_path / 'server'
+    (server_path / 'logs').mkdir(parents=True)
+    (server_path / 'logs' / 'latest.log').write_text('')
+    server = MinecraftActions(server_path=str(server_path),
+                              state_file=str(tmp_path / 'state.db'),
+                              java_executable=sys.executable,
+                              server_file='server.jar', start_timeout=5)
+    server.logger = FakeLogger()
+    server.launch_grace = 0.3
+    # an empty process file system, with the server added by `run_server`
+    proc = tmp_path / 'proc'
+    (proc / 'self').mkdir(parents=True)
+    server.status_checker.proc_path = str(proc)
+    return server
+
+
+def run_server(server, pid=4242):
+    process = os.path.join(server.status_checker.proc_path, str(pid))
+    os.makedirs(process, exist_ok=True)
+    with open(os.path.join(process, 'cmdline'), 'wb') as handle:
+        handle.write(b'\0'.join([os.fsencode(sys.executable), b'-jar',
+                                  b'server.jar', b'nogui', b'']))
+    return process
+
+
+def exit_server(process):
+    os.remove(os.path.join(process, 'cmdline'))
+    os.rmdir(process)
+
+
+def write_later(server, *lines, delay=0.1):
+    def write():
+        time.sleep(delay)
+        with open(server.log_file, 'a') as handle:
+            for line in lines:
+                handle.write(line + '\n')
+
+    thread = threading.Thread(target=write, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_until_ready(server):
+    follower = LogFollower(server.log_file)
+    started = time.monotonic()
+    try:
+        return server.wait_until_ready(follower), time.monotonic() - started
+    finally:
+        follower.close()
+
+
+def test_ready_when_done(server):
+    run_server(server)
+    write_later(server, LOADING, DONE)
+    ready, elapsed = wait_until_ready(server)
+    assert ready is True
+    assert elapsed < 2
+
+
+def test_crash_fails_fast(server):
+    run_server(server)
+    write_later(server, LOADING, BIND, DONE)
+    ready, elapsed = wait_until_ready(server)
+    assert ready is False
+    assert elapsed < 2
+
+
+def test_process_never_appears(server):
+    write_later(server, LOADING)
+    ready, elapsed = wait_until_ready(server)
+    assert ready is False
+    assert server.launch_grace <= elapsed < 2
+
+
+def test_process_exits(server):
+    process = run_server(server)
+    timer = threading.Timer(0.2, exit_server, [process])
+    timer.start()
+    ready, elapsed = wait_until_ready(server)
+    timer.join()
+    assert ready is False
+    assert elapsed < 2
+
+
+def test_start_timeout(server):
+    server.start_timeout = 0.5
+    run_server(server)
+    write_later(server, LOADING)
+    ready, elapsed = wait_until_ready(server)
+    assert ready is False
+    assert 0.5 <= elapsed < 2
+
+
+def test_start(server, monkeypatch):
+    monkeypatch.setattr(server.screen, 'check', lambda: True)
+    monkeypatch.setattr(server, 'status', lambda: False)
+    server.state.set_lifecycle(STOPPED)
+
+    def launch(args):
+        assert args[0] == sys.executable and args[-2].endswith('server.jar')
+        run_server(server)
+        write_later(server, LOADING, DONE)
+
+    monkeypatch.setattr(server, 'launch', launch)
+    assert server.start() is True
+    assert server.state.lifecycle()[0] == RUNNING
+
+
+def test_start_crash(server, monkeypatch):
+    monkeypatch.setattr(server.screen, 'check', lambda: True)
+    monkeypatch.setattr(server, 'status', lambda: False)
+    server.state.set_lifecycle(STOPPED)
+
+    def launch(args):
+        del args
+        run_server(server)
+        write_later(server, BIND)
+
+    monkeypatch.setattr(server, 'launch', launch)
+    assert server.start() is False
+    assert server.state.lifecycle()[0] == STOPPED
@@ -0,0 +1,85 @@
+import logging
+
+from src.minecraft_helpers.supervisor import Supervisor
+from src.mts_utilities.mts_state import RUNNING, STOPPED
+
+
+class FakeState:
+    def __init__(self, lifecycle):
+        self.value = lifecycle
+
+    def lifecycle(self):
+        return self.value, 0
+
+
+class FakeServer:
+    def __init__(self, running, lifecycle=RUNNING, starts=None):
+        self.logger = logging.getLogger(__name__)
+        self.running = running
+        self.state = FakeState(lifecycle)
+        self.starts = list(starts or [True])
+        self.dates = 0
+        self.started = 0
+        self.control_socket = ''
+
+    def get_actions(self):
+        return {'status': self.status}
+
+    def get_pids(self):
+        return []
+
+    def status(self):
+        return self.running
+
+    def invalidate(self):
+        pass
+
+    def send_date(self):
+        self.dates += 1
+
+    def start(self):
+        self.started += 1
+        result = self.starts.pop(0)
+        self.running = result
+        return result
+
+
+def test_backoff_delay():
+    supervisor = Supervisor(FakeServer(True), backoff_base=5, backoff_max=60)
+    assert [supervisor.backoff_delay(attempt) for attempt in range(1, 6)] == \
+        [5, 10, 20, 40, 60]
+
+
+def test_tick_restarts_crashed_server():
+    server = FakeServer(False, starts=[False, True])
+    supervisor = Supervisor(server, check_interval=0, backoff_base=0)
+    supervisor.tick()
+    assert server.started == 2
+    assert len(supervisor.crashes) == 2
+
+
+def test_tick_ignores_stopped_server():
+    server = FakeServer(False, lifecycle=STOPPED)
+    supervisor = Supervisor(server, check_interval=0)
+    supervisor.tick()
+    assert server.started == 0
+
+
+def test_record_crash_detects_loop():
+    supervisor = Supervisor(FakeServer(True), backoff_base=1, backoff_max=99,
+                            crash_limit=3)
+    assert supervisor.record_crash() == 1
+    assert supervisor.record_crash() == 2
+    assert supervisor.record_crash() == 99
+    assert supervisor.crashes == []
+
+
+def test_tick_sends_date():
+    server = FakeServer(True)
+    supervisor = Supervisor(server, check_interval=0)
+    supervisor.next_date = 0
+    supervisor.date_interval = 1800
+    supervisor.tick()
+    assert server.dates == 1
+    supervisor.tick()
+    assert server.dates == 1
@@ -0,0 +1,540 @@
+import asyncio
+import itertools
+import os
+import struct
+import subprocess
+import time
+
+from .mts_console import ConsoleClient, decode_reply, encode_request
+from .mts_helpers import CommandResult
+from .mts_metrics import registry
+from .mts_rcon import (SERVERDATA_AUTH, SERVERDATA_AUTH_RESPONSE,
+                       SERVERDATA_EXECCOMMAND, SERVERDATA_RESPONSE_VALUE,
+                       RconActions, RconAuthenticationError, RconError,
+                       decode_payload, encode_packet, ends_response)
+from .mts_screen import LIST_SESSIONS, ScreenActions
+
+
+async def run(args: list, check: bool = True,
+              timeout: float = None) -> CommandResult:
+    """Run the command arguments without a shell or a blocked thread.
+
+    This is the coroutine version of `mts_helpers.run`, and records the same
+    metrics.
+
+    Parameters
+    ----------
+    args : list
+        The executable followed by its arguments.
+    check : bool
+        Whether to raise an error when the command exits with a non-zero code.
+    timeout : float
+        The number of seconds to wait for the command to finish.
+
+    Returns
+    -------
+    CommandResult
+        The arguments, exit code, stripped stdout and elapsed seconds.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        The command failed and check is True.
+    subprocess.TimeoutExpired
+        The command took longer than the timeout and was killed.
+    """
+    command = os.path.basename(args[0])
+    registry.inc('subprocess_total', command=command)
+    started = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(),
+                                                    timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(args, timeout) from None
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe('subprocess_seconds', elapsed, command=command)
+    output = stdout.decode('utf-8', 'replace')
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode, args, output,
+            stderr.decode('utf-8', 'replace'))
+    return CommandResult(args, process.returncode, output.strip(), elapsed)
+
+
+def asynchronous(console):
+    """Get the coroutine version of a console transport.
+
+    Parameters
+    ----------
+    console : ScreenActions|RconActions|ConsoleClient
+
+    Returns
+    -------
+    AsyncScreen|AsyncRconActions|AsyncConsoleClient
+
+    Raises
+    ------
+    TypeError
+        The transport has no coroutine version.
+    """
+    if isinstance(console, ScreenActions):
+        return AsyncScreen(console)
+    if isinstance(console, RconActions):
+        return AsyncRconActions(console)
+    if isinstance(console, ConsoleClient):
+        return AsyncConsoleClient(console)
+    raise TypeError(f'no asynchronous version of {type(console).__name__}')
+
+
+class SingleFlight:
+    """Share the result of a coroutine between concurrent callers.
+
+    Callers that ask for a key while it loads wait for the same load, so any
+    number of them cost one load. The result is kept for the TTL; errors are
+    not kept.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self.values = {}
+        self.pending = {}
+
+    async def get(self, key, loader: callable):
+        """Get the cached value or load it.
+
+        Parameters
+        ----------
+        key
+        loader : callable
+            Function without arguments that returns an awaitable.
+
+        Returns
+        -------
+        The value of the loader.
+        """
+        cached = self.values.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        future = self.pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(loader())
+            self.pending[key] = future
+            future.add_done_callback(lambda done: self.land(key, done))
+        # a caller that is cancelled does not cancel the others
+        return await asyncio.shield(future)
+
+    def land(self, key, future: asyncio.Future):
+        """Store the result of a finished load.
+
+        Parameters
+        ----------
+        key
+        future : asyncio.Future
+        """
+        if self.pending.get(key) is future:
+            del self.pending[key]
+        if self.ttl > 0 and not future.cancelled() \
+                and future.exception() is None:
+            self.values[key] = (future.result(), time.monotonic())
+
+    def invalidate(self, key=None):
+        """Discard the cached value of the key, or every value.
+
+        Parameters
+        ----------
+        key
+        """
+        if key is None:
+            self.values.clear()
+        else:
+            self.values.pop(key, None)
+
+
+class AsyncScreen:
+    """The actions of `ScreenActions` as coroutines.
+
+    Checks are cached for the TTL of the screen actions, and concurrent checks
+    share one `screen -ls`.
+    """
+
+    def __init__(self, screen: ScreenActions):
+        self.screen = screen
+        self.name = screen.name
+        self.logger = screen.logger
+        self.flights = SingleFlight(screen.cache.ttl)
+
+    async def check(self) -> bool:
+        """Check to see if the screen is running.
+
+        Returns
+        -------
+        bool
+        """
+        self.logger.info('check')
+        with registry.timer('screen_seconds', action='check'):
+            return await self.flights.get('check', self.probe)
+
+    async def probe(self) -> bool:
+        """Check the screen sessions without using the cache.
+
+        Returns
+        -------
+        bool
+        """
+        try:
+            result = await run(LIST_SESSIONS, check=False)
+        except OSError as error:
+            self.logger.error(str(error))
+            return False
+        return self.screen.count(result.stdout) > 0
+
+    async def send(self, command: str):
+        """Send the command to the screen.
+
+        Parameters
+        ----------
+        command : str
+
+        Returns
+        -------
+        bool|str
+            Output of screen or False.
+        """
+        self.logger.info(f'send({command})')
+        with registry.timer('screen_seconds', action='send'):
+            if await self.check() is False:
+                self.logger.warning(f'screen {self.name} does not exist.')
+                return False
+            return await self.stuff(command)
+
+    async def send_many(self, commands: list, delay: float = 0) -> list:
+        """Send a sequence of commands to the screen with one check.
+
+        Like `ScreenActions.send_many`, without a delay every command gets
+        the result of the single screen call that typed the batch.
+
+        Parameters
+        ----------
+        commands : list
+        delay : float
+            Seconds to wait between two commands, without blocking the loop.
+
+        Returns
+        -------
+        list
+            Output of screen or False for each command; without a delay, the
+            same result of the batch for each command.
+        """
+        self.logger.info(f'send_many({commands})')
+        if len(commands) == 0:
+            return []
+        with registry.timer('screen_seconds', action='send_many'):
+            if await self.check() is False:
+                self.logger.warning(f'screen {self.name} does not exist.')
+                return [False] * len(commands)
+            if delay <= 0:
+                result = await self.stuff('\r'.join(commands))
+                return [result] * len(commands)
+            results = []
+            for index, command in enumerate(commands):
+                if index > 0:
+                    await asyncio.sleep(delay)
+                results.append(await self.stuff(command))
+            return results
+
+    async def stuff(self, text: str):
+        """Type the text into the screen followed by a carriage return.
+
+        Parameters
+        ----------
+        text : str
+
+        Returns
+        -------
+        bool|str
+            Output of screen or False.
+        """
+        try:
+            result = await run(self.screen.stuff_args(text))
+        except subprocess.CalledProcessError as error:
+            self.logger.error(f'{str(error.returncode)}: {error.stdout}')
+            return False
+        except OSError as error:
+            self.logger.error(str(error))
+            return False
+        return result.stdout
+
+
+class AsyncRconClient:
+    """A single connection to a Source RCON server on the event loop.
+
+    Commands on the connection take turns, since the server answers them in
+    order.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 25575,
+                 password: str = '', timeout: float = 5):
+        self.host = host
+        self.port = int(port)
+        self.password = password
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.ids = itertools.count(1)
+        # the lock belongs to the loop that first uses the client
+        self.lock = None
+
+    async def connect(self):
+        """Connect to the server and authenticate with the password.
+
+        Raises
+        ------
+        RconAuthenticationError
+            The server rejected the password.
+        OSError
+            The server could not be reached.
+        """
+        self.close()
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        request_id = next(self.ids)
+        self.writer.write(encode_packet(request_id, SERVERDATA_AUTH,
+                                        self.password))
+        await self.writer.drain()
+        while True:
+            response_id, response_type, _ = await self.read()
+            if response_type != SERVERDATA_AUTH_RESPONSE:
+                continue
+            if response_id == -1:
+                self.close()
+                raise RconAuthenticationError()
+            if response_id == request_id:
+                return
+
+    def close(self):
+        """Close the connection if it is open."""
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+    async def command(self, text: str) -> str:
+        """Run the console command and return its output.
+
+        Like `RconPool.command`, the command is only sent again on a new
+        connection when the open connection dropped before it was sent.
+
+        Parameters
+        ----------
+        text : str
+
+        Returns
+        -------
+        str
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            if self.writer is None:
+                await self.connect()
+            elif self.reader.at_eof():
+                # the server closed the idle connection
+                await self.connect()
+            request_id = next(self.ids)
+            marker_id = next(self.ids)
+            # the end marker of `RconClient.send` follows the command
+            packets = encode_packet(request_id, SERVERDATA_EXECCOMMAND,
+                                    text) \
+                + encode_packet(marker_id, SERVERDATA_RESPONSE_VALUE, '')
+            self.writer.write(packets)
+            try:
+                await self.writer.drain()
+                parts = []
+                while True:
+                    response_id, _, body = await self.read()
+                    if response_id == request_id:
+                        parts.append(body)
+                    elif ends_response(response_id, request_id):
+                        return ''.join(parts)
+            except BaseException:
+                self.close()
+                raise
+
+    async def read(self) -> tuple:
+        """Read a packet from the connection.
+
+        Returns
+        -------
+        tuple
+            The request ID, the type and the body of the packet.
+        """
+        header = await asyncio.wait_for(self.reader.readexactly(4),
+                                        self.timeout)
+        length = struct.unpack('<i', header)[0]
+        payload = await asyncio.wait_for(self.reader.readexactly(length),
+                                         self.timeout)
+        return decode_payload(payload)
+
+
+class AsyncRconActions:
+    """The actions of `RconActions` as coroutines, on one connection."""
+
+    def __init__(self, console: RconActions):
+        self.logger = console.logger
+        pool = console.pool
+        self.client = AsyncRconClient(pool.host, pool.port, pool.password,
+                                      pool.timeout)
+
+    async def check(self) -> bool:
+        """Check to see if the RCON server accepts connections.
+
+        Returns
+        -------
+        bool
+        """
+        self.logger.info('check')
+        try:
+            if self.client.writer is None:
+                await self.client.connect()
+            return True
+        except (OSError, RconError, asyncio.TimeoutError) as error:
+            self.logger.error(str(error))
+            return False
+
+    async def send(self, command: str):
+        """Send the command to the server.
+
+        Parameters
+        ----------
+        command : str
+
+        Returns
+        -------
+        bool|str
+            Output of the command or False.
+        """
+        self.logger.info(f'send({command})')
+        try:
+            return await self.client.command(command)
+        except (OSError, RconError, asyncio.IncompleteReadError,
+                asyncio.TimeoutError, struct.error) as error:
+            self.logger.error(str(error))
+            return False
+
+    async def send_many(self, commands: list, delay: float = 0) -> list:
+        """Send a sequence of commands to the server.
+
+        Parameters
+        ----------
+        commands : list
+        delay : float
+            Seconds to wait between two commands, without blocking the loop.
+
+        Returns
+        -------
+        list
+            Output of the command or False for each command.
+        """
+        self.logger.info(f'send_many({commands})')
+        results = []
+        for index, command in enumerate(commands):
+            if index > 0 and delay > 0:
+                await asyncio.sleep(delay)
+            results.append(await self.send(command))
+        return results
+
+
+class AsyncConsoleClient:
+    """The actions of `ConsoleClient` as coroutines."""
+
+    def __init__(self, client: ConsoleClient):
+        self.client = client
+        self.logger = client.logger
+
+    async def request(self, message: dict, timeout: float) -> dict:
+        """Send a request to the host and read the reply.
+
+        Parameters
+        ----------
+        message : dict
+        timeout : float
+            Seconds to wait for the connection and for the reply.
+
+        Returns
+        -------
+        dict
+        """
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_unix_connection(self.client.socket_path), timeout)
+        try:
+            writer.write(encode_request(message))
+            await writer.drain()
+            return decode_reply(await asyncio.wait_for(reader.readline(),
+                                                       timeout))
+        finally:
+            writer.close()
+
+    async def check(self) -> bool:
+        """Check to see if the host runs the process.
+
+        Returns
+        -------
+        bool
+        """
+        self.logger.info('check')
+        try:
+            reply = await self.request({'op': 'check'}, self.client.timeout)
+        except (OSError, ValueError, asyncio.TimeoutError) as error:
+            self.logger.debug(str(error))
+            return False
+        return bool(reply.get('running'))
+
+    async def send(self, command: str):
+        """Send the command to the console.
+
+        Parameters
+        ----------
+        command : str
+
+        Returns
+        -------
+        bool|str
+            An empty string or False on failure.
+        """
+        self.logger.info(f'send({command})')
+        return (await self.send_many([command]))[0]
+
+    async def send_many(self, commands: list, delay: float = 0) -> list:
+        """Send a sequence of commands to the console with one request.
+
+        The host waits between the commands, while the loop keeps running.
+
+        Parameters
+        ----------
+        commands : list
+        delay : float
+            Seconds to wait between two commands.
+
+        Returns
+        -------
+        list
+            An empty string or False for each command.
+        """
+        self.logger.info(f'send_many({commands})')
+        if len(commands) == 0:
+            return []
+        timeout = self.client.timeout + delay * (len(commands) - 1)
+        try:
+            reply = await self.request({'op': 'send', 'commands': commands,
+                                        'delay': delay}, timeout)
+        except (OSError, ValueError, asyncio.TimeoutError) as error:
+            self.logger.error(str(error))
+            return [False] * len(commands)
+        return self.client.results(reply, commands)
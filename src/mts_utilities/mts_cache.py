@@ -0,0 +1,136 @@
+import threading
+import time
+
+
+class Flight:
+    """A load in progress that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+        self.stale = False
+        self.value = None
+
+    def finish(self, value=None, error=None):
+        """Store the outcome of the load and wake up the waiting callers.
+
+        Parameters
+        ----------
+        value
+            The loaded value.
+        error : BaseException
+            The error raised by the loader, if any.
+        """
+        self.value = value
+        self.error = error
+        self.done.set()
+
+    def wait(self):
+        """Wait for the load to finish.
+
+        Returns
+        -------
+        The loaded value or raises the error of the loader.
+        """
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class TtlCache:
+    """Cache values for a limited time and coalesce concurrent loads.
+
+    Concurrent callers asking for the same key while it is loading wait for the
+    single load in flight instead of starting their own. A TTL of zero disables
+    storing values, but concurrent loads are still shared.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = float(ttl or 0)
+        self.lock = threading.Lock()
+        self.values = {}
+        self.flights = {}
+
+    def get(self, key, loader: callable):
+        """Get the cached value of the key or load it.
+
+        Parameters
+        ----------
+        key
+            The key of the value.
+        loader : callable
+            Function without arguments that loads the value.
+
+        Returns
+        -------
+        The cached or loaded value.
+        """
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+
+            flight = self.flights.get(key)
+            if flight is not None:
+                leader = False
+            else:
+                leader = True
+                flight = Flight()
+                self.flights[key] = flight
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = loader()
+        except BaseException as error:
+            self.land(key, flight, store=False)
+            flight.finish(error=error)
+            raise
+
+        self.land(key, flight, value)
+        flight.finish(value)
+        return value
+
+    def land(self, key, flight: Flight, value=None, store=True):
+        """Remove the finished flight and store its value when still valid.
+
+        Parameters
+        ----------
+        key
+            The key of the value.
+        flight : Flight
+            The finished flight.
+        value
+            The loaded value.
+        store : bool
+            Whether the value should be cached.
+        """
+        with self.lock:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+            if store and not flight.stale and self.ttl > 0:
+                self.values[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key=None):
+        """Remove a cached value, or all of them when no key is given.
+
+        Loads that are in flight are not stored once they finish, and the next
+        caller starts a fresh load.
+
+        Parameters
+        ----------
+        key
+            The key to remove.
+        """
+        with self.lock:
+            keys = list(self.flights) if key is None else [key]
+            for flight_key in keys:
+                flight = self.flights.pop(flight_key, None)
+                if flight is not None:
+                    flight.stale = True
+            if key is None:
+                self.values.clear()
+            else:
+                self.values.pop(key, None)
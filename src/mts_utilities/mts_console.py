@@ -0,0 +1,505 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+import mtslogger
+
+from .mts_log import Subscription
+
+log_level = 'info'
+
+# the directory that holds the src package, for launching the host module
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+class ConsoleRequestHandler(socketserver.StreamRequestHandler):
+    """Handle the JSON requests of one console client."""
+
+    def handle(self):
+        for raw in self.rfile:
+            try:
+                request = json.loads(raw)
+            except ValueError:
+                self.reply({'ok': False, 'error': 'invalid request'})
+                continue
+            if request.get('op') == 'follow':
+                self.follow()
+                return
+            self.reply(self.server.host.handle(request))
+
+    def reply(self, message: dict):
+        """Write the message as a line of JSON.
+
+        Parameters
+        ----------
+        message : dict
+        """
+        self.wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+
+    def follow(self):
+        """Write every new line of the console until the client leaves."""
+        subscription = self.server.host.subscribe()
+        try:
+            while self.server.host.running():
+                line = subscription.get(1)
+                if line is not None:
+                    self.reply({'line': line})
+        except OSError:
+            pass
+        finally:
+            self.server.host.unsubscribe(subscription)
+
+
+class ConsoleServer(socketserver.ThreadingMixIn,
+                    socketserver.UnixStreamServer):
+    """Serve the console of the host on a Unix domain socket."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, host):
+        self.host = host
+        super().__init__(socket_path, ConsoleRequestHandler)
+
+
+class ConsoleHost:
+    """Run a process and share its console over a Unix domain socket.
+
+    The host holds the stdin and stdout pipes of the process. Clients connect
+    to the socket to send commands, read the latest lines or follow the
+    output, without starting any process of their own. The host exits with the
+    process and removes the socket.
+    """
+
+    def __init__(self, socket_path: str, args: list, cwd: str = None,
+                 history: int = 1000):
+        self.socket_path = socket_path
+        self.args = args
+        self.cwd = cwd
+        self.history = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.subscriptions = []
+        self.process = None
+        self.server = None
+
+    def run(self) -> int:
+        """Run the process and serve its console until it exits.
+
+        The socket is bound before the process starts, so the process never
+        runs without a console.
+
+        Returns
+        -------
+        int
+            The exit code of the process.
+
+        Raises
+        ------
+        FileExistsError
+            When another host serves the socket.
+        OSError
+            When the socket cannot be bound or the process cannot start.
+        """
+        self.bind()
+        thread = None
+        try:
+            self.process = subprocess.Popen(self.args, cwd=self.cwd,
+                                            stdin=subprocess.PIPE,
+                                            stdout=subprocess.PIPE,
+                                            stderr=subprocess.STDOUT)
+            thread = threading.Thread(target=self.server.serve_forever,
+                                      args=(0.1,), daemon=True)
+            thread.start()
+            self.pump()
+            return self.process.wait()
+        finally:
+            if self.server is not None:
+                # shutdown waits for serve_forever, which may not have run
+                if thread is not None:
+                    self.server.shutdown()
+                self.server.server_close()
+                self.server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def bind(self):
+        """Bind the socket, replacing a socket that was left behind.
+
+        Raises
+        ------
+        FileExistsError
+            When another host accepts connections on the socket.
+        """
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                live = True
+            except OSError:
+                live = False
+            finally:
+                probe.close()
+            if live:
+                raise FileExistsError(f'another console host serves '
+                                      f'{self.socket_path}')
+            # nobody listens, so the socket was left behind by a crash
+            os.unlink(self.socket_path)
+        self.server = ConsoleServer(self.socket_path, self)
+        os.chmod(self.socket_path, 0o660)
+
+    def pump(self):
+        """Read the output of the process and hand out every line."""
+        for raw in iter(self.process.stdout.readline, b''):
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            with self.lock:
+                self.history.append(line)
+                subscriptions = list(self.subscriptions)
+            for subscription in subscriptions:
+                subscription.put(line)
+
+    def running(self) -> bool:
+        """Check if the process is running.
+
+        Returns
+        -------
+        bool
+        """
+        return self.process is not None and self.process.poll() is None
+
+    def subscribe(self) -> Subscription:
+        """Get a queue that receives every new line of output.
+
+        Returns
+        -------
+        Subscription
+        """
+        subscription = Subscription()
+        with self.lock:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop sending lines to the subscription.
+
+        Parameters
+        ----------
+        subscription : Subscription
+        """
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def write(self, commands: list, delay: float = 0):
+        """Write the commands to the stdin of the process.
+
+        Parameters
+        ----------
+        commands : list
+            Commands to write, in order.
+        delay : float
+            Seconds to wait between two commands.
+        """
+        with self.write_lock:
+            for index, command in enumerate(commands):
+                if index > 0 and delay > 0:
+                    time.sleep(delay)
+                self.process.stdin.write(command.encode('utf-8') + b'\n')
+                self.process.stdin.flush()
+
+    def handle(self, request: dict) -> dict:
+        """Handle a request of a client.
+
+        Parameters
+        ----------
+        request : dict
+            The request with its `op` and the arguments of the operation.
+
+        Returns
+        -------
+        dict
+            The reply, which has `ok` set to whether the request succeeded.
+        """
+        operation = request.get('op')
+        if operation == 'check':
+            return {'ok': True, 'running': self.running(),
+                    'pid': self.process.pid}
+        if operation == 'send':
+            if not self.running():
+                return {'ok': False, 'error': 'process is not running'}
+            try:
+                self.write(list(request.get('commands', [])),
+                           float(request.get('delay', 0)))
+            except OSError as error:
+                return {'ok': False, 'error': str(error)}
+            return {'ok': True}
+        if operation == 'tail':
+            count = int(request.get('lines', 50))
+            with self.lock:
+                lines = list(self.history)[-count:] if count > 0 else []
+            return {'ok': True, 'lines': lines}
+        return {'ok': False, 'error': f'unknown operation {operation}'}
+
+    def forward_signal(self, number: int, frame):  # pylint: disable=W0613
+        """Send the signal that the host received to the process.
+
+        Parameters
+        ----------
+        number : int
+        frame
+        """
+        if self.running():
+            self.process.send_signal(number)
+
+
+def encode_request(message: dict) -> bytes:
+    """Encode a request to the host as a line of JSON.
+
+    Parameters
+    ----------
+    message : dict
+
+    Returns
+    -------
+    bytes
+    """
+    return json.dumps(message).encode('utf-8') + b'\n'
+
+
+def decode_reply(line: bytes) -> dict:
+    """Decode the line that the host replied with.
+
+    Parameters
+    ----------
+    line : bytes
+
+    Returns
+    -------
+    dict
+
+    Raises
+    ------
+    ConnectionError
+        The host closed the connection without a reply.
+    """
+    if line == b'':
+        raise ConnectionError('The console host closed the connection.')
+    return json.loads(line)
+
+
+class ConsoleClient:
+    """All actions that use the console of a process run by a ConsoleHost.
+
+    This has the same interface as `ScreenActions` for sending commands.
+    """
+
+    def __init__(self, socket_path: str, logger=None, timeout: float = 5):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        if logger is None:
+            self.logger = mtslogger.get_logger(__name__, mode=log_level)
+        else:
+            self.logger = logger
+
+    def connect(self) -> socket.socket:
+        """Connect to the socket of the host.
+
+        Returns
+        -------
+        socket.socket
+        """
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(self.timeout)
+        try:
+            connection.connect(self.socket_path)
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def request(self, message: dict) -> dict:
+        """Send a request to the host and read the reply.
+
+        Parameters
+        ----------
+        message : dict
+
+        Returns
+        -------
+        dict
+        """
+        with self.connect() as connection:
+            connection.sendall(encode_request(message))
+            with connection.makefile('rb') as reader:
+                return decode_reply(reader.readline())
+
+    def check(self) -> bool:
+        """Check to see if the host runs the process.
+
+        Returns
+        -------
+        bool
+            Whether the process is running.
+        """
+        self.logger.info('check')
+        try:
+            return bool(self.request({'op': 'check'}).get('running'))
+        except (OSError, ValueError) as error:
+            self.logger.debug(str(error))
+            return False
+
+    def send(self, command: str):
+        """Send the provided command to the console.
+
+        Parameters
+        ----------
+        command : str
+            Command to send to the console.
+
+        Returns
+        -------
+        bool|str
+            An empty string or False on failure.
+        """
+        self.logger.info(f'send({command})')
+        return self.send_many([command])[0]
+
+    def send_many(self, commands: list, delay: float = 0) -> list:
+        """Send a sequence of commands to the console with one request.
+
+        Parameters
+        ----------
+        commands : list
+            Commands to send, in order.
+        delay : float
+            Seconds to wait between two commands.
+
+        Returns
+        -------
+        list
+            An empty string or False for each command.
+        """
+        self.logger.info(f'send_many({commands})')
+        if len(commands) == 0:
+            return []
+        try:
+            reply = self.request({'op': 'send', 'commands': commands,
+                                  'delay': delay})
+        except (OSError, ValueError) as error:
+            self.logger.error(str(error))
+            return [False] * len(commands)
+        return self.results(reply, commands)
+
+    def results(self, reply: dict, commands: list) -> list:
+        """Get the result of each command from the reply to a send request.
+
+        Parameters
+        ----------
+        reply : dict
+        commands : list
+
+        Returns
+        -------
+        list
+            An empty string or False for each command.
+        """
+        if not reply.get('ok'):
+            self.logger.error(reply.get('error'))
+            return [False] * len(commands)
+        return [''] * len(commands)
+
+    def tail(self, lines: int = 50) -> list:
+        """Get the latest lines of output.
+
+        Parameters
+        ----------
+        lines : int
+
+        Returns
+        -------
+        list
+        """
+        try:
+            return self.request({'op': 'tail', 'lines': lines}).get('lines', [])
+        except (OSError, ValueError) as error:
+            self.logger.error(str(error))
+            return []
+
+
+def launch(socket_path: str, args: list, cwd: str = None,
+           timeout: float = 10) -> bool:
+    """Start a detached ConsoleHost for the command and wait for its socket.
+
+    Parameters
+    ----------
+    socket_path : str
+        The path of the Unix domain socket.
+    args : list
+        The command to run.
+    cwd : str
+        The working directory of the command.
+    timeout : float
+        Seconds to wait for the socket.
+
+    Returns
+    -------
+    bool
+        Whether the host accepts connections.
+    """
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(
+        path for path in [ROOT, environment.get('PYTHONPATH')] if path
+    )
+    subprocess.Popen(
+        [sys.executable, '-m', 'src.mts_utilities.mts_console', socket_path,
+         cwd or os.getcwd(), '--', *args],
+        env=environment, start_new_session=True, stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    client = ConsoleClient(socket_path, logger=mtslogger.get_logger(
+        __name__, mode=log_level))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.check():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def main(argv: list) -> int:
+    """Run a ConsoleHost from the command line.
+
+    The arguments are the socket path, the working directory, `--` and the
+    command to run.
+
+    Parameters
+    ----------
+    argv : list
+
+    Returns
+    -------
+    int
+        The exit code of the command.
+    """
+    if len(argv) < 4 or argv[2] != '--':
+        print('usage: mts_console SOCKET CWD -- COMMAND...', file=sys.stderr)
+        return 2
+    host = ConsoleHost(argv[0], argv[3:], argv[1])
+    signal.signal(signal.SIGTERM, host.forward_signal)
+    signal.signal(signal.SIGINT, host.forward_signal)
+    try:
+        return host.run()
+    except OSError as error:
+        print(f'mts_console: {error}', file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,214 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+
+
+class ControlError(Exception):
+    """The daemon failed to run the action."""
+
+
+class ControlUnavailable(ControlError):
+    """No daemon listens on the control socket."""
+
+
+class ControlRequestHandler(socketserver.StreamRequestHandler):
+    """Run the action of one control request and reply with its result."""
+
+    def handle(self):
+        raw = self.rfile.readline()
+        try:
+            action = json.loads(raw).get('action')
+        except (ValueError, AttributeError):
+            self.reply({'ok': False, 'error': 'invalid request'})
+            return
+        self.reply(self.server.control.call(action))
+
+    def reply(self, message: dict):
+        """Write the message as a line of JSON.
+
+        Parameters
+        ----------
+        message : dict
+        """
+        line = json.dumps(message, default=str).encode('utf-8')
+        self.wfile.write(line + b'\n')
+
+
+class ControlSocketServer(socketserver.ThreadingMixIn,
+                          socketserver.UnixStreamServer):
+    """Serve control requests on a Unix domain socket."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, control):
+        self.control = control
+        super().__init__(socket_path, ControlRequestHandler)
+
+
+class ControlServer:
+    """Let other processes run actions in this process.
+
+    A long-running process, like the supervisor or the API, serves its actions
+    on a Unix domain socket. The command line forwards actions to it, so they
+    use the state and the caches of the running process instead of starting
+    from scratch. Only one process serves a socket; `start` returns False
+    when another one already does.
+    """
+
+    def __init__(self, socket_path: str, actions: dict):
+        self.socket_path = socket_path
+        self.actions = actions
+        self.server = None
+        self.thread = None
+
+    def start(self) -> bool:
+        """Serve the actions on a background thread.
+
+        Returns
+        -------
+        bool
+            Whether this process serves the socket.
+        """
+        if self.server is not None:
+            return True
+        if os.path.exists(self.socket_path):
+            if ControlClient(self.socket_path).available():
+                return False
+            # nobody listens, so the socket was left behind by a crash
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                # like a socket of another user in the sticky temporary
+                # directory
+                return False
+        try:
+            self.server = ControlSocketServer(self.socket_path, self)
+        except OSError:
+            return False
+        try:
+            os.chmod(self.socket_path, 0o660)
+        except OSError:
+            self.server.server_close()
+            self.server = None
+            return False
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       args=(0.1,), name='control',
+                                       daemon=True)
+        self.thread.start()
+        return True
+
+    def call(self, action: str) -> dict:
+        """Run the action and get the reply for the client.
+
+        Parameters
+        ----------
+        action : str
+            The name of the action.
+
+        Returns
+        -------
+        dict
+            The reply, with `result` on success and `error` on failure.
+        """
+        function = self.actions.get(action)
+        if function is None:
+            return {'ok': False, 'error': f'unknown action {action}'}
+        try:
+            return {'ok': True, 'result': function()}
+        except Exception as error:  # pylint: disable=broad-except
+            return {'ok': False, 'error': f'{type(error).__name__}: {error}'}
+
+    def close(self):
+        """Stop serving and remove the socket."""
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class ControlClient:
+    """Forward actions to the process that serves the control socket."""
+
+    def __init__(self, socket_path: str, connect_timeout: float = 1):
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+
+    def connect(self) -> socket.socket:
+        """Connect to the control socket.
+
+        Returns
+        -------
+        socket.socket
+
+        Raises
+        ------
+        ControlUnavailable
+            When no process serves the socket.
+        """
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(self.connect_timeout)
+        try:
+            connection.connect(self.socket_path)
+        except OSError as error:
+            connection.close()
+            raise ControlUnavailable(str(error)) from error
+        return connection
+
+    def available(self) -> bool:
+        """Check if a process serves the control socket.
+
+        Returns
+        -------
+        bool
+        """
+        try:
+            self.connect().close()
+        except ControlUnavailable:
+            return False
+        return True
+
+    def call(self, action: str, timeout: float = None):
+        """Run the action in the process that serves the socket.
+
+        Parameters
+        ----------
+        action : str
+            The name of the action.
+        timeout : float
+            Seconds to wait for the result, or None to wait as long as the
+            action takes.
+
+        Returns
+        -------
+        object
+            The result of the action.
+
+        Raises
+        ------
+        ControlUnavailable
+            When no process serves the socket.
+        ControlError
+            When the action failed in the serving process.
+        """
+        with self.connect() as connection:
+            connection.settimeout(timeout)
+            try:
+                connection.sendall(json.dumps({'action': action})
+                                   .encode('utf-8') + b'\n')
+                with connection.makefile('rb') as reader:
+                    line = reader.readline()
+            except socket.timeout as error:
+                raise ControlError(f'{action} timed out') from error
+            except OSError as error:
+                raise ControlError(str(error)) from error
+        if line == b'':
+            raise ControlError('The control socket closed the connection.')
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise ControlError(reply.get('error'))
+        return reply.get('result')
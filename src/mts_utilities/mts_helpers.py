@@ -1,5 +1,17 @@
+import os
 import platform
+import shutil
 import subprocess
+import time
+from collections import namedtuple
+
+from .mts_metrics import registry
+
+CommandResult = namedtuple('CommandResult',
+                           ['args', 'returncode', 'stdout', 'elapsed'])
+
+# resolved executables keyed by the command name and the search path
+command_paths = {}
 
 
 def execute(command: str):
@@ -17,25 +29,89 @@ def execute(command: str):
     str
         The result of the process.
     """
-    result = subprocess.run(command, capture_output=True, check=True, text=True,
-                            shell=True).stdout
+    registry.inc('subprocess_total', command='shell')
+    with registry.timer('subprocess_seconds', command='shell'):
+        result = subprocess.run(command, capture_output=True, check=True,
+                                text=True, shell=True).stdout
     return result.strip()
 
 
+def run(args: list, check: bool = True, timeout: float = None):
+    """Run the command arguments directly without a shell.
+
+    Since no shell is involved, the arguments are passed as they are and need
+    no quoting.
+
+    Parameters
+    ----------
+    args : list
+        The executable followed by its arguments.
+    check : bool
+        Whether to raise an error when the command exits with a non-zero code.
+    timeout : float
+        The number of seconds to wait for the command to finish.
+
+    Returns
+    -------
+    CommandResult
+        The arguments, exit code, stripped stdout and elapsed seconds.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        The command failed and check is True.
+    """
+    command = os.path.basename(args[0])
+    registry.inc('subprocess_total', command=command)
+    started = time.perf_counter()
+    try:
+        completed = subprocess.run(args, capture_output=True, check=check,
+                                   text=True, timeout=timeout)
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe('subprocess_seconds', elapsed, command=command)
+    return CommandResult(args, completed.returncode, completed.stdout.strip(),
+                         elapsed)
+
+
 def get_command_path(command_name: str):
     """Get the full path of the executable identified by the command_name.
 
-    This only works on operating systems that have the `which` command.
+    The executable is looked up in the search path without starting a process
+    and the path is remembered until the search path changes, the executable
+    disappears or `clear_command_paths` is called.
 
     Parameters
     ----------
     command_name : str
-        The command name to lookup on Linux
+        The command name to lookup
 
     Returns
     -------
-    bool|str
-        Full path of the executable or False on failure.
+    str
+        Full path of the executable.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        The executable could not be found.
     """
-    locator = 'where' if platform.system() == 'Windows' else 'which'
-    return execute(f'{locator} {command_name}')
+    search_path = os.environ.get('PATH', os.defpath)
+    key = (command_name, search_path)
+    path = command_paths.get(key)
+    if path is not None and os.access(path, os.X_OK):
+        return path
+
+    path = shutil.which(command_name, path=search_path)
+    if path is None:
+        command_paths.pop(key, None)
+        locator = 'where' if platform.system() == 'Windows' else 'which'
+        raise subprocess.CalledProcessError(1, [locator, command_name], '')
+
+    command_paths[key] = path
+    return path
+
+
+def clear_command_paths():
+    """Forget every resolved executable path."""
+    command_paths.clear()
@@ -0,0 +1,384 @@
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import threading
+import time
+
+import mtslogger
+
+log_level = 'info'
+
+# inotify events for files that change inside a watched directory
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+WATCH_EVENTS = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+
+class Inotify:
+    """Watch a directory for changes with the Linux inotify API."""
+
+    libc = None
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.fd = None
+
+    @classmethod
+    def load(cls):
+        """Load the C library that provides inotify.
+
+        Returns
+        -------
+        ctypes.CDLL|None
+            The library or None when inotify is not available.
+        """
+        if cls.libc is None:
+            name = ctypes.util.find_library('c')
+            try:
+                libc = ctypes.CDLL(name, use_errno=True)
+                libc.inotify_init1  # pylint: disable=pointless-statement
+            except (OSError, AttributeError, TypeError):
+                cls.libc = False
+            else:
+                cls.libc = libc
+        return cls.libc or None
+
+    def start(self) -> bool:
+        """Start watching the directory.
+
+        Returns
+        -------
+        bool
+            Whether the directory is being watched.
+        """
+        if self.fd is not None:
+            return True
+        libc = self.load()
+        if libc is None or not os.path.isdir(self.directory):
+            return False
+
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return False
+        watch = libc.inotify_add_watch(fd, os.fsencode(self.directory),
+                                       WATCH_EVENTS)
+        if watch < 0:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for a change in the directory.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait at most.
+
+        Returns
+        -------
+        bool
+            Whether there was a change before the timeout.
+        """
+        readable, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if len(readable) == 0:
+            return False
+        # drain the events since the log is read from its offset anyway
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        """Stop watching the directory."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class LogFollower:
+    """Follow the lines appended to a log file, across log rotations.
+
+    The follower starts at the end of the current file, so only lines written
+    after it was created are read. When the file is replaced by a new one or
+    truncated, the new file is read from its beginning. Changes are detected
+    with inotify where available, with a polling fallback.
+    """
+
+    def __init__(self, path: str, from_start: bool = False,
+                 poll_interval: float = 0.25):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.buffer = b''
+        self.inode = None
+        self.offset = 0
+        self.watcher = Inotify(os.path.dirname(path) or '.')
+
+        if not from_start:
+            try:
+                stat = os.stat(path)
+                self.inode = stat.st_ino
+                self.offset = stat.st_size
+            except OSError:
+                pass
+
+    def read_lines(self) -> list:
+        """Read the complete lines written since the last read.
+
+        Returns
+        -------
+        list
+            The new lines without line endings.
+        """
+        try:
+            handle = open(self.path, 'rb')
+        except OSError:
+            return []
+
+        with handle:
+            stat = os.fstat(handle.fileno())
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                # the log was rotated or truncated, so start from the top
+                self.inode = stat.st_ino
+                self.offset = 0
+                self.buffer = b''
+            if stat.st_size == self.offset:
+                return []
+            handle.seek(self.offset)
+            data = handle.read()
+
+        self.offset += len(data)
+        lines = (self.buffer + data).split(b'\n')
+        self.buffer = lines.pop()
+        return [line.rstrip(b'\r').decode('utf-8', 'replace')
+                for line in lines]
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for the log to change.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait at most.
+
+        Returns
+        -------
+        bool
+            Whether a change was noticed; polling always reports a change.
+        """
+        if self.watcher.start():
+            return self.watcher.wait(timeout)
+        time.sleep(max(min(timeout, self.poll_interval), 0))
+        return True
+
+    def follow(self, timeout: float = None):
+        """Generate the new lines as they are written.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to follow the log, or None to follow it forever.
+
+        Yields
+        ------
+        str
+            Each new line.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            yield from self.read_lines()
+            if deadline is None:
+                self.wait(1)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self.wait(min(remaining, 1))
+
+    def close(self):
+        """Stop watching the log."""
+        self.watcher.close()
+
+
+class Subscription:
+    """A bounded queue of log lines for one subscriber.
+
+    When the subscriber falls behind and the queue is full, new lines are
+    dropped and counted instead of using more memory.
+    """
+
+    def __init__(self, size: int = 1000):
+        self.lines = queue.Queue(maxsize=size)
+        self.dropped = 0
+
+    def put(self, line: str):
+        """Add a line without blocking, dropping it when the queue is full.
+
+        Parameters
+        ----------
+        line : str
+        """
+        try:
+            self.lines.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def get(self, timeout: float = None):
+        """Get the next line.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait for a line.
+
+        Returns
+        -------
+        str|None
+            The line or None when no line arrived before the timeout.
+        """
+        try:
+            return self.lines.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def take_dropped(self) -> int:
+        """Get the number of dropped lines and reset it.
+
+        Returns
+        -------
+        int
+        """
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class LogTailer:
+    """Follow a log on a single thread and fan the lines out.
+
+    Every subscriber gets its own bounded queue, and listeners are called with
+    each line on the tailer thread. A listener that raises is logged and does
+    not stop the others. The thread starts with the first subscriber or
+    listener and stops after the last one is removed, so any number of
+    subscribers cost one reader of the file.
+    """
+
+    def __init__(self, path: str, queue_size: int = 1000,
+                 poll_interval: float = 0.25, logger=None):
+        if logger is None:
+            self.logger = mtslogger.get_logger(__name__, mode=log_level)
+        else:
+            self.logger = logger
+        self.path = path
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.subscriptions = []
+        self.listeners = []
+        self.thread = None
+
+    def subscribe(self) -> Subscription:
+        """Get a queue that receives every new line.
+
+        Returns
+        -------
+        Subscription
+        """
+        subscription = Subscription(self.queue_size)
+        with self.lock:
+            self.subscriptions.append(subscription)
+            self.ensure_thread()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop sending lines to the subscription.
+
+        Parameters
+        ----------
+        subscription : Subscription
+        """
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def add_listener(self, listener: callable):
+        """Call the listener with every new line on the tailer thread.
+
+        Listeners should return quickly, since they delay the other
+        subscribers.
+
+        Parameters
+        ----------
+        listener : callable
+            Function that takes the line.
+        """
+        with self.lock:
+            self.listeners.append(listener)
+            self.ensure_thread()
+
+    def remove_listener(self, listener: callable):
+        """Stop calling the listener.
+
+        Parameters
+        ----------
+        listener : callable
+        """
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def ensure_thread(self):
+        """Start the tailer thread if it is not running.
+
+        The lock must be held by the caller.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='log-tailer',
+                                           daemon=True)
+            self.thread.start()
+
+    def run(self):
+        """Read the new lines and send them out until nobody listens."""
+        follower = LogFollower(self.path, poll_interval=self.poll_interval)
+        try:
+            while True:
+                lines = follower.read_lines()
+                with self.lock:
+                    if len(self.subscriptions) == 0 \
+                            and len(self.listeners) == 0:
+                        self.thread = None
+                        return
+                    subscriptions = list(self.subscriptions)
+                    listeners = list(self.listeners)
+
+                for line in lines:
+                    for listener in listeners:
+                        self.notify(listener, line)
+                    for subscription in subscriptions:
+                        subscription.put(line)
+                follower.wait(1)
+        finally:
+            follower.close()
+            # let the next subscriber start a new thread if this one failed
+            with self.lock:
+                if self.thread is threading.current_thread():
+                    self.thread = None
+
+    def notify(self, listener: callable, line: str):
+        """Call the listener with the line and log what it raises.
+
+        Parameters
+        ----------
+        listener : callable
+        line : str
+        """
+        try:
+            listener(line)
+        except Exception as error:  # pylint: disable=broad-except
+            self.logger.error(f'log listener {listener!r} failed: {error}')
@@ -0,0 +1,332 @@
+import bisect
+import functools
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# the upper bounds in seconds of the latency histograms
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5,
+           5, 10, 30, 60, 120)
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+
+class Shard:
+    """The metrics recorded by one thread.
+
+    Only the owning thread changes its shard, so recording needs no lock.
+    """
+
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+
+class ShardOwner:
+    """Kept by the thread of a shard, to notice when the thread ends."""
+
+
+class Registry:
+    """Counters and latency histograms aggregated from per-thread shards.
+
+    Every thread records into its own shard, and the shards are only summed
+    when the metrics are collected. When a thread ends, its shard is merged
+    into the shard of the finished threads, so threads that serve a single
+    request do not use more memory over time.
+    """
+
+    def __init__(self, prefix: str = '', buckets: tuple = BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.local = threading.local()
+        # shards may be retired by the thread that holds the lock
+        self.lock = threading.RLock()
+        self.shards = []
+        self.retired = Shard()
+        self.descriptions = {}
+
+    def describe(self, name: str, kind: str, description: str):
+        """Set the type and help text of the metric.
+
+        Parameters
+        ----------
+        name : str
+            The name of the metric without the prefix.
+        kind : str
+            COUNTER or HISTOGRAM.
+        description : str
+            The help text.
+        """
+        self.descriptions[name] = (kind, description)
+
+    def shard(self) -> Shard:
+        """Get the shard of the current thread, creating it when needed.
+
+        Returns
+        -------
+        Shard
+        """
+        try:
+            return self.local.shard
+        except AttributeError:
+            pass
+        shard = Shard()
+        owner = ShardOwner()
+        with self.lock:
+            self.shards.append(shard)
+        # the thread-local values are released when the thread ends
+        weakref.finalize(owner, self.retire, shard)
+        self.local.shard = shard
+        self.local.owner = owner
+        return shard
+
+    def retire(self, shard: Shard):
+        """Merge the shard of a finished thread into the retired shard.
+
+        Parameters
+        ----------
+        shard : Shard
+        """
+        with self.lock:
+            if shard in self.shards:
+                self.shards.remove(shard)
+            merge(self.retired, shard)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Increase the counter.
+
+        Parameters
+        ----------
+        name : str
+            The name of the counter, ending with `_total`.
+        amount : float
+        labels
+            The labels of the counter.
+        """
+        counters = self.shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        """Record the value in the histogram.
+
+        Parameters
+        ----------
+        name : str
+            The name of the histogram.
+        value : float
+            The value, usually a duration in seconds.
+        labels
+            The labels of the histogram.
+        """
+        histograms = self.shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+        histogram = histograms.get(key)
+        if histogram is None:
+            # the count of every bucket and +Inf, then the sum
+            histogram = [0] * (len(self.buckets) + 1) + [0.0]
+            histograms[key] = histogram
+        histogram[bisect.bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Record the duration of the block in the histogram.
+
+        Parameters
+        ----------
+        name : str
+        labels
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name: str, **labels):
+        """Decorate a function to record the duration of each call.
+
+        Parameters
+        ----------
+        name : str
+        labels
+
+        Returns
+        -------
+        callable
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def collect(self) -> Shard:
+        """Sum the shards of every thread.
+
+        Returns
+        -------
+        Shard
+        """
+        total = Shard()
+        with self.lock:
+            shards = [self.retired, *self.shards]
+            # copying a dictionary is atomic, so the owners keep recording
+            snapshots = [(dict(shard.counters), dict(shard.histograms))
+                         for shard in shards]
+        for counters, histograms in snapshots:
+            snapshot = Shard()
+            snapshot.counters = counters
+            snapshot.histograms = {key: list(value)
+                                   for key, value in histograms.items()}
+            merge(total, snapshot)
+        return total
+
+    def render(self) -> str:
+        """Get the metrics in the Prometheus text format.
+
+        Returns
+        -------
+        str
+        """
+        total = self.collect()
+        series = {}
+        for (name, labels), value in total.counters.items():
+            series.setdefault(name, []).append((labels, value))
+        for (name, labels), value in total.histograms.items():
+            series.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(series):
+            kind, description = self.descriptions.get(
+                name, (COUNTER if name.endswith('_total') else HISTOGRAM, ''))
+            full_name = self.prefix + name
+            if description != '':
+                lines.append(f'# HELP {full_name} {description}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for labels, value in sorted(series[name],
+                                        key=lambda item: str(item[0])):
+                if isinstance(value, list):
+                    lines.extend(self.render_histogram(full_name, labels,
+                                                       value))
+                else:
+                    lines.append(f'{full_name}{format_labels(labels)} '
+                                 f'{format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def render_histogram(self, name: str, labels: tuple,
+                         histogram: list) -> list:
+        """Get the lines of a histogram in the Prometheus text format.
+
+        Parameters
+        ----------
+        name : str
+        labels : tuple
+        histogram : list
+
+        Returns
+        -------
+        list
+        """
+        lines = []
+        cumulative = 0
+        bounds = [format_value(bound) for bound in self.buckets] + ['+Inf']
+        for bound, count in zip(bounds, histogram[:-1]):
+            cumulative += count
+            lines.append(f'{name}_bucket'
+                         f'{format_labels(labels + (("le", bound),))} '
+                         f'{cumulative}')
+        lines.append(f'{name}_sum{format_labels(labels)} '
+                     f'{format_value(histogram[-1])}')
+        lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+        return lines
+
+    def clear(self):
+        """Forget every recorded value."""
+        with self.lock:
+            self.retired = Shard()
+            for shard in self.shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+
+def merge(total: Shard, shard: Shard):
+    """Add the values of the shard to the total.
+
+    Parameters
+    ----------
+    total : Shard
+    shard : Shard
+    """
+    for key, value in list(shard.counters.items()):
+        total.counters[key] = total.counters.get(key, 0) + value
+    for key, value in list(shard.histograms.items()):
+        histogram = total.histograms.get(key)
+        if histogram is None:
+            total.histograms[key] = list(value)
+        else:
+            total.histograms[key] = [first + second for first, second
+                                     in zip(histogram, value)]
+
+
+def format_labels(labels: tuple) -> str:
+    """Format the labels of a sample.
+
+    Parameters
+    ----------
+    labels : tuple
+        The names and values of the labels.
+
+    Returns
+    -------
+    str
+    """
+    if len(labels) == 0:
+        return ''
+    escaped = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + escaped + '}'
+
+
+def format_value(value: float) -> str:
+    """Format the value of a sample.
+
+    Parameters
+    ----------
+    value : float
+
+    Returns
+    -------
+    str
+    """
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# the metrics of this package
+registry = Registry('minecraft_helpers_')
+registry.describe('subprocess_total', COUNTER,
+                  'Processes started, by command.')
+registry.describe('subprocess_seconds', HISTOGRAM,
+                  'Seconds until started processes exited, by command.')
+registry.describe('screen_seconds', HISTOGRAM,
+                  'Seconds spent in screen actions, by action.')
+registry.describe('probe_seconds', HISTOGRAM,
+                  'Seconds spent in status probes, by probe.')
+registry.describe('action_seconds', HISTOGRAM,
+                  'Seconds spent in server actions, by action.')
+registry.describe('http_requests_total', COUNTER,
+                  'API requests, by method, route and code.')
+registry.describe('http_request_seconds', HISTOGRAM,
+                  'Seconds until API responses were returned, by method and '
+                  'route.')
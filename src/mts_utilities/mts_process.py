@@ -0,0 +1,163 @@
+import os
+import select
+import signal
+import time
+
+proc_path = '/proc'
+
+
+def is_alive(pid: int) -> bool:
+    """Check if the process is running.
+
+    Processes that exited but were not reaped by their parent yet (zombies)
+    are not running.
+
+    Parameters
+    ----------
+    pid : int
+        The process ID.
+
+    Returns
+    -------
+    bool
+    """
+    try:
+        with open(os.path.join(proc_path, str(pid), 'stat')) as handle:
+            stat = handle.read()
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return signal_alive(pid)
+    # the state follows the command name, which is in parentheses
+    state = stat[stat.rfind(')') + 2:][:1]
+    return state not in ('Z', 'X', '')
+
+
+def signal_alive(pid: int) -> bool:
+    """Check if the process exists by sending it the null signal.
+
+    Parameters
+    ----------
+    pid : int
+        The process ID.
+
+    Returns
+    -------
+    bool
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def open_pidfds(pids: list) -> dict:
+    """Open a process file descriptor for every running process.
+
+    Parameters
+    ----------
+    pids : list
+        The process IDs.
+
+    Returns
+    -------
+    dict|None
+        The file descriptors with their process IDs, or None when process
+        file descriptors are not supported.
+    """
+    if not hasattr(os, 'pidfd_open'):
+        return None
+    descriptors = {}
+    for pid in pids:
+        try:
+            descriptors[os.pidfd_open(pid)] = pid
+        except ProcessLookupError:
+            continue
+        except OSError:
+            for descriptor in descriptors:
+                os.close(descriptor)
+            return None
+    return descriptors
+
+
+def wait_for_exit(pids: list, timeout: float,
+                  poll_interval: float = 0.1) -> bool:
+    """Wait for every process to exit.
+
+    On Linux 5.3 and newer, this waits on process file descriptors and wakes up
+    the moment the processes exit. Otherwise, the processes are checked every
+    poll interval.
+
+    Parameters
+    ----------
+    pids : list
+        The process IDs.
+    timeout : float
+        Seconds to wait at most.
+    poll_interval : float
+        Seconds between checks when polling.
+
+    Returns
+    -------
+    bool
+        Whether every process exited.
+    """
+    deadline = time.monotonic() + timeout
+    descriptors = open_pidfds(pids)
+    if descriptors is None:
+        remaining = [pid for pid in pids if is_alive(pid)]
+        while len(remaining) > 0:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+            remaining = [pid for pid in remaining if is_alive(pid)]
+        return True
+
+    try:
+        poller = select.poll()
+        for descriptor in descriptors:
+            poller.register(descriptor, select.POLLIN)
+        pending = set(descriptors)
+        while len(pending) > 0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            for descriptor, _ in poller.poll(remaining * 1000):
+                poller.unregister(descriptor)
+                pending.discard(descriptor)
+        return True
+    finally:
+        for descriptor in descriptors:
+            os.close(descriptor)
+
+
+def terminate(pids: list, timeout: float = 10) -> bool:
+    """Ask the processes to terminate and kill them if they do not.
+
+    The processes get SIGTERM and the timeout to exit, then SIGKILL and the
+    timeout again.
+
+    Parameters
+    ----------
+    pids : list
+        The process IDs.
+    timeout : float
+        Seconds to wait after each signal.
+
+    Returns
+    -------
+    bool
+        Whether every process exited.
+    """
+    for sent in (signal.SIGTERM, signal.SIGKILL):
+        for pid in pids:
+            try:
+                os.kill(pid, sent)
+            except ProcessLookupError:
+                continue
+        if wait_for_exit(pids, timeout):
+            return True
+    return False
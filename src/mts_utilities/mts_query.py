@@ -0,0 +1,200 @@
+import os
+import socket
+import struct
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .mts_cache import TtlCache
+
+# packet types of the GameSpy4 query protocol
+MAGIC = b'\xfe\xfd'
+TYPE_HANDSHAKE = 9
+TYPE_STAT = 0
+# the padding of a full stat request and the sections of its reply
+FULL_STAT_PADDING = b'\x00\x00\x00\x00'
+KEYS_HEADER = b'splitnum\x00\x80\x00'
+PLAYERS_HEADER = b'\x01player_\x00\x00'
+MAX_DATAGRAM = 65535
+
+# the full stat of a server
+QueryResult = namedtuple('QueryResult', ['motd', 'version', 'map', 'online',
+                                         'maximum', 'plugins', 'players'])
+
+
+class QueryError(Exception):
+    """QueryError class."""
+
+
+class QueryClient:
+    """Query a Minecraft server with the GameSpy4 protocol over UDP.
+
+    The server has to set `enable-query=true`. A challenge token is needed for
+    every stat request, and the server changes it every 30 seconds, so the
+    token is cached for a shorter time and renewed when a request goes
+    unanswered.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 25565,
+                 timeout: float = 1, token_ttl: float = 25):
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        self.tokens = TtlCache(token_ttl)
+        # the server only uses the lower four bits of every byte
+        self.session = struct.unpack('>i', os.urandom(4))[0] & 0x0F0F0F0F
+        self.lock = threading.Lock()
+
+    def request(self, packet_type: int, payload: bytes = b'') -> bytes:
+        """Send a request and get the body of the reply.
+
+        Parameters
+        ----------
+        packet_type : int
+        payload : bytes
+
+        Returns
+        -------
+        bytes
+            The reply after its type and session.
+
+        Raises
+        ------
+        OSError
+            When the server does not answer within the timeout.
+        QueryError
+            When the reply does not belong to the request.
+        """
+        session = struct.pack('>i', self.session)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as connection:
+            connection.settimeout(self.timeout)
+            connection.connect((self.host, self.port))
+            connection.send(MAGIC + bytes([packet_type]) + session + payload)
+            reply = connection.recv(MAX_DATAGRAM)
+        if len(reply) < 5 or reply[0] != packet_type or reply[1:5] != session:
+            raise QueryError('The reply does not match the request.')
+        return reply[5:]
+
+    def handshake(self) -> int:
+        """Get a new challenge token from the server.
+
+        Returns
+        -------
+        int
+        """
+        body = self.request(TYPE_HANDSHAKE)
+        try:
+            return int(body.rstrip(b'\x00'))
+        except ValueError as error:
+            raise QueryError('The challenge token is not a number.') \
+                from error
+
+    def token(self) -> int:
+        """Get the cached challenge token or a new one.
+
+        Returns
+        -------
+        int
+        """
+        return self.tokens.get('token', self.handshake)
+
+    def full_stat(self) -> QueryResult:
+        """Get the full stat of the server, with the names of the players.
+
+        When the server ignores the request, which it does with an expired
+        token, the token is renewed and the request is sent once more.
+
+        Returns
+        -------
+        QueryResult
+
+        Raises
+        ------
+        OSError
+            When the server cannot be reached.
+        QueryError
+            When the reply is not a valid stat.
+        """
+        with self.lock:
+            try:
+                body = self.stat_request()
+            except socket.timeout:
+                self.tokens.invalidate()
+                body = self.stat_request()
+        return parse_full_stat(body)
+
+    def stat_request(self) -> bytes:
+        """Send the full stat request with the current token.
+
+        Returns
+        -------
+        bytes
+        """
+        token = struct.pack('>i', self.token())
+        return self.request(TYPE_STAT, token + FULL_STAT_PADDING)
+
+
+def parse_full_stat(body: bytes) -> QueryResult:
+    """Parse the reply of a full stat request.
+
+    Parameters
+    ----------
+    body : bytes
+        The reply after its type and session.
+
+    Returns
+    -------
+    QueryResult
+    """
+    if not body.startswith(KEYS_HEADER):
+        raise QueryError('The reply is not a full stat.')
+    keys, separator, names = body[len(KEYS_HEADER):].partition(PLAYERS_HEADER)
+    if separator == b'':
+        raise QueryError('The reply has no players section.')
+
+    fields = keys.decode('utf-8', 'replace').split('\x00')
+    info = dict(zip(fields[0::2], fields[1::2]))
+    players = [name for name in names.decode('utf-8', 'replace')
+               .split('\x00') if name != '']
+    try:
+        return QueryResult(
+            motd=info.get('hostname', ''),
+            version=info.get('version'),
+            map=info.get('map'),
+            online=int(info.get('numplayers', len(players))),
+            maximum=int(info.get('maxplayers', 0)),
+            plugins=info.get('plugins', ''),
+            players=players,
+        )
+    except ValueError as error:
+        raise QueryError('The player counts are not numbers.') from error
+
+
+def poll(clients: list, max_workers: int = 8) -> list:
+    """Get the full stat of every server at the same time.
+
+    Parameters
+    ----------
+    clients : list
+        The QueryClient of every server.
+    max_workers : int
+        The number of servers to query at once.
+
+    Returns
+    -------
+    list
+        The QueryResult of every server, or the error when it failed, in the
+        order of the clients.
+    """
+    def query(client):
+        try:
+            return client.full_stat()
+        except (OSError, QueryError) as error:
+            return error
+
+    if len(clients) == 0:
+        return []
+    workers = min(max_workers, len(clients))
+    with ThreadPoolExecutor(max_workers=workers,
+                            thread_name_prefix='query') as executor:
+        return list(executor.map(query, clients))
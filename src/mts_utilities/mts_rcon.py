@@ -0,0 +1,477 @@
+import itertools
+import queue
+import select
+import socket
+import struct
+import time
+
+import mtslogger
+
+log_level = 'info'
+
+# packet types of the Source RCON protocol
+SERVERDATA_AUTH = 3
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_RESPONSE_VALUE = 0
+
+# Minecraft splits longer responses into fragments of this many bytes
+MAX_FRAGMENT = 4096
+# Minecraft answers a packet of an unknown type with this request ID
+UNKNOWN_REQUEST = -1
+
+
+def encode_packet(request_id: int, packet_type: int, body: str) -> bytes:
+    """Encode a packet with its length.
+
+    Parameters
+    ----------
+    request_id : int
+        The ID that the server copies into its response.
+    packet_type : int
+        The type of the packet.
+    body : str
+        The body of the packet.
+
+    Returns
+    -------
+    bytes
+    """
+    payload = struct.pack('<ii', request_id, packet_type) \
+        + body.encode('utf-8') + b'\x00\x00'
+    return struct.pack('<i', len(payload)) + payload
+
+
+def decode_payload(payload: bytes) -> tuple:
+    """Decode a packet without its length.
+
+    Parameters
+    ----------
+    payload : bytes
+
+    Returns
+    -------
+    tuple
+        The request ID, the type and the body of the packet.
+    """
+    request_id, packet_type = struct.unpack('<ii', payload[:8])
+    body = payload[8:].rstrip(b'\x00').decode('utf-8', 'replace')
+    return request_id, packet_type, body
+
+
+def ends_response(response_id: int, request_id: int) -> bool:
+    """Check if a packet is the answer to the end marker of a command.
+
+    The end marker is an empty packet of the response type, sent right after
+    the command with the next request ID. The server answers it after the
+    last fragment of the command, by copying its ID or, like Minecraft does,
+    as an unknown request.
+
+    Parameters
+    ----------
+    response_id : int
+        The request ID of the packet that was read.
+    request_id : int
+        The request ID of the command.
+
+    Returns
+    -------
+    bool
+    """
+    return response_id in (request_id + 1, UNKNOWN_REQUEST)
+
+
+class RconError(Exception):
+    """RconError class."""
+
+
+class RconAuthenticationError(RconError):
+    """RconAuthenticationError class."""
+
+    def __init__(self):
+        self.message = 'The RCON password was rejected.'
+        super().__init__(self.message)
+
+
+class RconClient:
+    """A single connection to a Source RCON server."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 25575,
+                 password: str = '', timeout: float = 5):
+        self.host = host
+        self.port = int(port)
+        self.password = password
+        self.timeout = timeout
+        self.connection = None
+        self.ids = itertools.count(1)
+
+    def connect(self):
+        """Connect to the server and authenticate with the password.
+
+        Raises
+        ------
+        RconAuthenticationError
+            The server rejected the password.
+        OSError
+            The server could not be reached.
+        """
+        self.close()
+        self.connection = socket.create_connection((self.host, self.port),
+                                                   self.timeout)
+        request_id = next(self.ids)
+        self.write(request_id, SERVERDATA_AUTH, self.password)
+        while True:
+            response_id, response_type, _ = self.read()
+            if response_type != SERVERDATA_AUTH_RESPONSE:
+                continue
+            if response_id == -1:
+                self.close()
+                raise RconAuthenticationError()
+            if response_id == request_id:
+                return
+
+    def connected(self) -> bool:
+        """Check if the client holds an open connection.
+
+        Returns
+        -------
+        bool
+        """
+        return self.connection is not None
+
+    def close(self):
+        """Close the connection if it is open."""
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            finally:
+                self.connection = None
+
+    def command(self, text: str) -> str:
+        """Run the console command and return its output.
+
+        Parameters
+        ----------
+        text : str
+            The console command without the leading slash.
+
+        Returns
+        -------
+        str
+            The output of the command.
+        """
+        return self.response(self.send(text))
+
+    def send(self, text: str) -> int:
+        """Send the console command without waiting for its output.
+
+        The command is followed by an end marker, since a response that fills
+        its last fragment cannot be told apart from one that continues.
+
+        Parameters
+        ----------
+        text : str
+            The console command without the leading slash.
+
+        Returns
+        -------
+        int
+            The request ID of the command, to read its response with.
+        """
+        if self.connection is None:
+            self.connect()
+
+        request_id = next(self.ids)
+        marker_id = next(self.ids)
+        packets = encode_packet(request_id, SERVERDATA_EXECCOMMAND, text) \
+            + encode_packet(marker_id, SERVERDATA_RESPONSE_VALUE, '')
+        self.connection.sendall(packets)
+        return request_id
+
+    def response(self, request_id: int) -> str:
+        """Read the output of a command that was sent.
+
+        Parameters
+        ----------
+        request_id : int
+            The request ID of the command.
+
+        Returns
+        -------
+        str
+            The output of the command.
+        """
+        parts = []
+        while True:
+            response_id, _, body = self.read()
+            if response_id == request_id:
+                parts.append(body)
+            elif ends_response(response_id, request_id):
+                return ''.join(parts)
+
+    def idle(self) -> bool:
+        """Check if the open connection has nothing to read.
+
+        The server does not send anything between commands, so a connection
+        with something to read was closed by the server.
+
+        Returns
+        -------
+        bool
+        """
+        if self.connection is None:
+            return False
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return len(readable) == 0
+
+    def write(self, request_id: int, packet_type: int, body: str):
+        """Write a packet to the connection.
+
+        Parameters
+        ----------
+        request_id : int
+            The ID that the server copies into its response.
+        packet_type : int
+            The type of the packet.
+        body : str
+            The body of the packet.
+        """
+        self.connection.sendall(encode_packet(request_id, packet_type, body))
+
+    def read(self) -> tuple:
+        """Read a packet from the connection.
+
+        Returns
+        -------
+        tuple
+            The request ID, the type and the body of the packet.
+        """
+        length = struct.unpack('<i', self.receive(4))[0]
+        return decode_payload(self.receive(length))
+
+    def receive(self, size: int) -> bytes:
+        """Receive exactly the given number of bytes.
+
+        Parameters
+        ----------
+        size : int
+
+        Returns
+        -------
+        bytes
+
+        Raises
+        ------
+        ConnectionError
+            The server closed the connection.
+        """
+        data = b''
+        while len(data) < size:
+            chunk = self.connection.recv(size - len(data))
+            if chunk == b'':
+                self.close()
+                raise ConnectionError('The RCON server closed the connection.')
+            data += chunk
+        return data
+
+
+class RconPool:
+    """Keep RCON connections open and reuse them between commands.
+
+    Connections are created when no idle one is available and put back after
+    each command, keeping at most `size` of them idle. A command that cannot
+    be sent on an idle connection that dropped is sent on a new connection.
+    Once a command was sent, it is not sent again, since commands like `give`
+    or `stop` must not run twice.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 25575,
+                 password: str = '', size: int = 2, timeout: float = 5):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self) -> RconClient:
+        """Get an idle connection or a new one.
+
+        Returns
+        -------
+        RconClient
+        """
+        client = self.take()
+        if client is None:
+            client = self.connect()
+        return client
+
+    def take(self):
+        """Get an idle connection that is still open.
+
+        Returns
+        -------
+        RconClient|None
+        """
+        while True:
+            try:
+                client = self.idle.get_nowait()
+            except queue.Empty:
+                return None
+            if client.idle():
+                return client
+            client.close()
+
+    def connect(self) -> RconClient:
+        """Open a new connection.
+
+        Returns
+        -------
+        RconClient
+        """
+        client = RconClient(self.host, self.port, self.password,
+                            self.timeout)
+        client.connect()
+        return client
+
+    def release(self, client: RconClient):
+        """Give the connection back to the pool.
+
+        Parameters
+        ----------
+        client : RconClient
+        """
+        if not client.connected():
+            return
+        try:
+            self.idle.put_nowait(client)
+        except queue.Full:
+            client.close()
+
+    def command(self, text: str) -> str:
+        """Run the console command on a pooled connection.
+
+        Parameters
+        ----------
+        text : str
+            The console command without the leading slash.
+
+        Returns
+        -------
+        str
+            The output of the command.
+        """
+        client = self.take()
+        try:
+            if client is None:
+                client = self.connect()
+                request_id = client.send(text)
+            else:
+                try:
+                    request_id = client.send(text)
+                except (OSError, struct.error):
+                    # the idle connection dropped before the command was sent
+                    client.close()
+                    client = self.connect()
+                    request_id = client.send(text)
+            result = client.response(request_id)
+        except BaseException:
+            if client is not None:
+                client.close()
+            raise
+        self.release(client)
+        return result
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class RconActions:
+    """All actions that send console commands over RCON.
+
+    This has the same interface as `ScreenActions` for sending commands, and
+    returns the output of each command.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 25575,
+                 password: str = '', logger=None, size: int = 2,
+                 timeout: float = 5):
+        if logger is None:
+            self.logger = mtslogger.get_logger(__name__, mode=log_level)
+        else:
+            self.logger = logger
+        self.pool = RconPool(host, port, password, size, timeout)
+
+    def check(self) -> bool:
+        """Check to see if the RCON server accepts connections.
+
+        Returns
+        -------
+        bool
+            Whether a connection could be made.
+        """
+        self.logger.info('check')
+        try:
+            self.pool.release(self.pool.acquire())
+            return True
+        except (OSError, RconError) as error:
+            self.logger.error(str(error))
+            return False
+
+    def send(self, command: str):
+        """Send the provided command to the server.
+
+        Parameters
+        ----------
+        command : str
+            Command to send to the server.
+
+        Returns
+        -------
+        bool|str
+            Output of the command or False.
+        """
+        self.logger.info(f'send({command})')
+        started = time.perf_counter()
+        try:
+            result = self.pool.command(command)
+        except (OSError, RconError, struct.error) as error:
+            self.logger.error(str(error))
+            return False
+        elapsed = time.perf_counter() - started
+        self.logger.debug(f'rcon command took {elapsed:.3f} seconds')
+        return result
+
+    def send_many(self, commands: list, delay: float = 0) -> list:
+        """Send a sequence of commands to the server.
+
+        Parameters
+        ----------
+        commands : list
+            Commands to send to the server, in order.
+        delay : float
+            Seconds to wait between two commands.
+
+        Returns
+        -------
+        list
+            Output of the command or False for each command.
+        """
+        self.logger.info(f'send_many({commands})')
+        results = []
+        for index, command in enumerate(commands):
+            if index > 0 and delay > 0:
+                time.sleep(delay)
+            results.append(self.send(command))
+        return results
+
+    def close(self):
+        """Close the pooled connections."""
+        self.pool.close()
@@ -1,29 +1,38 @@
 import subprocess
+import time
 
 import mtslogger
 
-from .mts_helpers import execute
+from .mts_cache import TtlCache
+from .mts_helpers import run
+from .mts_metrics import registry
 
 log_level = 'info'
 
+# the arguments that list the screen sessions
+LIST_SESSIONS = ['screen', '-ls']
+
 
 class ScreenActions:
     """All actions that integrate with `screen`."""
 
     name = ''
 
-    def __init__(self, name: str, logger=None):
+    def __init__(self, name: str, logger=None, ttl: float = 0):
         self.name = name
         if logger is None:
             self.logger = mtslogger.get_logger(__name__, mode=log_level)
         else:
             self.logger = logger
+        self.cache = TtlCache(ttl)
 
+    @registry.timed('screen_seconds', action='check')
     def check(self) -> bool:
         """Check to see if the screen is running.
 
         This determines if there is at least one screen running with the given
-        name.
+        name. The result is cached for the TTL of the screen actions and
+        concurrent callers share a single check.
 
         Returns
         -------
@@ -31,19 +40,52 @@ class ScreenActions:
             Whether the screen is running or not.
         """
         self.logger.info('check')
-        command = 'screen -ls | grep ' + self.name + ' | wc -l'
-        self.logger.debug(f'execute command: {command}')
+        return self.cache.get('check', self.probe)
+
+    def probe(self) -> bool:
+        """Check the screen sessions without using the cache.
+
+        Returns
+        -------
+        bool
+            Whether the screen is running or not.
+        """
+        self.logger.debug('listing screen sessions')
         try:
-            count = execute(command)
-            try:
-                return int(count) > 0
-            except ValueError as error:
-                self.logger.error(str(error))
-                return False
-        except subprocess.CalledProcessError as error:
-            self.logger.error(f'{str(error.returncode)}: {error.stdout}')
+            # screen exits with a non-zero code even when it lists sessions
+            result = run(LIST_SESSIONS, check=False)
+        except OSError as error:
+            self.logger.error(str(error))
             return False
+        self.logger.debug(f'screen -ls took {result.elapsed:.3f} seconds')
+        return self.count(result.stdout) > 0
+
+    def count(self, listing: str) -> int:
+        """Count the sessions with the screen name in the screen listing.
 
+        Session lines look like `12345.minecraft (Detached)`, and only the
+        sessions whose name is exactly the screen name are counted.
+
+        Parameters
+        ----------
+        listing : str
+            The output of `screen -ls`.
+
+        Returns
+        -------
+        int
+            The number of matching sessions.
+        """
+        total = 0
+        for line in listing.splitlines():
+            fields = line.split()
+            if len(fields) == 0 or '.' not in fields[0]:
+                continue
+            if fields[0].split('.', 1)[1] == self.name:
+                total += 1
+        return total
+
+    @registry.timed('screen_seconds', action='create')
     def create(self) -> bool:
         """Start the screen session.
 
@@ -68,21 +110,28 @@ class ScreenActions:
             return True
 
         self.logger.debug('starting screen')
+        self.cache.invalidate()
         try:
-            value = execute(f'screen -dmS {self.name}')
-            self.logger.debug(f'value from execute: {value}')
+            result = run(['screen', '-dmS', self.name])
+            self.logger.debug(f'value from run: {result.stdout}')
             self.logger.debug(f'screen {self.name} should be running')
             return True
         except subprocess.CalledProcessError as error:
             self.logger.error(f'{str(error.returncode)}: {error.stdout}')
             return False
+        except OSError as error:
+            self.logger.error(str(error))
+            return False
 
+    @registry.timed('screen_seconds', action='send')
     def send(self, command: str):
         """Send the provided command to the screen.
 
         This checks for the screen to exist and then directly sends the given
-        parameter to the screen using the global variable for screen name. This
-        method cannot be called with command line parameters.
+        parameter to the screen using the global variable for screen name. The
+        command is passed to screen as a single argument without a shell, so it
+        needs no quoting. This method cannot be called with command line
+        parameters.
 
         Parameters
         ----------
@@ -92,18 +141,98 @@ class ScreenActions:
         Returns
         -------
         bool|str
-            Result of execute or False.
+            Output of screen or False.
         """
         self.logger.info(f'send({command})')
         if self.check() is False:
             self.logger.warning(f'screen {self.name} does not exist.')
             return False
 
+        return self.stuff(command)
+
+    @registry.timed('screen_seconds', action='send_many')
+    def send_many(self, commands: list, delay: float = 0) -> list:
+        """Send a sequence of commands to the screen with one check.
+
+        The screen is checked once for the whole batch. Without a delay, all
+        of the commands are typed into the screen by a single call to screen,
+        each followed by a carriage return. With a delay, the commands are sent
+        one at a time with the given number of seconds between them.
+
+        Screen does not report on the commands it types, only on its own call.
+        Without a delay, every command therefore gets the result of the single
+        call that typed the batch, so the list says whether the batch was
+        typed, not whether a single command was.
+
+        Parameters
+        ----------
+        commands : list
+            Commands to send to the screen, in order.
+        delay : float
+            Seconds to wait between two commands.
+
+        Returns
+        -------
+        list
+            Output of screen or False for each command; without a delay, the
+            same result of the batch for each command.
+        """
+        self.logger.info(f'send_many({commands})')
+        if len(commands) == 0:
+            return []
+
+        if self.check() is False:
+            self.logger.warning(f'screen {self.name} does not exist.')
+            return [False] * len(commands)
+
+        if delay <= 0:
+            result = self.stuff('\r'.join(commands))
+            return [result] * len(commands)
+
+        results = []
+        for index, command in enumerate(commands):
+            if index > 0:
+                time.sleep(delay)
+            results.append(self.stuff(command))
+        return results
+
+    def stuff(self, text: str):
+        """Type the text into the screen followed by a carriage return.
+
+        This does not check for the screen to exist.
+
+        Parameters
+        ----------
+        text : str
+            Text to type into the screen.
+
+        Returns
+        -------
+        bool|str
+            Output of screen or False.
+        """
         self.logger.debug(f'sending command to screen {self.name}')
         try:
-            return execute(
-                'screen -dR ' + self.name + ' -X stuff "' + command + '"\015'
-            )
+            result = run(self.stuff_args(text))
         except subprocess.CalledProcessError as error:
             self.logger.error(f'{str(error.returncode)}: {error.stdout}')
             return False
+        except OSError as error:
+            self.logger.error(str(error))
+            return False
+        self.logger.debug(f'screen stuff took {result.elapsed:.3f} seconds')
+        return result.stdout
+
+    def stuff_args(self, text: str) -> list:
+        """Get the arguments of screen that type the text into the screen.
+
+        Parameters
+        ----------
+        text : str
+            Text to type into the screen.
+
+        Returns
+        -------
+        list
+        """
+        return ['screen', '-dR', self.name, '-X', 'stuff', text + '\r']
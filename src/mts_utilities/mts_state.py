@@ -0,0 +1,231 @@
+import json
+import sqlite3
+import threading
+import time
+
+# lifecycle states of the server
+STOPPED = 'stopped'
+STARTING = 'starting'
+RUNNING = 'running'
+STOPPING = 'stopping'
+
+LIFECYCLE = 'lifecycle'
+
+
+class SharedState:
+    """State shared by every process that manages the same server.
+
+    The values live in a small SQLite file, so API workers, cron jobs and CLI
+    calls all see the same lifecycle state and the latest probe results.
+    Transitions take the write lock of the file before reading the current
+    state, which makes them atomic across processes.
+    """
+
+    def __init__(self, path: str, timeout: float = 10):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread, creating it when needed.
+
+        Returns
+        -------
+        sqlite3.Connection
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                         isolation_level=None)
+            connection.execute('CREATE TABLE IF NOT EXISTS state ('
+                               'key TEXT PRIMARY KEY, value TEXT, '
+                               'updated REAL)')
+            self.local.connection = connection
+        return connection
+
+    def get(self, key: str) -> tuple:
+        """Get a value and the time it was last updated.
+
+        Parameters
+        ----------
+        key : str
+
+        Returns
+        -------
+        tuple
+            The value and the update timestamp, or None twice when missing.
+        """
+        row = self.connection().execute(
+            'SELECT value, updated FROM state WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value):
+        """Set a value that can be serialized as JSON.
+
+        Parameters
+        ----------
+        key : str
+        value
+        """
+        self.write(self.connection(), key, value)
+
+    def delete(self, key: str):
+        """Remove a value.
+
+        Parameters
+        ----------
+        key : str
+        """
+        self.connection().execute('DELETE FROM state WHERE key = ?', (key,))
+
+    @staticmethod
+    def write(connection: sqlite3.Connection, key: str, value):
+        """Write a value with the current time.
+
+        Parameters
+        ----------
+        connection : sqlite3.Connection
+        key : str
+        value
+        """
+        connection.execute(
+            'INSERT OR REPLACE INTO state (key, value, updated) '
+            'VALUES (?, ?, ?)', (key, json.dumps(value), time.time())
+        )
+
+    def update(self, key: str, function: callable):
+        """Change a value in one write transaction.
+
+        No other process can change the value between reading and writing it.
+
+        Parameters
+        ----------
+        key : str
+        function : callable
+            Function that takes the current value, or None when it is
+            missing, and returns the new value.
+
+        Returns
+        -------
+        The new value.
+        """
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT value FROM state WHERE key = ?', (key,)
+            ).fetchone()
+            value = function(None if row is None else json.loads(row[0]))
+            self.write(connection, key, value)
+            connection.execute('COMMIT')
+            return value
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def lifecycle(self) -> tuple:
+        """Get the lifecycle state of the server.
+
+        Returns
+        -------
+        tuple
+            The state and the time it was entered. The state is stopped when
+            it was never set.
+        """
+        state, updated = self.get(LIFECYCLE)
+        if state is None:
+            return STOPPED, None
+        return state, updated
+
+    def set_lifecycle(self, state: str):
+        """Set the lifecycle state of the server without any condition.
+
+        Parameters
+        ----------
+        state : str
+        """
+        self.set(LIFECYCLE, state)
+
+    def transition(self, expected: tuple, state: str,
+                   stale_after: float = None) -> bool:
+        """Change the lifecycle state if it is one of the expected states.
+
+        The check and the change happen in one write transaction, so only one
+        process can make a given transition. A transitional state (starting or
+        stopping) that is older than `stale_after` seconds is considered left
+        behind by a process that died, and it can be replaced as well.
+
+        Parameters
+        ----------
+        expected : tuple
+            The states that allow the transition.
+        state : str
+            The new state.
+        stale_after : float
+            Seconds after which a transitional state can be replaced.
+
+        Returns
+        -------
+        bool
+            Whether the state changed.
+        """
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT value, updated FROM state WHERE key = ?', (LIFECYCLE,)
+            ).fetchone()
+            current, updated = (STOPPED, 0) if row is None \
+                else (json.loads(row[0]), row[1])
+            stale = stale_after is not None \
+                and current in (STARTING, STOPPING) \
+                and time.time() - updated > stale_after
+            if current not in expected and not stale:
+                connection.execute('ROLLBACK')
+                return False
+            self.write(connection, LIFECYCLE, state)
+            connection.execute('COMMIT')
+            return True
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def record_probe(self, name: str, result):
+        """Store the result of a probe for the other processes.
+
+        Parameters
+        ----------
+        name : str
+        result
+        """
+        self.set(f'probe:{name}', result)
+
+    def probe(self, name: str, max_age: float):
+        """Get the result of a probe if it is recent enough.
+
+        Parameters
+        ----------
+        name : str
+        max_age : float
+            The maximum age of the result in seconds.
+
+        Returns
+        -------
+        The result or None when it is missing or too old.
+        """
+        result, updated = self.get(f'probe:{name}')
+        if updated is None or time.time() - updated > max_age:
+            return None
+        return result
+
+    def forget_probe(self, name: str):
+        """Remove the result of a probe.
+
+        Parameters
+        ----------
+        name : str
+        """
+        self.delete(f'probe:{name}')
@@ -1,12 +1,154 @@
+import io
+import json
+import os
+import re
+import socket
+import struct
 import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from .mts_helpers import execute, get_command_path
+from .mts_helpers import run as run_command
+from .mts_metrics import registry
+
+# the state of a listening socket in the /proc/net/tcp tables
+TCP_LISTEN = '0A'
+
+# the protocol version of a ping that does not know the server version
+PING_PROTOCOL = -1
+# the largest packet a server list ping reply may have
+MAX_PACKET = 2 ** 21
+
+# the reply of a server to the server list ping, with the latency in ms
+ServerPing = namedtuple('ServerPing', ['motd', 'online', 'maximum', 'version',
+                                       'protocol', 'latency'])
+
+
+def pack_varint(value: int) -> bytes:
+    """Encode the integer as a VarInt of the Minecraft protocol.
+
+    Parameters
+    ----------
+    value : int
+        A signed 32-bit integer.
+
+    Returns
+    -------
+    bytes
+    """
+    value &= 0xFFFFFFFF
+    data = b''
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value == 0:
+            return data + bytes([byte])
+        data += bytes([byte | 0x80])
+
+
+def read_varint(reader) -> int:
+    """Read a VarInt of the Minecraft protocol.
+
+    Parameters
+    ----------
+    reader
+        A binary file, like the file of a socket.
+
+    Returns
+    -------
+    int
+    """
+    value = 0
+    for position in range(5):
+        byte = reader.read(1)
+        if byte == b'':
+            raise ConnectionError('The server closed the connection.')
+        value |= (byte[0] & 0x7F) << (7 * position)
+        if byte[0] & 0x80 == 0:
+            break
+    else:
+        raise ValueError('VarInt is too big')
+    if value & 0x80000000:
+        value -= 1 << 32
+    return value
+
+
+def pack_packet(packet_id: int, payload: bytes = b'') -> bytes:
+    """Frame the packet with its length.
+
+    Parameters
+    ----------
+    packet_id : int
+    payload : bytes
+
+    Returns
+    -------
+    bytes
+    """
+    data = pack_varint(packet_id) + payload
+    return pack_varint(len(data)) + data
+
+
+def read_packet(reader) -> tuple:
+    """Read a packet of the Minecraft protocol.
+
+    Parameters
+    ----------
+    reader
+        A binary file, like the file of a socket.
+
+    Returns
+    -------
+    tuple
+        The packet ID and the rest of the packet as a binary file.
+    """
+    length = read_varint(reader)
+    if length <= 0 or length > MAX_PACKET:
+        raise ValueError(f'invalid packet length {length}')
+    data = reader.read(length)
+    if len(data) < length:
+        raise ConnectionError('The server closed the connection.')
+    payload = io.BytesIO(data)
+    return read_varint(payload), payload
+
+
+def flatten_text(component) -> str:
+    """Get the plain text of a chat component, like the MOTD of a server.
+
+    Parameters
+    ----------
+    component : str|dict|list
+
+    Returns
+    -------
+    str
+    """
+    if isinstance(component, str):
+        return component
+    if isinstance(component, list):
+        return ''.join(flatten_text(part) for part in component)
+    if isinstance(component, dict):
+        return flatten_text(component.get('text', '')) \
+            + flatten_text(component.get('extra', []))
+    return ''
 
 
 class StatusChecker:
     """Check the current status of a process or port."""
 
     valid = False
+    proc_path = '/proc'
+
+    # the probes of all checkers share one pool of threads, which has room
+    # for every probe that runs, so none of them waits for a thread
+    pool = None
+    pool_lock = threading.Lock()
+    pool_size = 4
+    capacity = 0
+    active = 0
 
     def check(self, command: str):
         """Execute the given command and returns a boolean.
@@ -30,30 +172,347 @@ class StatusChecker:
         except subprocess.CalledProcessError as error:
             return error
 
+    @staticmethod
+    def confirms(result) -> bool:
+        """Check if the result of a probe confirms the process is up.
+
+        Parameters
+        ----------
+        result
+            The result of a probe, such as a bool, a list of PIDs or an error.
+
+        Returns
+        -------
+        bool
+            Whether the result is positive.
+        """
+        if isinstance(result, bool):
+            return result
+        if isinstance(result, list):
+            return len(result) > 0
+        if isinstance(result, ServerPing):
+            return True
+        return False
+
+    def submit(self, probes: dict) -> dict:
+        """Start the probes on the thread pool shared by the probes.
+
+        The probes of an earlier run may still be running, like pings that
+        wait for their timeout after the status was found. When they and the
+        new probes do not fit, the pool is replaced by a larger one, and the
+        old pool ends its threads once its probes finished. Threads are only
+        started when no idle one is left.
+
+        Parameters
+        ----------
+        probes : dict
+            The names of the probes with functions that take no arguments.
+
+        Returns
+        -------
+        dict
+            The futures of the probes with their names.
+        """
+        with StatusChecker.pool_lock:
+            needed = StatusChecker.active + len(probes)
+            if StatusChecker.pool is None or needed > StatusChecker.capacity:
+                if StatusChecker.pool is not None:
+                    StatusChecker.pool.shutdown(wait=False)
+                StatusChecker.capacity = max(self.pool_size, 2 * needed)
+                StatusChecker.pool = ThreadPoolExecutor(
+                    max_workers=StatusChecker.capacity,
+                    thread_name_prefix='status'
+                )
+            futures = {}
+            for name, probe in probes.items():
+                future = StatusChecker.pool.submit(self.measure, name, probe)
+                StatusChecker.active += 1
+                futures[future] = name
+        # the callback takes the lock, and runs at once for finished probes
+        for future in futures:
+            future.add_done_callback(self.finished)
+        return futures
+
+    @staticmethod
+    def finished(future):
+        """Make room in the pool for another probe.
+
+        Parameters
+        ----------
+        future : Future
+            The probe that finished or was cancelled.
+        """
+        del future
+        with StatusChecker.pool_lock:
+            StatusChecker.active -= 1
+
+    def run(self, probes: dict, full: bool = False) -> dict:
+        """Run the probes concurrently.
+
+        Every probe starts at the same time on the shared thread pool. Unless a
+        full report is requested, this returns as soon as the first probe
+        confirms the process is up, so the result only holds the probes that
+        finished by then. Probes returning a dictionary have their items merged
+        into the result, and probes raising an error have the error as their
+        result.
+
+        Parameters
+        ----------
+        probes : dict
+            The names of the probes with functions that take no arguments.
+        full : bool
+            Whether to wait for every probe to finish.
+
+        Returns
+        -------
+        dict
+            The names of the finished probes with their results.
+        """
+        futures = self.submit(probes)
+        results = {}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as error:  # pylint: disable=broad-except
+                result = error
+
+            if isinstance(result, dict):
+                results.update(result)
+                positive = any(self.confirms(value)
+                               for value in result.values())
+            else:
+                results[futures[future]] = result
+                positive = self.confirms(result)
+
+            if positive and not full:
+                for pending in futures:
+                    pending.cancel()
+                break
+        return results
+
+    @staticmethod
+    def measure(name: str, probe: callable):
+        """Run the probe and record how long it took.
+
+        Parameters
+        ----------
+        name : str
+            The name of the probe.
+        probe : callable
+            Function that takes no arguments.
+
+        Returns
+        -------
+        The result of the probe.
+        """
+        with registry.timer('probe_seconds', probe=name):
+            return probe()
+
     def grep(self, command_name: str) -> bool:
         """Check for a process existing.
 
-        This uses the ps tool with grep to determine if the given command name
-        is currently running or not. The command is sent to the check method for
-        verification.
+        This uses the ps tool and searches its output to determine if the given
+        command name is currently running or not.
 
         Parameters
         ----------
         command_name : str
             The command/executable name used for searching.
 
+        Returns
+        -------
+        bool|CalledProcessError
+            Is the executable running or an error.
+        """
+        try:
+            output = run_command(['ps', 'aux']).stdout
+        except subprocess.CalledProcessError as error:
+            return error
+        return self.found(line for line in output.splitlines()
+                          if command_name in line)
+
+    def found(self, lines) -> bool:
+        """Check if there is at least one non-empty line.
+
+        Parameters
+        ----------
+        lines : iterable
+            The lines of the output of a command.
+
+        Returns
+        -------
+        bool
+            If the number of lines is greater than 0.
+        """
+        result = any(line.strip() != '' for line in lines)
+        if result:
+            self.valid = True
+        return result
+
+    def has_proc(self) -> bool:
+        """Check if the process file system is available for native scans.
+
         Returns
         -------
         bool
-            Is the executable running.
+            Whether /proc exists and describes the current process.
         """
-        return self.check(f'ps aux | grep {command_name} | grep -v grep')
+        return os.path.isdir(os.path.join(self.proc_path, 'self'))
+
+    def pids(self, executable: str, server_file: str = '') -> list:
+        """Find the PIDs of the server by scanning the process file system.
+
+        This reads `/proc/<pid>/cmdline` for every process once, without
+        forking any commands. A process matches when its executable has the
+        same base name as the given executable and, if a server file is given,
+        one of its arguments ends with the server file.
+
+        Parameters
+        ----------
+        executable : str
+            The executable name or path, such as `java` or `/bin/java`.
+        server_file : str
+            The server file expected in the arguments of the process.
+
+        Returns
+        -------
+        list
+            The matching process IDs in ascending order.
+        """
+        executable_name = os.path.basename(executable)
+        found = []
+        try:
+            entries = os.listdir(self.proc_path)
+        except OSError:
+            return found
+
+        for entry in entries:
+            if not entry.isdigit():
+                continue
+            arguments = self.read_cmdline(int(entry))
+            if len(arguments) == 0:
+                continue
+            if os.path.basename(arguments[0]) != executable_name:
+                continue
+            if server_file and not any(
+                    argument.endswith(server_file)
+                    for argument in arguments[1:]):
+                continue
+            found.append(int(entry))
+
+        found.sort()
+        if len(found) > 0:
+            self.valid = True
+        return found
+
+    def read_cmdline(self, pid: int) -> list:
+        """Read the command line arguments of a process.
+
+        Parameters
+        ----------
+        pid : int
+            The process ID.
+
+        Returns
+        -------
+        list
+            The arguments or an empty list if the process is gone or hidden.
+        """
+        path = os.path.join(self.proc_path, str(pid), 'cmdline')
+        try:
+            with open(path, 'rb') as handle:
+                raw = handle.read()
+        except OSError:
+            return []
+        return [os.fsdecode(argument)
+                for argument in raw.split(b'\0') if argument != b'']
+
+    def usage(self, pid: int):
+        """Read the resource usage of a process from the process file system.
+
+        Parameters
+        ----------
+        pid : int
+            The process ID.
+
+        Returns
+        -------
+        dict|None
+            The CPU seconds, resident memory in bytes, number of threads and
+            seconds since the process started, or None when it is gone.
+        """
+        process_path = os.path.join(self.proc_path, str(pid))
+        try:
+            with open(os.path.join(process_path, 'stat')) as handle:
+                stat = handle.read()
+            with open(os.path.join(process_path, 'status')) as handle:
+                status = handle.read()
+            with open(os.path.join(self.proc_path, 'uptime')) as handle:
+                uptime = float(handle.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            return None
+
+        # the fields after the command name, which may hold spaces
+        fields = stat.rsplit(')', 1)[1].split()
+        ticks = os.sysconf('SC_CLK_TCK')
+        memory = 0
+        for line in status.splitlines():
+            if line.startswith('VmRSS:'):
+                memory = int(line.split()[1]) * 1024
+                break
+        return {
+            'pid': int(pid),
+            'cpu_seconds': round((int(fields[11]) + int(fields[12])) / ticks,
+                                 2),
+            'memory_bytes': memory,
+            'threads': int(fields[17]),
+            'uptime_seconds': round(uptime - int(fields[19]) / ticks, 1),
+        }
+
+    def listening(self) -> dict:
+        """Read the TCP socket tables and find the listening ports.
+
+        Both `/proc/net/tcp` and `/proc/net/tcp6` are read once. Only sockets
+        in the LISTEN state are included.
+
+        Returns
+        -------
+        dict
+            The listening port numbers with the list of their socket inodes.
+        """
+        ports = {}
+        for table in ('tcp', 'tcp6'):
+            path = os.path.join(self.proc_path, 'net', table)
+            try:
+                with open(path) as handle:
+                    lines = handle.readlines()[1:]
+            except OSError:
+                continue
+
+            for line in lines:
+                fields = line.split()
+                if len(fields) < 10 or fields[3] != TCP_LISTEN:
+                    continue
+                port_number = int(fields[1].rsplit(':', 1)[1], 16)
+                ports.setdefault(port_number, []).append(int(fields[9]))
+        return ports
+
+    def has_socket_tables(self) -> bool:
+        """Check if the TCP socket tables are available for native scans.
+
+        Returns
+        -------
+        bool
+            Whether /proc/net/tcp exists.
+        """
+        return os.path.isfile(os.path.join(self.proc_path, 'net', 'tcp'))
 
     def port(self, port_numbers: list) -> dict:
         """Check for listening ports.
 
-        Use netstat to find ports and use grep to find the exact port and if it
-        is listening. The command is sent to the check method for verification.
+        When the socket tables are available, they are read once for all of
+        the ports and each port number is matched exactly. Otherwise, netstat
+        is called once and its output is searched for each listening port.
 
         Parameters
         ----------
@@ -66,20 +525,179 @@ class StatusChecker:
             The dictionary with port number and the result.
         """
         output = {}
+        if self.has_socket_tables():
+            listening = self.listening()
+            for port_number in port_numbers:
+                result = int(port_number) in listening
+                if result:
+                    self.valid = True
+                output['port ' + str(port_number)] = result
+            return output
+
+        try:
+            lines = [line for line in run_command(['netstat', '-ane']).stdout
+                     .splitlines() if 'LISTEN' in line]
+        except (subprocess.CalledProcessError, OSError) as error:
+            for port_number in port_numbers:
+                output['port ' + str(port_number)] = error
+            return output
+
         for port_number in port_numbers:
-            result = self.check(
-                f'netstat -ane | grep {port_number} | grep LISTEN'
-            )
+            pattern = re.compile(f':{port_number}\\s')
+            result = self.found(line for line in lines if pattern.search(line))
             output['port ' + str(port_number)] = result
         return output
 
+    def ping(self, port_number: int, host: str = '127.0.0.1',
+             timeout: float = 1) -> ServerPing:
+        """Ask the server for its status with the server list ping.
+
+        This is what the multiplayer screen of the game does, so a reply means
+        that the server answers players. The latency is the round trip of the
+        ping packet that follows the status.
+
+        Parameters
+        ----------
+        port_number : int
+            The port of the server.
+        host : str
+            The address of the server.
+        timeout : float
+            Seconds to wait for the connection and each reply.
+
+        Returns
+        -------
+        ServerPing
+            The reply of the server.
+
+        Raises
+        ------
+        OSError
+            When the server cannot be reached or closes the connection.
+        ValueError
+            When the reply is not a valid status.
+        """
+        port_number = int(port_number)
+        encoded_host = host.encode('utf-8')
+        handshake = pack_varint(PING_PROTOCOL) \
+            + pack_varint(len(encoded_host)) + encoded_host \
+            + struct.pack('>H', port_number) + pack_varint(1)
+
+        with socket.create_connection((host, port_number), timeout) \
+                as connection:
+            connection.sendall(pack_packet(0, handshake) + pack_packet(0))
+            with connection.makefile('rb') as reader:
+                started = time.monotonic()
+                packet_id, payload = read_packet(reader)
+                if packet_id != 0:
+                    raise ValueError(f'unexpected packet {packet_id}')
+                length = read_varint(payload)
+                status = json.loads(payload.read(length).decode('utf-8'))
+                latency = time.monotonic() - started
+
+                # the ping is optional, so keep the latency of the status
+                token = struct.pack('>q', int(time.time() * 1000))
+                try:
+                    started = time.monotonic()
+                    connection.sendall(pack_packet(1, token))
+                    packet_id, payload = read_packet(reader)
+                    if packet_id == 1 and payload.read() == token:
+                        latency = time.monotonic() - started
+                except OSError:
+                    pass
+
+        if not isinstance(status, dict):
+            raise ValueError('the status is not an object')
+        players = status.get('players') or {}
+        version = status.get('version') or {}
+        self.valid = True
+        return ServerPing(
+            motd=flatten_text(status.get('description', '')),
+            online=int(players.get('online', 0)),
+            maximum=int(players.get('max', 0)),
+            version=version.get('name'),
+            protocol=version.get('protocol'),
+            latency=round(latency * 1000, 1),
+        )
+
+    def port_owners(self, port_numbers: list) -> dict:
+        """Find the socket inodes and owning PIDs of listening ports.
+
+        The socket tables are read once and the file descriptors of every
+        process are only scanned when at least one port is listening. The PID
+        is None when the owning process is not visible to the current user.
+
+        Parameters
+        ----------
+        port_numbers : list
+            The port numbers to check.
+
+        Returns
+        -------
+        dict
+            The port numbers with a list of dictionaries holding the inode and
+            the PID for each listening socket.
+        """
+        listening = self.listening()
+        inodes = set()
+        for port_number in port_numbers:
+            inodes.update(listening.get(int(port_number), []))
+        owners = self.socket_pids(inodes) if len(inodes) > 0 else {}
+
+        output = {}
+        for port_number in port_numbers:
+            output[int(port_number)] = [
+                {'inode': inode, 'pid': owners.get(inode)}
+                for inode in listening.get(int(port_number), [])
+            ]
+        return output
+
+    def socket_pids(self, inodes: set) -> dict:
+        """Map socket inodes to the PIDs of the processes holding them.
+
+        Parameters
+        ----------
+        inodes : set
+            The socket inodes to find.
+
+        Returns
+        -------
+        dict
+            The inodes with the PID of their owner.
+        """
+        targets = {f'socket:[{inode}]': inode for inode in inodes}
+        owners = {}
+        try:
+            entries = os.listdir(self.proc_path)
+        except OSError:
+            return owners
+
+        for entry in entries:
+            if not entry.isdigit():
+                continue
+            fd_path = os.path.join(self.proc_path, entry, 'fd')
+            try:
+                descriptors = os.listdir(fd_path)
+            except OSError:
+                continue
+            for descriptor in descriptors:
+                try:
+                    link = os.readlink(os.path.join(fd_path, descriptor))
+                except OSError:
+                    continue
+                if link in targets:
+                    owners[targets[link]] = int(entry)
+            if len(owners) == len(targets):
+                break
+        return owners
+
     def process(self, process_name: str, command_name: str):
         """Execute the process name with the command name and check the results.
 
         The process name should be something that takes a single argument and is
         its own executable file (rather than a command string). This gets the
-        full path of the process, then sends a command of that process with the
-        command name as a parameter to the check method for verification.
+        full path of the process, then runs that process with the command name
+        as its argument and checks for output lines.
 
         Parameters
         ----------
@@ -95,6 +713,9 @@ class StatusChecker:
         """
         try:
             command_path = get_command_path(process_name)
-            return self.check(f'{command_path} {command_name}')
         except subprocess.CalledProcessError as error:
             return error
+        # these tools exit with a non-zero code when nothing is found
+        output = run_command([command_path, command_name],
+                             check=False).stdout
+        return self.found(output.splitlines())
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src.benchmarks.bench import FAKES
+from src.minecraft_helpers.fake_server import FakeServer
+from src.mts_utilities.mts_async import (AsyncConsoleClient, AsyncRconActions,
+                                         AsyncScreen, SingleFlight,
+                                         asynchronous, run)
+from src.mts_utilities.mts_console import ConsoleClient, ConsoleHost
+from src.mts_utilities.mts_rcon import RconActions
+from src.mts_utilities.mts_screen import ScreenActions
+
+# print every line and exit on `stop`
+ECHO = '''
+import sys
+for line in sys.stdin:
+    print(line.strip(), flush=True)
+    if line.strip() == 'stop':
+        break
+'''
+
+
+def test_run():
+    result = asyncio.run(run([sys.executable, '-c', 'print(" hi ")']))
+    assert (result.returncode, result.stdout) == (0, 'hi')
+
+    with pytest.raises(subprocess.CalledProcessError):
+        asyncio.run(run([sys.executable, '-c', 'raise SystemExit(3)']))
+    result = asyncio.run(run([sys.executable, '-c', 'raise SystemExit(3)'],
+                             check=False))
+    assert result.returncode == 3
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        asyncio.run(run([sys.executable, '-c', 'import time; time.sleep(5)'],
+                        timeout=0.1))
+
+
+def test_single_flight():
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return len(loads)
+
+    async def main():
+        flights = SingleFlight(ttl=60)
+        values = await asyncio.gather(*[flights.get('key', load)
+                                        for _ in range(20)])
+        assert values == [1] * 20
+        assert await flights.get('key', load) == 1
+        flights.invalidate('key')
+        assert await flights.get('key', load) == 2
+
+    asyncio.run(main())
+    assert len(loads) == 2
+
+
+def test_single_flight_does_not_keep_errors():
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        raise ValueError('failed')
+
+    async def main():
+        flights = SingleFlight(ttl=60)
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await flights.get('key', fail)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_asynchronous(tmp_path):
+    assert isinstance(asynchronous(ScreenActions('async')), AsyncScreen)
+    assert isinstance(asynchronous(RconActions()), AsyncRconActions)
+    client = ConsoleClient(str(tmp_path / 'console.sock'))
+    assert isinstance(asynchronous(client), AsyncConsoleClient)
+    with pytest.raises(TypeError):
+        asynchronous(object())
+
+
+def test_screen(tmp_path, monkeypatch):
+    monkeypatch.setenv('PATH', FAKES + os.pathsep + os.environ['PATH'])
+    monkeypatch.setenv('FAKE_SCREEN_DIR', str(tmp_path))
+    screen = AsyncScreen(ScreenActions('async'))
+
+    async def main():
+        assert await screen.check() is False
+        assert await screen.send('say hi') is False
+        await run(['screen', '-dmS', 'async'])
+        assert await screen.check() is True
+        started = time.monotonic()
+        # the loop keeps running while the commands wait
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(tick())
+        assert await screen.send_many(['cd /', 'cd /tmp'], 0.1) == ['', '']
+        ticker.cancel()
+        assert time.monotonic() - started >= 0.1
+        assert len(ticks) >= 5
+
+    asyncio.run(main())
+    assert (tmp_path / 'async' / 'cwd').read_text() == '/tmp'
+
+
+def test_rcon(tmp_path):
+    server = FakeServer(str(tmp_path), {
+        'server-port': '0', 'enable-rcon': 'true', 'rcon.port': '0',
+        'rcon.password': 'secret'}, startup=0, shutdown=0)
+    server.start()
+    server.join('Steve')
+
+    async def main():
+        console = AsyncRconActions(RconActions(port=server.rcon_port,
+                                               password='secret', timeout=1))
+        assert await console.check()
+        replies = await asyncio.gather(console.send('list'),
+                                       console.send('save-all'))
+        assert replies[0].endswith('players online: Steve')
+        assert replies[1].endswith('Saved the game')
+        assert await console.send_many(['say hi', 'list'], 0.01) == \
+            ['', 'There are 1 of a max of 20 players online: Steve']
+        console.client.close()
+
+        rejected = AsyncRconActions(RconActions(port=server.rcon_port,
+                                                password='wrong'))
+        assert await rejected.send('list') is False
+
+    try:
+        asyncio.run(main())
+    finally:
+        server.close()
+
+
+def test_console_client(tmp_path):
+    socket_path = str(tmp_path / 'console.sock')
+    host = ConsoleHost(socket_path, [sys.executable, '-c', ECHO],
+                       str(tmp_path))
+    thread = threading.Thread(target=host.run, daemon=True)
+    thread.start()
+    console = AsyncConsoleClient(ConsoleClient(socket_path, timeout=2))
+
+    async def main():
+        for _ in range(100):
+            if await console.check():
+                break
+            await asyncio.sleep(0.02)
+        assert await console.send_many(['say one', 'say two'], 0.01) == \
+            ['', '']
+        assert await console.send('stop') == ''
+
+    asyncio.run(main())
+    thread.join(5)
+    assert list(host.history) == ['say one', 'say two', 'stop']
+    assert asyncio.run(console.check()) is False
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from src.mts_utilities.mts_cache import TtlCache
+
+
+def test_get_caches_value():
+    cache = TtlCache(60)
+    calls = []
+    assert cache.get('key', lambda: calls.append(1) or len(calls)) == 1
+    assert cache.get('key', lambda: calls.append(1) or len(calls)) == 1
+    assert len(calls) == 1
+
+
+def test_get_expires():
+    cache = TtlCache(0.01)
+    calls = []
+    cache.get('key', lambda: calls.append(1))
+    time.sleep(0.02)
+    cache.get('key', lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_get_without_ttl():
+    cache = TtlCache(0)
+    calls = []
+    cache.get('key', lambda: calls.append(1))
+    cache.get('key', lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_invalidate():
+    cache = TtlCache(60)
+    cache.get('first', lambda: 1)
+    cache.get('second', lambda: 2)
+    cache.invalidate('first')
+    assert cache.get('first', lambda: 3) == 3
+    assert cache.get('second', lambda: 4) == 2
+    cache.invalidate()
+    assert cache.get('second', lambda: 5) == 5
+
+
+def test_get_single_flight():
+    cache = TtlCache(0)
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def loader():
+        calls.append(1)
+        release.wait(1)
+        return 'up'
+
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get('status', loader))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ['up'] * 5
+
+
+def test_get_error_is_not_cached():
+    cache = TtlCache(60)
+
+    def loader():
+        raise ValueError('probe failed')
+
+    with pytest.raises(ValueError):
+        cache.get('key', loader)
+    assert cache.get('key', lambda: 'ok') == 'ok'
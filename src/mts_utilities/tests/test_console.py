@@ -0,0 +1,139 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+from src.mts_utilities.mts_console import ConsoleClient, ConsoleHost, launch
+
+# echo every line with a prefix and exit on `stop`
+ECHO = '''
+import sys
+print('ready', flush=True)
+for line in sys.stdin:
+    line = line.strip()
+    print('echo: ' + line, flush=True)
+    if line == 'stop':
+        break
+'''
+
+
+class FakeLogger:
+    def __init__(self):
+        self.messages = []
+
+    def __getattr__(self, name):
+        return lambda message: self.messages.append((name, message))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def start_host(socket_path, cwd):
+    host = ConsoleHost(socket_path, [sys.executable, '-c', ECHO], str(cwd))
+    result = {}
+    thread = threading.Thread(
+        target=lambda: result.setdefault('code', host.run()), daemon=True)
+    thread.start()
+    client = ConsoleClient(socket_path, logger=FakeLogger(), timeout=2)
+    assert wait_for(client.check)
+    return host, client, thread, result
+
+
+def test_send_and_tail(tmp_path):
+    socket_path = str(tmp_path / 'console.sock')
+    host, client, thread, result = start_host(socket_path, tmp_path)
+
+    assert wait_for(lambda: client.tail() == ['ready'])
+    assert client.send_many(['say hello', 'list']) == ['', '']
+    assert wait_for(lambda: len(client.tail()) == 3)
+    assert client.tail(2) == ['echo: say hello', 'echo: list']
+
+    assert client.send('stop') == ''
+    thread.join(5)
+    assert result['code'] == 0
+    assert not host.running()
+    assert not os.path.exists(socket_path)
+
+
+def test_client_without_host(tmp_path):
+    client = ConsoleClient(str(tmp_path / 'missing.sock'), logger=FakeLogger())
+    assert client.check() is False
+    assert client.send('say hello') is False
+    assert client.send_many([]) == []
+    assert client.tail() == []
+
+
+def test_follow(tmp_path):
+    socket_path = str(tmp_path / 'console.sock')
+    host, client, thread, _ = start_host(socket_path, tmp_path)
+    assert wait_for(lambda: client.tail() == ['ready'])
+    subscription = host.subscribe()
+    client.send('say one')
+    assert subscription.get(2) == 'echo: say one'
+    host.unsubscribe(subscription)
+    client.send('stop')
+    thread.join(5)
+
+
+def test_unknown_operation(tmp_path):
+    socket_path = str(tmp_path / 'console.sock')
+    _, client, thread, _ = start_host(socket_path, tmp_path)
+    assert client.request({'op': 'nothing'})['ok'] is False
+    client.send('stop')
+    thread.join(5)
+
+
+def test_launch_detached(tmp_path):
+    socket_path = str(tmp_path / 'console.sock')
+    assert launch(socket_path, [sys.executable, '-c', ECHO], str(tmp_path))
+    client = ConsoleClient(socket_path, logger=FakeLogger())
+    assert client.send('stop') == ''
+    assert wait_for(lambda: not os.path.exists(socket_path))
+
+
+def touch_command(path):
+    return [sys.executable, '-c', f'open({str(path)!r}, "w").close()']
+
+
+def test_live_socket_is_kept(tmp_path):
+    socket_path = str(tmp_path / 'console.sock')
+    _, client, thread, _ = start_host(socket_path, tmp_path)
+    started = tmp_path / 'started'
+    with pytest.raises(FileExistsError):
+        ConsoleHost(socket_path, touch_command(started), str(tmp_path)).run()
+    # the server did not start and the first host still has its console
+    assert not started.exists()
+    assert client.check() is True
+    client.send('stop')
+    thread.join(5)
+
+
+def test_stale_socket_is_replaced(tmp_path):
+    socket_path = str(tmp_path / 'console.sock')
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    started = tmp_path / 'started'
+    host = ConsoleHost(socket_path, touch_command(started), str(tmp_path))
+    assert host.run() == 0
+    assert started.exists()
+    assert not os.path.exists(socket_path)
+
+
+def test_bind_error_starts_nothing(tmp_path):
+    socket_path = str(tmp_path / 'missing' / 'console.sock')
+    started = tmp_path / 'started'
+    host = ConsoleHost(socket_path, touch_command(started), str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        host.run()
+    assert not started.exists()
+    assert host.process is None
@@ -0,0 +1,83 @@
+import pytest
+
+import src.mts_utilities.mts_control as mts_control
+from src.mts_utilities.mts_control import ControlClient, ControlError
+from src.mts_utilities.mts_control import ControlServer, ControlUnavailable
+
+
+def fail():
+    raise RuntimeError('broken')
+
+
+def test_call_actions(tmp_path):
+    socket_path = str(tmp_path / 'control.sock')
+    server = ControlServer(socket_path, {
+        'status': lambda: True,
+        'report': lambda: {'proc': [123], 'ports': True},
+        'broken': fail,
+    })
+    assert server.start()
+    try:
+        client = ControlClient(socket_path)
+        assert client.available()
+        assert client.call('status') is True
+        assert client.call('report') == {'proc': [123], 'ports': True}
+        with pytest.raises(ControlError, match='RuntimeError: broken'):
+            client.call('broken')
+        with pytest.raises(ControlError, match='unknown action'):
+            client.call('missing')
+    finally:
+        server.close()
+    assert not (tmp_path / 'control.sock').exists()
+
+
+def test_unavailable(tmp_path):
+    client = ControlClient(str(tmp_path / 'control.sock'))
+    assert not client.available()
+    with pytest.raises(ControlUnavailable):
+        client.call('status')
+
+
+def test_one_server_per_socket(tmp_path):
+    socket_path = str(tmp_path / 'control.sock')
+    first = ControlServer(socket_path, {'status': lambda: 'first'})
+    second = ControlServer(socket_path, {'status': lambda: 'second'})
+    assert first.start()
+    try:
+        assert not second.start()
+        assert ControlClient(socket_path).call('status') == 'first'
+    finally:
+        first.close()
+
+
+def test_replace_stale_socket(tmp_path):
+    socket_path = str(tmp_path / 'control.sock')
+    stale = ControlServer(socket_path, {})
+    assert stale.start()
+    # leave the socket file behind like a crashed process
+    stale.server.shutdown()
+    stale.server.server_close()
+    assert (tmp_path / 'control.sock').exists()
+
+    server = ControlServer(socket_path, {'status': lambda: False})
+    assert server.start()
+    try:
+        assert ControlClient(socket_path).call('status') is False
+    finally:
+        server.close()
+
+
+def test_stale_socket_of_another_user(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / 'control.sock')
+    stale = ControlServer(socket_path, {})
+    assert stale.start()
+    stale.server.shutdown()
+    stale.server.server_close()
+
+    def unlink(path):
+        raise PermissionError(1, 'Operation not permitted', path)
+
+    monkeypatch.setattr(mts_control.os, 'unlink', unlink)
+    server = ControlServer(socket_path, {})
+    assert not server.start()
+    assert server.server is None
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+import pytest
+
+from src.mts_utilities import mts_helpers
+
+
+def test_run_arguments_without_shell():
+    result = mts_helpers.run([sys.executable, '-c',
+                              'import sys; print(sys.argv[1])',
+                              '"quoted"; echo $HOME'])
+    assert result.stdout == '"quoted"; echo $HOME'
+    assert result.returncode == 0
+    assert result.elapsed > 0
+
+
+def test_run_check():
+    with pytest.raises(subprocess.CalledProcessError):
+        mts_helpers.run([sys.executable, '-c', 'raise SystemExit(3)'])
+    result = mts_helpers.run([sys.executable, '-c', 'raise SystemExit(3)'],
+                             check=False)
+    assert result.returncode == 3
+
+
+def test_get_command_path_cached(monkeypatch, tmp_path):
+    executable = tmp_path / 'fake-java'
+    executable.write_text('#!/bin/sh\n')
+    executable.chmod(0o755)
+    monkeypatch.setenv('PATH', str(tmp_path))
+    mts_helpers.clear_command_paths()
+    calls = []
+    which = mts_helpers.shutil.which
+    monkeypatch.setattr(mts_helpers.shutil, 'which',
+                        lambda *args, **kwargs: calls.append(args)
+                        or which(*args, **kwargs))
+    assert mts_helpers.get_command_path('fake-java') == str(executable)
+    assert mts_helpers.get_command_path('fake-java') == str(executable)
+    assert len(calls) == 1
+
+    mts_helpers.clear_command_paths()
+    mts_helpers.get_command_path('fake-java')
+    assert len(calls) == 2
+
+
+def test_get_command_path_missing(monkeypatch, tmp_path):
+    monkeypatch.setenv('PATH', str(tmp_path))
+    with pytest.raises(subprocess.CalledProcessError):
+        mts_helpers.get_command_path('not-a-real-command')
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+
+from src.mts_utilities.mts_log import LogFollower, LogTailer
+
+
+def test_read_lines_from_end(tmp_path):
+    log = tmp_path / 'latest.log'
+    log.write_text('old line\n')
+    follower = LogFollower(str(log))
+    assert follower.read_lines() == []
+    with open(log, 'a') as handle:
+        handle.write('first\nsecond\npart')
+    assert follower.read_lines() == ['first', 'second']
+    with open(log, 'a') as handle:
+        handle.write('ial\r\n')
+    assert follower.read_lines() == ['partial']
+
+
+def test_read_lines_after_rotation(tmp_path):
+    log = tmp_path / 'latest.log'
+    log.write_text('previous run\n')
+    follower = LogFollower(str(log))
+    os.rename(log, tmp_path / '2021-01-01-1.log')
+    assert follower.read_lines() == []
+    log.write_text('Starting minecraft server\n')
+    assert follower.read_lines() == ['Starting minecraft server']
+
+
+def test_read_lines_after_truncate(tmp_path):
+    log = tmp_path / 'latest.log'
+    log.write_text('a long line before truncating\n')
+    follower = LogFollower(str(log))
+    log.write_text('new\n')
+    assert follower.read_lines() == ['new']
+
+
+def test_read_lines_from_start(tmp_path):
+    log = tmp_path / 'latest.log'
+    log.write_text('old line\n')
+    follower = LogFollower(str(log), from_start=True)
+    assert follower.read_lines() == ['old line']
+
+
+def test_wait_wakes_up_on_write(tmp_path):
+    log = tmp_path / 'latest.log'
+    log.write_text('')
+    follower = LogFollower(str(log))
+    follower.wait(0)
+
+    def write():
+        time.sleep(0.1)
+        with open(log, 'a') as handle:
+            handle.write('Done (1.0s)! For help, type "help"\n')
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    started = time.monotonic()
+    lines = []
+    for line in follower.follow(5):
+        lines.append(line)
+        break
+    thread.join()
+    follower.close()
+    assert lines == ['Done (1.0s)! For help, type "help"']
+    assert time.monotonic() - started < 2
+
+
+def test_tailer_fans_out(tmp_path):
+    log = tmp_path / 'latest.log'
+    log.write_text('')
+    tailer = LogTailer(str(log), queue_size=2, poll_interval=0.01)
+    fast = tailer.subscribe()
+    slow = tailer.subscribe()
+    heard = []
+    tailer.add_listener(heard.append)
+    time.sleep(0.1)
+    with open(log, 'a') as handle:
+        handle.write('one\ntwo\n')
+
+    assert fast.get(2) == 'one'
+    assert fast.get(2) == 'two'
+    with open(log, 'a') as handle:
+        handle.write('three\n')
+    assert fast.get(2) == 'three'
+    assert heard == ['one', 'two', 'three']
+    assert [slow.get(1), slow.get(1)] == ['one', 'two']
+    assert slow.take_dropped() == 1
+
+    tailer.unsubscribe(fast)
+    tailer.unsubscribe(slow)
+    tailer.remove_listener(heard.append)
+    with open(log, 'a') as handle:
+        handle.write('four\n')
+    time.sleep(1.2)
+    assert tailer.thread is None
+
+
+def test_tailer_survives_failing_listener(tmp_path):
+    log = tmp_path / 'latest.log'
+    log.write_text('')
+    tailer = LogTailer(str(log), poll_interval=0.01)
+
+    def fail(line):
+        raise ValueError(line)
+
+    tailer.add_listener(fail)
+    subscription = tailer.subscribe()
+    time.sleep(0.1)
+    with open(log, 'a') as handle:
+        handle.write('one\ntwo\n')
+
+    assert subscription.get(2) == 'one'
+    assert subscription.get(2) == 'two'
+    assert tailer.thread.is_alive()
+    tailer.unsubscribe(subscription)
+    tailer.remove_listener(fail)
@@ -0,0 +1,69 @@
+import threading
+
+from src.mts_utilities.mts_metrics import COUNTER, HISTOGRAM, Registry
+
+
+def test_counters_from_threads():
+    registry = Registry('test_')
+    registry.describe('calls_total', COUNTER, 'Calls.')
+
+    def work():
+        for _ in range(1000):
+            registry.inc('calls_total', command='screen')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    registry.inc('calls_total', command='ps')
+
+    counters = registry.collect().counters
+    assert counters[('calls_total', (('command', 'screen'),))] == 4000
+    assert counters[('calls_total', (('command', 'ps'),))] == 1
+    # the shards of the finished threads are merged into one
+    assert len(registry.shards) == 1
+
+
+def test_histogram():
+    registry = Registry(buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        registry.observe('seconds', value, action='check')
+    histogram = registry.collect().histograms[
+        ('seconds', (('action', 'check'),))]
+    assert histogram == [2, 1, 1, 2.65]
+
+
+def test_timer_and_timed():
+    registry = Registry()
+
+    @registry.timed('seconds', action='decorated')
+    def function():
+        return 'result'
+
+    assert function() == 'result'
+    with registry.timer('seconds', action='block'):
+        pass
+    histograms = registry.collect().histograms
+    assert histograms[('seconds', (('action', 'decorated'),))][-2] == 0
+    assert sum(histograms[('seconds', (('action', 'block'),))][:-1]) == 1
+
+
+def test_render():
+    registry = Registry('test_', buckets=(0.1, 1))
+    registry.describe('requests_total', COUNTER, 'Requests.')
+    registry.describe('seconds', HISTOGRAM, 'Seconds.')
+    registry.inc('requests_total', route='/api/"status"', code=200)
+    registry.observe('seconds', 0.5, route='/api/status')
+    assert registry.render() == (
+        '# HELP test_requests_total Requests.\n'
+        '# TYPE test_requests_total counter\n'
+        'test_requests_total{code="200",route="/api/\\"status\\""} 1\n'
+        '# HELP test_seconds Seconds.\n'
+        '# TYPE test_seconds histogram\n'
+        'test_seconds_bucket{route="/api/status",le="0.1"} 0\n'
+        'test_seconds_bucket{route="/api/status",le="1"} 1\n'
+        'test_seconds_bucket{route="/api/status",le="+Inf"} 1\n'
+        'test_seconds_sum{route="/api/status"} 0.5\n'
+        'test_seconds_count{route="/api/status"} 1\n'
+    )
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+import time
+
+from src.mts_utilities import mts_process
+
+
+def start_sleeper(ignore_term=False):
+    code = 'import signal, time\n'
+    if ignore_term:
+        code += 'signal.signal(signal.SIGTERM, signal.SIG_IGN)\n'
+    code += 'print("ready", flush=True)\ntime.sleep(30)\n'
+    process = subprocess.Popen([sys.executable, '-c', code],
+                               stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()
+    return process
+
+
+def test_is_alive():
+    process = start_sleeper()
+    assert mts_process.is_alive(process.pid) is True
+    process.kill()
+    time.sleep(0.2)
+    # the process is a zombie until it is reaped
+    assert mts_process.is_alive(process.pid) is False
+    process.wait()
+    assert mts_process.is_alive(process.pid) is False
+
+
+def test_wait_for_exit():
+    process = start_sleeper()
+    assert mts_process.wait_for_exit([process.pid], 0.1) is False
+    started = time.monotonic()
+    process.terminate()
+    assert mts_process.wait_for_exit([process.pid], 5) is True
+    assert time.monotonic() - started < 1
+    process.wait()
+
+
+def test_wait_for_exit_polling(monkeypatch):
+    monkeypatch.setattr(mts_process, 'open_pidfds', lambda pids: None)
+    process = start_sleeper()
+    assert mts_process.wait_for_exit([process.pid], 0.1) is False
+    process.terminate()
+    assert mts_process.wait_for_exit([process.pid], 5) is True
+    process.wait()
+
+
+def test_terminate_escalates():
+    process = start_sleeper(ignore_term=True)
+    assert mts_process.terminate([process.pid], 0.5) is True
+    assert process.wait() == -9
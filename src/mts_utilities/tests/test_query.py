@@ -0,0 +1,98 @@
+import socket
+import socketserver
+import struct
+import threading
+
+import pytest
+
+from src.mts_utilities import mts_query
+from src.mts_utilities.mts_query import QueryClient, QueryError, poll
+
+
+class FakeQueryHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, connection = self.request
+        assert data[:2] == mts_query.MAGIC
+        packet_type, session = data[2], data[3:7]
+        if packet_type == mts_query.TYPE_HANDSHAKE:
+            self.server.handshakes += 1
+            body = str(self.server.token).encode() + b'\x00'
+        elif struct.unpack('>i', data[7:11])[0] != self.server.token:
+            # the server ignores requests with an expired token
+            return
+        else:
+            body = mts_query.KEYS_HEADER + b'\x00'.join([
+                b'hostname', self.server.motd.encode(), b'gametype', b'SMP',
+                b'version', b'1.20.1', b'plugins', b'', b'map', b'world',
+                b'numplayers', b'2', b'maxplayers', b'20', b'', b'',
+            ]) + mts_query.PLAYERS_HEADER + b'Alex\x00Steve\x00\x00'
+        connection.sendto(bytes([packet_type]) + session + body,
+                          self.client_address)
+
+
+def serve_query(motd='A Minecraft Server'):
+    server = socketserver.ThreadingUDPServer(('127.0.0.1', 0),
+                                             FakeQueryHandler)
+    server.daemon_threads = True
+    server.token = 9513307
+    server.handshakes = 0
+    server.motd = motd
+    threading.Thread(target=server.serve_forever, args=(0.05,),
+                     daemon=True).start()
+    return server
+
+
+@pytest.fixture(name='query_server')
+def fixture_query_server():
+    server = serve_query()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_full_stat(query_server):
+    client = QueryClient(port=query_server.server_address[1], timeout=0.5)
+    result = client.full_stat()
+    assert result.motd == 'A Minecraft Server'
+    assert (result.version, result.map) == ('1.20.1', 'world')
+    assert (result.online, result.maximum) == (2, 20)
+    assert result.players == ['Alex', 'Steve']
+
+
+def test_token_is_cached(query_server):
+    client = QueryClient(port=query_server.server_address[1], timeout=0.5)
+    client.full_stat()
+    client.full_stat()
+    assert query_server.handshakes == 1
+
+
+def test_expired_token_is_renewed(query_server):
+    client = QueryClient(port=query_server.server_address[1], timeout=0.2)
+    client.full_stat()
+    query_server.token = 1234
+    assert client.full_stat().players == ['Alex', 'Steve']
+    assert query_server.handshakes == 2
+
+
+def test_parse_invalid_reply():
+    with pytest.raises(QueryError):
+        mts_query.parse_full_stat(b'hostname\x00test\x00')
+
+
+def test_poll_servers():
+    servers = [serve_query(f'server {number}') for number in range(2)]
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as closed:
+        closed.bind(('127.0.0.1', 0))
+        closed_port = closed.getsockname()[1]
+    try:
+        clients = [QueryClient(port=server.server_address[1], timeout=0.5)
+                   for server in servers]
+        clients.append(QueryClient(port=closed_port, timeout=0.2))
+        results = poll(clients)
+        assert [result.motd for result in results[:2]] == \
+            ['server 0', 'server 1']
+        assert isinstance(results[2], OSError)
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
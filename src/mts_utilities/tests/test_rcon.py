@@ -0,0 +1,165 @@
+import socket
+import socketserver
+import struct
+import threading
+
+import pytest
+
+from src.mts_utilities import mts_rcon
+
+password = 'secret'
+
+
+class FakeRconHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.server.connections += 1
+        silent = False
+        while True:
+            header = self.request.recv(4)
+            if len(header) < 4:
+                return
+            length = struct.unpack('<i', header)[0]
+            payload = b''
+            while len(payload) < length:
+                payload += self.request.recv(length - len(payload))
+            request_id, packet_type = struct.unpack('<ii', payload[:8])
+            body = payload[8:-2].decode()
+            if packet_type == mts_rcon.SERVERDATA_AUTH:
+                if body != password:
+                    request_id = -1
+                self.reply(request_id, mts_rcon.SERVERDATA_AUTH_RESPONSE, '')
+            elif packet_type == mts_rcon.SERVERDATA_RESPONSE_VALUE:
+                # answer the end marker like Minecraft
+                if not silent:
+                    self.reply(-1, mts_rcon.SERVERDATA_RESPONSE_VALUE,
+                               'Unknown request 0')
+            elif body == 'list':
+                self.reply(request_id, mts_rcon.SERVERDATA_RESPONSE_VALUE,
+                           'There are 0 of a max of 20 players online: ')
+            elif body == 'long':
+                self.reply(request_id, mts_rcon.SERVERDATA_RESPONSE_VALUE,
+                           'a' * mts_rcon.MAX_FRAGMENT)
+                self.reply(request_id, mts_rcon.SERVERDATA_RESPONSE_VALUE,
+                           'b')
+            elif body == 'full':
+                self.reply(request_id, mts_rcon.SERVERDATA_RESPONSE_VALUE,
+                           'a' * mts_rcon.MAX_FRAGMENT)
+            elif body == 'drop':
+                return
+            elif body.startswith('give'):
+                # run the command but never answer it
+                self.server.commands.append(body)
+                silent = True
+            else:
+                self.server.commands.append(body)
+                self.reply(request_id, mts_rcon.SERVERDATA_RESPONSE_VALUE, '')
+
+    def reply(self, request_id, packet_type, body):
+        payload = struct.pack('<ii', request_id, packet_type) \
+            + body.encode() + b'\x00\x00'
+        self.request.sendall(struct.pack('<i', len(payload)) + payload)
+
+
+@pytest.fixture
+def rcon_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0),
+                                             FakeRconHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.commands = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,),
+                              daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_command(rcon_server):
+    client = mts_rcon.RconClient('127.0.0.1', rcon_server.server_address[1],
+                                 password)
+    assert client.command('list') == \
+        'There are 0 of a max of 20 players online: '
+    assert client.command('long') == 'a' * mts_rcon.MAX_FRAGMENT + 'b'
+    client.close()
+
+
+def test_client_full_fragment(rcon_server):
+    client = mts_rcon.RconClient('127.0.0.1', rcon_server.server_address[1],
+                                 password, timeout=1)
+    # the end marker ends a response that fills its last fragment
+    assert client.command('full') == 'a' * mts_rcon.MAX_FRAGMENT
+    assert client.command('list') == \
+        'There are 0 of a max of 20 players online: '
+    assert client.idle()
+    client.close()
+
+
+def test_client_wrong_password(rcon_server):
+    client = mts_rcon.RconClient('127.0.0.1', rcon_server.server_address[1],
+                                 'wrong')
+    with pytest.raises(mts_rcon.RconAuthenticationError):
+        client.connect()
+
+
+def test_pool_reuses_connection(rcon_server):
+    pool = mts_rcon.RconPool('127.0.0.1', rcon_server.server_address[1],
+                             password)
+    for _ in range(5):
+        pool.command('save-all')
+    assert rcon_server.connections == 1
+    assert rcon_server.commands == ['save-all'] * 5
+    pool.close()
+
+
+def test_pool_reconnects(rcon_server):
+    pool = mts_rcon.RconPool('127.0.0.1', rcon_server.server_address[1],
+                             password)
+    pool.command('say hi')
+    with pytest.raises(ConnectionError):
+        pool.command('drop')
+    pool.command('say again')
+    assert rcon_server.commands == ['say hi', 'say again']
+    pool.close()
+
+
+def test_pool_does_not_resend_after_timeout(rcon_server):
+    pool = mts_rcon.RconPool('127.0.0.1', rcon_server.server_address[1],
+                             password, timeout=0.2)
+    pool.command('say hi')
+    with pytest.raises(socket.timeout):
+        pool.command('give @p diamond')
+    assert rcon_server.commands == ['say hi', 'give @p diamond']
+    pool.close()
+
+
+def test_pool_skips_closed_connection(rcon_server):
+    pool = mts_rcon.RconPool('127.0.0.1', rcon_server.server_address[1],
+                             password)
+    pool.command('say hi')
+    client = pool.idle.get_nowait()
+    client.connection.shutdown(socket.SHUT_RD)
+    pool.release(client)
+    pool.command('say again')
+    assert rcon_server.connections == 2
+    assert rcon_server.commands == ['say hi', 'say again']
+    pool.close()
+
+
+def test_actions(rcon_server):
+    actions = mts_rcon.RconActions('127.0.0.1',
+                                   rcon_server.server_address[1], password)
+    assert actions.check() is True
+    assert actions.send_many(['say hi', 'list']) == \
+        ['', 'There are 0 of a max of 20 players online: ']
+    actions.close()
+
+
+def test_actions_unreachable():
+    closed = socket.socket()
+    closed.bind(('127.0.0.1', 0))
+    port = closed.getsockname()[1]
+    closed.close()
+    actions = mts_rcon.RconActions('127.0.0.1', port, password, timeout=1)
+    assert actions.check() is False
+    assert actions.send('say hi') is False
@@ -0,0 +1,69 @@
+import multiprocessing
+import time
+
+from src.mts_utilities import mts_state
+
+
+def test_lifecycle_default(tmp_path):
+    state = mts_state.SharedState(str(tmp_path / 'state.db'))
+    assert state.lifecycle() == (mts_state.STOPPED, None)
+
+
+def test_transition(tmp_path):
+    state = mts_state.SharedState(str(tmp_path / 'state.db'))
+    assert state.transition((mts_state.STOPPED,), mts_state.STARTING)
+    assert not state.transition((mts_state.STOPPED,), mts_state.STARTING)
+    assert state.lifecycle()[0] == mts_state.STARTING
+
+    # another process sees the same state
+    other = mts_state.SharedState(str(tmp_path / 'state.db'))
+    assert other.lifecycle()[0] == mts_state.STARTING
+
+
+def test_transition_stale(tmp_path):
+    state = mts_state.SharedState(str(tmp_path / 'state.db'))
+    state.set_lifecycle(mts_state.STARTING)
+    time.sleep(0.02)
+    assert not state.transition((mts_state.STOPPED,), mts_state.STARTING,
+                                stale_after=60)
+    assert state.transition((mts_state.STOPPED,), mts_state.STARTING,
+                            stale_after=0.01)
+
+
+def test_probe(tmp_path):
+    state = mts_state.SharedState(str(tmp_path / 'state.db'))
+    assert state.probe('status', 5) is None
+    state.record_probe('status', True)
+    assert state.probe('status', 5) is True
+    time.sleep(0.02)
+    assert state.probe('status', 0.01) is None
+    state.record_probe('status', False)
+    state.forget_probe('status')
+    assert state.probe('status', 5) is None
+
+
+def try_start(path, results):
+    state = mts_state.SharedState(path)
+    results.put(state.transition((mts_state.STOPPED,), mts_state.STARTING))
+
+
+def test_transition_across_processes(tmp_path):
+    path = str(tmp_path / 'state.db')
+    mts_state.SharedState(path).set_lifecycle(mts_state.STOPPED)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=try_start,
+                                         args=(path, results))
+                 for _ in range(6)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    outcomes = [results.get() for _ in processes]
+    assert outcomes.count(True) == 1
+
+
+def test_update(tmp_path):
+    state = mts_state.SharedState(str(tmp_path / 'state.db'))
+    assert state.update('count', lambda value: (value or 0) + 1) == 1
+    assert state.update('count', lambda value: (value or 0) + 1) == 2
+    assert state.get('count')[0] == 2
@@ -0,0 +1,298 @@
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from src.mts_utilities.mts_status import PING_PROTOCOL, StatusChecker
+from src.mts_utilities.mts_status import flatten_text, pack_packet
+from src.mts_utilities.mts_status import pack_varint, read_packet
+from src.mts_utilities.mts_status import read_varint
+
+
+def make_process(proc_path, pid, arguments):
+    process_path = proc_path / str(pid)
+    process_path.mkdir()
+    (process_path / 'cmdline').write_bytes(
+        b'\0'.join(argument.encode() for argument in arguments) + b'\0'
+    )
+
+
+def test_has_proc(tmp_path):
+    checker = StatusChecker()
+    checker.proc_path = str(tmp_path)
+    assert checker.has_proc() is False
+    (tmp_path / 'self').mkdir()
+    assert checker.has_proc() is True
+
+
+def test_pids_success(tmp_path):
+    make_process(tmp_path, 12, ['/usr/bin/java', '-Xmx1G', '-jar',
+                                '/srv/minecraft/minecraft_server.jar',
+                                'nogui'])
+    make_process(tmp_path, 7, ['java', '-jar', 'minecraft_server.jar'])
+    make_process(tmp_path, 30, ['/usr/bin/java', '-jar', 'other.jar'])
+    make_process(tmp_path, 31, ['/bin/bash', 'minecraft_server.jar'])
+    checker = StatusChecker()
+    checker.proc_path = str(tmp_path)
+    assert checker.pids('/bin/java', 'minecraft_server.jar') == [7, 12]
+    assert checker.valid is True
+
+
+def test_pids_without_server_file(tmp_path):
+    make_process(tmp_path, 30, ['/usr/bin/java', '-jar', 'other.jar'])
+    checker = StatusChecker()
+    checker.proc_path = str(tmp_path)
+    assert checker.pids('java') == [30]
+
+
+def test_pids_none(tmp_path):
+    make_process(tmp_path, 31, ['/bin/bash'])
+    (tmp_path / '32').mkdir()
+    checker = StatusChecker()
+    checker.proc_path = str(tmp_path)
+    assert checker.pids('java', 'minecraft_server.jar') == []
+    assert checker.valid is False
+
+
+def test_pids_current_process():
+    checker = StatusChecker()
+    if not checker.has_proc():
+        return
+    arguments = checker.read_cmdline(os.getpid())
+    assert os.getpid() in checker.pids(arguments[0])
+
+
+def test_usage(tmp_path):
+    process_path = tmp_path / '42'
+    process_path.mkdir()
+    ticks = os.sysconf('SC_CLK_TCK')
+    fields = ['S'] + ['0'] * 40
+    fields[11], fields[12] = str(3 * ticks), str(ticks)
+    fields[17], fields[19] = '52', str(100 * ticks)
+    (process_path / 'stat').write_text(f'42 (java (server)) {" ".join(fields)}')
+    (process_path / 'status').write_text('Name:\tjava\nVmRSS:\t  2048 kB\n')
+    (tmp_path / 'uptime').write_text('160.5 300.0\n')
+
+    checker = StatusChecker()
+    checker.proc_path = str(tmp_path)
+    assert checker.usage(42) == {'pid': 42, 'cpu_seconds': 4.0,
+                                 'memory_bytes': 2097152, 'threads': 52,
+                                 'uptime_seconds': 60.5}
+    assert checker.usage(43) is None
+
+
+def test_usage_current_process():
+    checker = StatusChecker()
+    if not checker.has_proc():
+        return
+    usage = checker.usage(os.getpid())
+    assert usage['memory_bytes'] > 0 and usage['threads'] >= 1
+
+
+def make_socket_tables(proc_path):
+    net_path = proc_path / 'net'
+    net_path.mkdir()
+    header = '  sl  local_address rem_address   st tx_queue rx_queue tr ' \
+             'tm->when retrnsmt   uid  timeout inode\n'
+    (net_path / 'tcp').write_text(
+        header
+        + '   0: 00000000:63DD 00000000:0000 0A 00000000:00000000 00:00000000 '
+          '00000000  1000        0 4001 1 0000000000000000 100 0 0 10 0\n'
+        + '   1: 0100007F:1F90 0100007F:D3A2 01 00000000:00000000 00:00000000 '
+          '00000000  1000        0 4002 1 0000000000000000 20 4 30 10 -1\n'
+    )
+    (net_path / 'tcp6').write_text(
+        header
+        + '   0: 00000000000000000000000000000000:63DF '
+          '00000000000000000000000000000000:0000 0A 00000000:00000000 '
+          '00:00000000 00000000  1000        0 4003 1 0000000000000000 100 0 '
+          '0 10 0\n'
+    )
+
+
+def test_listening(tmp_path):
+    make_socket_tables(tmp_path)
+    checker = StatusChecker()
+    checker.proc_path = str(tmp_path)
+    assert checker.listening() == {25565: [4001], 25567: [4003]}
+
+
+def test_port_exact_match(tmp_path):
+    make_socket_tables(tmp_path)
+    checker = StatusChecker()
+    checker.proc_path = str(tmp_path)
+    assert checker.port([25565, 2556, 8080, '25567']) == {
+        'port 25565': True,
+        'port 2556': False,
+        'port 8080': False,
+        'port 25567': True,
+    }
+    assert checker.valid is True
+
+
+def test_port_owners(tmp_path):
+    make_socket_tables(tmp_path)
+    fd_path = tmp_path / '42' / 'fd'
+    fd_path.mkdir(parents=True)
+    os.symlink('socket:[4001]', fd_path / '5')
+    os.symlink('/dev/null', fd_path / '0')
+    checker = StatusChecker()
+    checker.proc_path = str(tmp_path)
+    assert checker.port_owners([25565, 25567, 8080]) == {
+        25565: [{'inode': 4001, 'pid': 42}],
+        25567: [{'inode': 4003, 'pid': None}],
+        8080: [],
+    }
+
+
+def test_confirms():
+    assert StatusChecker.confirms(True) is True
+    assert StatusChecker.confirms([12]) is True
+    assert StatusChecker.confirms(False) is False
+    assert StatusChecker.confirms([]) is False
+    assert StatusChecker.confirms(ValueError()) is False
+
+
+def test_run_short_circuits():
+    checker = StatusChecker()
+    started = time.monotonic()
+    results = checker.run({
+        'slow': lambda: time.sleep(0.5) or False,
+        'fast': lambda: [42],
+    })
+    assert results == {'fast': [42]}
+    assert time.monotonic() - started < 0.4
+
+
+def test_run_does_not_wait_for_earlier_probes():
+    checker = StatusChecker()
+    # slow pings keep running after the first run returned
+    slow = {f'ping {port}': lambda: time.sleep(0.5) or False
+            for port in range(8)}
+    assert checker.run({**slow, 'fast': lambda: [42]}) == {'fast': [42]}
+    started = time.monotonic()
+    results = checker.run({'pids': lambda: [42], 'port': lambda: False},
+                          full=True)
+    assert results == {'pids': [42], 'port': False}
+    assert time.monotonic() - started < 0.3
+
+
+def test_run_full_report():
+    def fail():
+        raise ValueError('no tool')
+
+    checker = StatusChecker()
+    results = checker.run({
+        'slow': lambda: time.sleep(0.05) or False,
+        'fast': lambda: [42],
+        'ports': lambda: {'port 25565': False, 'port 25575': True},
+        'error': fail,
+    }, full=True)
+    assert results['slow'] is False
+    assert results['fast'] == [42]
+    assert results['port 25565'] is False
+    assert results['port 25575'] is True
+    assert isinstance(results['error'], ValueError)
+
+
+class FakePingHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        packet_id, payload = read_packet(self.rfile)
+        assert packet_id == 0
+        assert read_varint(payload) == PING_PROTOCOL
+        self.server.handshakes += 1
+        packet_id, _ = read_packet(self.rfile)
+        assert packet_id == 0
+        status = json.dumps(self.server.status).encode()
+        self.wfile.write(pack_packet(0, pack_varint(len(status)) + status))
+        if self.server.pong:
+            packet_id, payload = read_packet(self.rfile)
+            assert packet_id == 1
+            self.wfile.write(pack_packet(1, payload.read()))
+
+
+def serve_ping(status, pong=True):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0),
+                                             FakePingHandler)
+    server.daemon_threads = True
+    server.status = status
+    server.pong = pong
+    server.handshakes = 0
+    threading.Thread(target=server.serve_forever, args=(0.05,),
+                     daemon=True).start()
+    return server
+
+
+def test_varint():
+    for value in [0, 1, 127, 128, 25565, 2 ** 31 - 1, -1]:
+        assert read_varint(io.BytesIO(pack_varint(value))) == value
+    assert pack_varint(-1) == b'\xff\xff\xff\xff\x0f'
+
+
+def test_flatten_text():
+    assert flatten_text({'text': 'A ', 'extra': [{'text': 'Minecraft'},
+                                                 ' Server']}) \
+        == 'A Minecraft Server'
+
+
+def test_ping():
+    server = serve_ping({
+        'version': {'name': '1.20.1', 'protocol': 763},
+        'players': {'max': 20, 'online': 2},
+        'description': {'text': 'A Minecraft Server'},
+    })
+    try:
+        checker = StatusChecker()
+        result = checker.ping(server.server_address[1])
+        assert result.motd == 'A Minecraft Server'
+        assert (result.online, result.maximum) == (2, 20)
+        assert (result.version, result.protocol) == ('1.20.1', 763)
+        assert result.latency >= 0
+        assert checker.valid is True
+        assert StatusChecker.confirms(result) is True
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_ping_without_pong():
+    server = serve_ping({'description': 'Old server'}, pong=False)
+    try:
+        result = StatusChecker().ping(server.server_address[1], timeout=0.5)
+        assert result.motd == 'Old server'
+        assert result.online == 0
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_ping_ports_concurrently():
+    servers = [serve_ping({'description': f'server {number}'})
+               for number in range(2)]
+    try:
+        checker = StatusChecker()
+        probes = {
+            f'ping {number}': lambda server=server: checker.ping(
+                server.server_address[1])
+            for number, server in enumerate(servers)
+        }
+        results = checker.run(probes, full=True)
+        assert [results[f'ping {number}'].motd for number in range(2)] == \
+            ['server 0', 'server 1']
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+
+def test_ping_refused():
+    with socket.socket() as closed:
+        closed.bind(('127.0.0.1', 0))
+        port_number = closed.getsockname()[1]
+    with pytest.raises(OSError):
+        StatusChecker().ping(port_number)
@@ -0,0 +1,170 @@
+import asyncio
+import os
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    os.environ.get('CI') == 'true',
+    reason='GitHub Actions does not support arrays in config.')
+
+
+async def request(reader, writer, method, path):
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: test\r\n\r\n'.encode())
+    await writer.drain()
+    status = (await reader.readline()).decode()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode().strip()
+        if line == '':
+            break
+        name, _, value = line.partition(':')
+        headers[name.lower()] = value.strip()
+    body = await reader.readexactly(int(headers['content-length']))
+    return int(status.split()[1]), headers, body.decode()
+
+
+def test_routes():
+    from src import aio  # pylint: disable=import-outside-toplevel
+
+    async def main():
+        api = aio.AsyncApi(aio.api_handler, aio.app, workers=2)
+        server = await asyncio.start_server(api.connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+        # the requests of a connection all run the Flask app
+        code, headers, body = await request(reader, writer, 'GET',
+                                            '/api/status')
+        assert code == 200 and body in ('up', 'down')
+        assert headers['connection'] == 'keep-alive'
+        code, _, _ = await request(reader, writer, 'GET', '/api/nothing')
+        assert code == 404
+        code, headers, body = await request(reader, writer, 'GET',
+                                            '/api/metrics')
+        assert code == 200
+        assert 'route="/api/status"' in body
+
+        clients = [asyncio.open_connection('127.0.0.1', port)
+                   for _ in range(50)]
+        connections = await asyncio.gather(*clients)
+        replies = await asyncio.gather(*[
+            request(client_reader, client_writer, 'GET', '/api/status')
+            for client_reader, client_writer in connections])
+        assert {reply[0] for reply in replies} == {200}
+
+        for _, client_writer in [*connections, (reader, writer)]:
+            client_writer.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_read_request():
+    from src import aio  # pylint: disable=import-outside-toplevel
+
+    async def parse(data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await aio.read_request(reader, ('127.0.0.1', 1234))
+
+    parsed = asyncio.run(parse(b'POST /api/date?x=1 HTTP/1.0\r\n'
+                               b'Content-Length: 2\r\n\r\nhi'))
+    assert (parsed.method, parsed.path, parsed.query) == \
+        ('POST', '/api/date', 'x=1')
+    assert parsed.body == b'hi'
+    assert not aio.wants_keep_alive(parsed)
+    assert asyncio.run(parse(b'')) is None
+    with pytest.raises(ValueError):
+        asyncio.run(parse(b'nonsense\r\n\r\n'))
+    with pytest.raises(aio.RequestError) as error:
+        asyncio.run(parse(b'POST /api/date HTTP/1.1\r\n'
+                          b'Transfer-Encoding: chunked\r\n\r\n'
+                          b'2\r\nhi\r\n0\r\n\r\n'))
+    assert error.value.code == 501
+
+
+def test_chunked_body_is_refused():
+    from src import aio  # pylint: disable=import-outside-toplevel
+
+    async def main():
+        api = aio.AsyncApi(aio.api_handler, aio.app, workers=1)
+        server = await asyncio.start_server(api.connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        # the chunks must not be read as the next request
+        writer.write(b'POST /api/date HTTP/1.1\r\nHost: test\r\n'
+                     b'Transfer-Encoding: chunked\r\n\r\n'
+                     b'1c\r\nGET /api/status HTTP/1.1\r\n\r\n\r\n0\r\n\r\n')
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    response = asyncio.run(main())
+    assert response.startswith(b'HTTP/1.1 501 Not Implemented\r\n')
+    assert b'Connection: close' in response
+    assert response.count(b'HTTP/1.1') == 1
+
+
+def test_handler_routes(monkeypatch):
+    from src import aio, web  # pylint: disable=import-outside-toplevel
+
+    async def main():
+        api = aio.AsyncApi(aio.api_handler, aio.app, workers=1)
+        server = await asyncio.start_server(api.connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+        # the coroutines of the handler keep the authentication of web.py
+        code, headers, _ = await request(reader, writer, 'GET', '/api/check')
+        assert code == 401 and 'www-authenticate' in headers
+        monkeypatch.setattr(web, 'DEBUG', True)
+        code, _, body = await request(reader, writer, 'GET', '/api/check')
+        assert code == 200 and body in ('on', 'off')
+        code, _, _ = await request(reader, writer, 'POST', '/api/date')
+        assert code == 200
+        _, _, body = await request(reader, writer, 'GET', '/api/metrics')
+        assert 'code="401",method="GET",route="/api/check"' in body
+        assert 'code="200",method="POST",route="/api/date"' in body
+
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_connection_limits(monkeypatch):
+    from src import aio  # pylint: disable=import-outside-toplevel
+    monkeypatch.setattr(aio, 'IDLE_TIMEOUT', 0.1)
+
+    async def main():
+        api = aio.AsyncApi(aio.api_handler, aio.app, workers=1)
+        server = await asyncio.start_server(api.connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        # a header over the limit of the reader is answered
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /api/status HTTP/1.1\r\nX-Long: '
+                     + b'a' * 2 ** 17 + b'\r\n\r\n')
+        await writer.drain()
+        too_large = await asyncio.wait_for(reader.read(), 2)
+        writer.close()
+
+        # an idle connection is closed
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        idle = await asyncio.wait_for(reader.read(), 2)
+        writer.close()
+
+        server.close()
+        await server.wait_closed()
+        return too_large, idle
+
+    too_large, idle = asyncio.run(main())
+    assert too_large.startswith(
+        b'HTTP/1.1 431 Request Header Fields Too Large\r\n')
+    assert idle == b''
@@ -0,0 +1,47 @@
+import os
+import stat
+
+import pytest
+
+import src.config as config
+
+
+def test_load_config_defaults(monkeypatch):
+    monkeypatch.setattr('dotenv.load_dotenv', lambda: None)
+    for name in ('SCREEN_NAME', 'SERVER_PATH', 'SERVER_FILE', 'STOP_TIMER',
+                 'JAVA_EXECUTABLE'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('PORTS', '[25565]')
+    monkeypatch.setenv('SERVER_OPTIONS', '[]')
+    config.load_config.cache_clear()
+    try:
+        settings = config.load_config()
+    finally:
+        config.load_config.cache_clear()
+    assert settings['screen_name'] == 'minecraft'
+    assert settings['stop_timer'] == 30
+    assert settings['server_path'] == '/usr/games/minecraft'
+
+
+def test_runtime_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path / 'run'))
+    assert config.runtime_path('mc', 'db') == \
+        str(tmp_path / 'run' / 'minecraft-helpers-mc.db')
+
+    monkeypatch.delenv('XDG_RUNTIME_DIR')
+    monkeypatch.setattr(config.tempfile, 'gettempdir', lambda: str(tmp_path))
+    directory = config.runtime_directory()
+    assert directory == str(tmp_path / f'minecraft-helpers-{os.getuid()}')
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    assert config.runtime_directory() == directory
+
+
+def test_runtime_directory_of_others(tmp_path, monkeypatch):
+    monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+    monkeypatch.setattr(config.tempfile, 'gettempdir', lambda: str(tmp_path))
+    # a directory that others can write to may hold forged files
+    directory = tmp_path / f'minecraft-helpers-{os.getuid()}'
+    directory.mkdir()
+    directory.chmod(0o777)
+    with pytest.raises(PermissionError):
+        config.runtime_directory()
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import src.main as main
+from src.minecraft_helpers.server_actions import MinecraftActions
+from src.mts_utilities.mts_control import ControlServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+# the modules that only the actions need, which keep the import fast; the
+# import time itself is measured by the benchmarks
+HEAVY_MODULES = ['dotenv', 'json', 'mtslogger', 'socket', 'sqlite3',
+                 'subprocess', 'src.config',
+                 'src.minecraft_helpers.server_actions',
+                 'src.minecraft_helpers.supervisor',
+                 'src.minecraft_helpers.give',
+                 'src.mts_utilities.mts_control']
+
+
+def run_python(code: str) -> str:
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+def test_import_is_lazy():
+    output = run_python(
+        'import sys\n'
+        'import src.main\n'
+        f'print([name for name in {HEAVY_MODULES!r} if name in sys.modules])'
+    )
+    assert output == '[]'
+
+
+def test_forwarded_actions(tmp_path):
+    server = MinecraftActions(state_file=str(tmp_path / 'state.db'))
+    assert sorted(main.FORWARDED) == sorted(server.get_actions())
+
+
+def test_forward_action_ignores_other_settings(tmp_path, monkeypatch,
+                                               capsys):
+    socket_path = str(tmp_path / 'control.sock')
+    monkeypatch.setenv('CONTROL_SOCKET', socket_path)
+    monkeypatch.setenv('PORTS', 'not a list')
+    server = ControlServer(socket_path, {'status': lambda: True})
+    assert server.start()
+    try:
+        assert main.forward_action('status') is True
+    finally:
+        server.close()
+    assert capsys.readouterr().out == 'True\n'
+
+
+def test_forward_action_error(tmp_path, monkeypatch):
+    def fail():
+        raise RuntimeError('no screen')
+
+    socket_path = str(tmp_path / 'control.sock')
+    monkeypatch.setenv('CONTROL_SOCKET', socket_path)
+    server = ControlServer(socket_path, {'date': fail})
+    assert server.start()
+    try:
+        with pytest.raises(SystemExit, match='date failed: RuntimeError'):
+            main.forward_action('date')
+    finally:
+        server.close()
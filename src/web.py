@@ -1,11 +1,13 @@
 import os
+import time
 from functools import wraps
 
 from dotenv import load_dotenv
-from flask import Flask, Response
+from flask import Flask, Response, g, request
 
 import src.api.handler as handler
 from src.api import http_codes
+from src.mts_utilities.mts_metrics import registry
 
 load_dotenv()
 
@@ -66,6 +68,36 @@ def authenticate_admin(callback: callable):
     return wrapper
 
 
+@app.before_request
+def start_timer():
+    """Remember when the request started for the metrics."""
+    g.started = time.perf_counter()
+    api_handler.start_background()
+
+
+@app.after_request
+def record_request(response: Response) -> Response:
+    """Count the request and record how long it took.
+
+    Parameters
+    ----------
+    response : Response
+
+    Returns
+    -------
+    Response
+    """
+    route = request.url_rule.rule if request.url_rule is not None \
+        else 'unmatched'
+    registry.inc('http_requests_total', method=request.method, route=route,
+                 code=response.status_code)
+    started = g.get('started')
+    if started is not None:
+        registry.observe('http_request_seconds', time.perf_counter() - started,
+                         method=request.method, route=route)
+    return response
+
+
 @app.errorhandler(http_codes.BAD_REQUEST)
 @app.errorhandler(http_codes.UNAUTHORIZED)
 @app.errorhandler(http_codes.FORBIDDEN)
@@ -103,6 +135,18 @@ def check():
     return api_handler.check()
 
 
+@app.route('/api/console/stream', methods=['GET'])
+@authenticate_admin
+def console_stream():
+    """Call the console_stream method of the API handler.
+
+    Returns
+    -------
+    Response
+    """
+    return api_handler.console_stream()
+
+
 @app.route('/api/date', methods=['POST'])
 @authenticate_user
 def date():
@@ -127,6 +171,57 @@ def command():
     return api_handler.command()
 
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@authenticate_user
+def job(job_id: str):
+    """Call the job method of the API handler.
+
+    Parameters
+    ----------
+    job_id : str
+
+    Returns
+    -------
+    Response
+    """
+    return api_handler.job(job_id)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Call the metrics method of the API handler.
+
+    Returns
+    -------
+    Response
+    """
+    return api_handler.metrics()
+
+
+@app.route('/api/overview', methods=['GET'])
+@authenticate_user
+def overview():
+    """Call the overview method of the API handler.
+
+    Returns
+    -------
+    Response
+    """
+    return api_handler.overview()
+
+
+@app.route('/api/players', methods=['GET'])
+@authenticate_user
+def players():
+    """Call the players method of the API handler.
+
+    Returns
+    -------
+    Response
+    """
+    return api_handler.players()
+
+
 @app.route('/api/restart', methods=['PUT', 'PATCH'])
 @authenticate_user
 def restart():